@@ -0,0 +1,135 @@
+"""Benchmark de arranque en frío: tiempo hasta la primera ficha con la CLI y con la GUI.
+
+Cada corrida es un proceso nuevo de Python contra el Sofia Plus simulado
+(mock_sofia.py) con el motor HTTP y una sesión ya guardada, de modo que el
+tiempo medido es sobre todo importar main.py y sus dependencias, leer el
+archivo y procesar la primera ficha. También mide el costo de solo importar
+main.py. La GUI necesita pantalla; sin DISPLAY se omite.
+
+Uso:
+    python benchmarks/bench_cold_start.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import SessionCookieStore
+from mock_sofia import MockSofiaServer
+
+FIRST_FICHA_MARKER = "PRIMERA_FICHA"
+
+# Se ejecuta en el proceso hijo: abre la GUI, inicia la automatización y avisa en el primer avance
+GUI_SCRIPT = """
+import os, sys
+sys.path.insert(0, {root!r})
+import main
+main.SenaAutomation.BASE_URL = {base_url!r}
+app = main.SenaAutomationGUI()
+app.http_engine_var.set(True)
+app.pause_var.set(0)
+app.excel_path.set({fichas_path!r})
+apply_progress = app.apply_progress
+
+def first_progress(current, total, successful, failed):
+    apply_progress(current, total, successful, failed)
+    if current >= 1:
+        print({marker!r}, flush=True)
+        os._exit(0)
+
+app.apply_progress = first_progress
+app.root.after(0, app.start_automation)
+app.run()
+"""
+
+
+def time_until_marker(command, cwd, marker, timeout):
+    """Segundos desde que se lanza el proceso hasta que imprime la marca (None si no llega)"""
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        deadline = start + timeout
+        for line in process.stdout:
+            if marker in line:
+                return time.perf_counter() - start
+            if time.perf_counter() > deadline:
+                break
+        return None
+    finally:
+        process.kill()
+        process.wait()
+
+
+def prepare_work_dir(server, fichas):
+    """Directorio de trabajo con el archivo de fichas y la sesión guardada en logs/"""
+    work_dir = tempfile.mkdtemp(prefix="bench_arranque_")
+    fichas_path = os.path.join(work_dir, "fichas.txt")
+    with open(fichas_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(str(2000000 + n) for n in range(fichas)) + "\n")
+    SessionCookieStore(cookie_file=os.path.join(work_dir, "logs", "session_cookies.json")).save(server.new_session())
+    return work_dir, fichas_path
+
+
+def describe(times):
+    if not times:
+        return "sin datos"
+    return f"media {statistics.mean(times):.3f}s, mediana {statistics.median(times):.3f}s, mín {min(times):.3f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío (CLI y GUI)")
+    parser.add_argument("--runs", type=int, default=3, help="Procesos nuevos por variante")
+    parser.add_argument("--fichas", type=int, default=5, help="Fichas en el archivo de entrada")
+    parser.add_argument("--timeout", type=float, default=60, help="Espera máxima por corrida en segundos")
+    args = parser.parse_args()
+
+    server = MockSofiaServer().start()
+    results = {}
+    try:
+        main_path = os.path.join(ROOT, "main.py")
+        variants = {
+            "importar main.py": lambda work_dir, fichas_path: (
+                [sys.executable, "-c", f"import sys; sys.path.insert(0, {ROOT!r}); import main; print('listo')"],
+                "listo"
+            ),
+            "CLI hasta primera ficha": lambda work_dir, fichas_path: (
+                [sys.executable, main_path, fichas_path, "--engine", "http", "--base-url", server.base_url,
+                 "--output-dir", os.path.join(work_dir, "reportes"), "--pause", "0"],
+                "Progreso: 1/"
+            ),
+        }
+        if os.environ.get("DISPLAY") or not sys.platform.startswith("linux"):
+            variants["GUI hasta primera ficha"] = lambda work_dir, fichas_path: (
+                [sys.executable, "-c", GUI_SCRIPT.format(root=ROOT, base_url=server.base_url,
+                                                         fichas_path=fichas_path, marker=FIRST_FICHA_MARKER)],
+                FIRST_FICHA_MARKER
+            )
+        else:
+            print("Sin DISPLAY: se omite la medición de la GUI")
+
+        for label, build in variants.items():
+            print(f"Midiendo '{label}'...")
+            times = []
+            for _ in range(args.runs):
+                work_dir, fichas_path = prepare_work_dir(server, args.fichas)
+                command, marker = build(work_dir, fichas_path)
+                elapsed = time_until_marker(command, work_dir, marker, args.timeout)
+                if elapsed is not None:
+                    times.append(elapsed)
+            results[label] = times
+    finally:
+        server.stop()
+
+    print()
+    for label, times in results.items():
+        print(f"{label}: {describe(times)} ({len(times)}/{args.runs} corridas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark del perfil de Firefox: arranque en frío y carga de página.
+
+Compara el perfil actual (con ventana) contra el perfil de rendimiento de
+SenaAutomation.setup_driver (headless, sin imágenes, page load 'eager').
+
+Uso:
+    python benchmarks/bench_firefox_profile.py --runs 5 --url http://127.0.0.1:8765/sofia-public/
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import SenaAutomation
+
+
+def measure_profile(performance_mode, urls, runs, page_loads):
+    """Devuelve (tiempos de arranque, tiempos de carga de página) en segundos"""
+    startup_times = []
+    load_times = []
+    automation = SenaAutomation(performance_mode=performance_mode)
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        automation.setup_driver()
+        startup_times.append(time.perf_counter() - start)
+
+        try:
+            for _ in range(page_loads):
+                for url in urls:
+                    start = time.perf_counter()
+                    automation.driver.get(url)
+                    load_times.append(time.perf_counter() - start)
+        finally:
+            automation.close_driver()
+
+    return startup_times, load_times
+
+
+def describe(times):
+    if not times:
+        return "sin datos"
+    return (
+        f"media {statistics.mean(times):.3f}s, "
+        f"mediana {statistics.median(times):.3f}s, "
+        f"mín {min(times):.3f}s, máx {max(times):.3f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del perfil de Firefox")
+    parser.add_argument("--url", action="append", dest="urls",
+                        help="URL a cargar (se puede repetir); por defecto la de Sofia Plus")
+    parser.add_argument("--runs", type=int, default=3, help="Arranques en frío por perfil")
+    parser.add_argument("--page-loads", type=int, default=3, help="Cargas por URL en cada arranque")
+    args = parser.parse_args()
+
+    urls = args.urls or [SenaAutomation.BASE_URL]
+
+    results = {}
+    for label, performance_mode in (("actual", False), ("rendimiento", True)):
+        print(f"Midiendo perfil '{label}'...")
+        results[label] = measure_profile(performance_mode, urls, args.runs, args.page_loads)
+
+    print()
+    for label, (startup_times, load_times) in results.items():
+        print(f"Perfil '{label}':")
+        print(f"  Arranque en frío: {describe(startup_times)}")
+        print(f"  Carga de página:  {describe(load_times)}")
+
+    base_startup = statistics.mean(results["actual"][0])
+    fast_startup = statistics.mean(results["rendimiento"][0])
+    base_load = statistics.mean(results["actual"][1])
+    fast_load = statistics.mean(results["rendimiento"][1])
+    print()
+    print(f"Aceleración arranque: {base_startup / fast_startup:.2f}x")
+    print(f"Aceleración carga:    {base_load / fast_load:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
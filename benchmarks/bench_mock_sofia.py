@@ -0,0 +1,114 @@
+"""Benchmark de extremo a extremo contra el Sofia Plus simulado (mock_sofia.py).
+
+Levanta el servidor local con las latencias indicadas, genera N fichas y
+ejecuta SenaAutomation.run_automation con la configuración elegida; reporta
+fichas por minuto sin tocar el sitio real.
+
+Uso:
+    python benchmarks/bench_mock_sofia.py --fichas 50 --engine http --workers 4
+    python benchmarks/bench_mock_sofia.py --fichas 20 --engine selenium --performance --batch-size 5 \\
+        --latency 0.05 --report-latency 1.0
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import ReportCache, SenaAutomation, SessionCookieStore
+from mock_sofia import MockSofiaServer
+
+
+def run_benchmark(args):
+    """Devuelve (segundos, exitosas, fallidas, peticiones al servidor)"""
+    fichas = [str(2000000 + n) for n in range(args.fichas)]
+    missing = fichas[::args.missing_every] if args.missing_every else []
+    server = MockSofiaServer(
+        latency=args.latency,
+        missing_fichas=missing,
+        latencies={
+            'login': args.login_latency,
+            'busqueda': args.search_latency,
+            'aspirantes': args.aspirantes_latency,
+            'reporte': args.report_latency,
+        }
+    ).start()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_sofia_")
+    fichas_path = os.path.join(work_dir, "fichas.txt")
+    with open(fichas_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(fichas) + "\n")
+
+    # Cookies aisladas del uso normal; con el motor HTTP se puede saltar el login con navegador
+    store = SessionCookieStore(cookie_file=os.path.join(work_dir, "session_cookies.json"))
+    SessionCookieStore._shared = store
+    if args.engine == "http" and not args.browser_login:
+        store.save(server.new_session())
+    # Caché de reportes propia: los reportes sintéticos no deben servirse en otras corridas
+    ReportCache._shared = ReportCache(cache_file=os.path.join(work_dir, "report_cache.json"))
+
+    automation = SenaAutomation(performance_mode=args.performance, engine=args.engine)
+    automation.base_url = server.base_url
+    automation.output_dir = os.path.join(work_dir, "reportes")
+    automation.download_dir = os.path.join(automation.output_dir, ".sena_descargas", "worker_0")
+    os.makedirs(automation.output_dir, exist_ok=True)
+
+    results = {}
+
+    def progress(current, total, successful, failed):
+        results.update(successful=successful, failed=failed)
+
+    start = time.perf_counter()
+    try:
+        automation.run_automation(
+            fichas_path,
+            progress_callback=progress,
+            pause_between_fichas=0,
+            reuse_session=not args.no_reuse,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            retry_base_delay=args.retry_delay,
+        )
+    finally:
+        elapsed = time.perf_counter() - start
+        server.stop()
+
+    return elapsed, results.get('successful', 0), results.get('failed', 0), server.request_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de fichas por minuto contra Sofia Plus simulado")
+    parser.add_argument("--fichas", type=int, default=20, help="Cantidad de fichas a procesar")
+    parser.add_argument("--engine", choices=("selenium", "http"), default="http")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1, help="Fichas por reporte (modo lote)")
+    parser.add_argument("--performance", action="store_true", help="Perfil de rendimiento de Firefox")
+    parser.add_argument("--no-reuse", action="store_true", help="Login nuevo por ficha")
+    parser.add_argument("--browser-login", action="store_true",
+                        help="Con el motor HTTP, obtener la sesión con login en navegador")
+    parser.add_argument("--missing-every", type=int, default=0,
+                        help="Marcar como inexistente una de cada N fichas (0 = ninguna)")
+    parser.add_argument("--retry-delay", type=float, default=1.0, help="Retraso base de los reintentos")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia por petición en segundos")
+    parser.add_argument("--login-latency", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=0.0)
+    parser.add_argument("--aspirantes-latency", type=float, default=0.0)
+    parser.add_argument("--report-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    elapsed, successful, failed, requests = run_benchmark(args)
+    processed = successful + failed
+
+    print()
+    print(f"Configuración: motor={args.engine}, workers={args.workers}, lote={args.batch_size}, "
+          f"rendimiento={args.performance}, reutilizar sesión={not args.no_reuse}")
+    print(f"Fichas: {processed}/{args.fichas} (exitosas {successful}, fallidas {failed})")
+    print(f"Tiempo total: {elapsed:.2f}s, peticiones al servidor: {requests}")
+    if elapsed > 0:
+        print(f"Rendimiento: {successful / elapsed * 60:.1f} fichas/minuto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark de analyze_page_elements: script único frente al análisis elemento por elemento.
+
+Abre Firefox contra el Sofia Plus simulado (mock_sofia.py), entra hasta el
+formulario de 'Generar Reporte de Inscripción' y mide, dentro del iframe del
+reporte, cuántos comandos WebDriver y cuánto tiempo toma cada variante.
+
+Uso:
+    python benchmarks/bench_page_analysis.py --runs 10 --performance
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import CommandRecorder, SenaAutomation, SessionCookieStore
+from mock_sofia import MockSofiaServer
+
+
+def measure(automation, method, runs):
+    """Devuelve (tiempos en segundos, comandos WebDriver por ejecución)"""
+    recorder = CommandRecorder.shared()
+    times = []
+    commands = []
+    for _ in range(runs):
+        automation.switch_to_contenido()
+        recorder.reset()
+        start = time.perf_counter()
+        method()
+        times.append(time.perf_counter() - start)
+        # switch_to_contenido no se cuenta: el reset ocurre después
+        commands.append(recorder.total['comandos'])
+    return times, commands
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de analyze_page_elements")
+    parser.add_argument("--runs", type=int, default=5, help="Ejecuciones por variante")
+    parser.add_argument("--performance", action="store_true", help="Perfil de rendimiento de Firefox")
+    args = parser.parse_args()
+
+    server = MockSofiaServer().start()
+    work_dir = tempfile.mkdtemp(prefix="bench_analisis_")
+    SessionCookieStore._shared = SessionCookieStore(cookie_file=os.path.join(work_dir, "session_cookies.json"))
+
+    automation = SenaAutomation(performance_mode=args.performance, record_commands=True)
+    automation.base_url = server.base_url
+    automation.output_dir = work_dir
+    automation.download_dir = os.path.join(work_dir, "descargas")
+    try:
+        if not automation.start_session():
+            print("No se pudo llegar al formulario del reporte en el servidor simulado")
+            return
+        results = {
+            "legacy (elemento por elemento)": measure(automation, automation.analyze_page_elements_legacy, args.runs),
+            "script único": measure(automation, automation.analyze_page_elements, args.runs),
+        }
+    finally:
+        automation.close_driver()
+        server.stop()
+
+    print()
+    for label, (times, commands) in results.items():
+        print(f"{label}:")
+        print(f"  Comandos WebDriver: {statistics.mean(commands):.0f} por análisis")
+        print(f"  Tiempo: media {statistics.mean(times) * 1000:.1f} ms, "
+              f"mediana {statistics.median(times) * 1000:.1f} ms")
+
+    (legacy_times, legacy_commands), (script_times, script_commands) = results.values()
+    print()
+    print(f"Reducción de comandos: {statistics.mean(legacy_commands) / max(statistics.mean(script_commands), 1):.1f}x")
+    print(f"Aceleración: {statistics.mean(legacy_times) / statistics.mean(script_times):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,2389 @@
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import Select
 import time
 import os
-from selenium.webdriver.common.action_chains import ActionChains
 import logging
+import argparse
+import importlib
 from datetime import datetime
 from pathlib import Path
-from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
-from selenium.webdriver.firefox.options import Options
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
+import queue
+import json
+import re
+import sys
+import heapq
+import random
+import hashlib
+from collections import deque
+import shutil
+import functools
+import gzip
+import html
+import csv
+import select
+import socket
+import ctypes
+import ctypes.util
+import sqlite3
+import unicodedata
+from contextlib import closing
+import http.client
+from html.parser import HTMLParser
+from http.cookies import SimpleCookie
+from urllib.parse import urljoin, urlsplit, urlencode
+
+
+class LazyImport:
+    """Importa un módulo (o un atributo del módulo) recién en el primer uso.
+
+    pandas, selenium y tkinter tardan en cargarse; con este proxy la CLI no
+    importa tkinter y nadie paga selenium o pandas hasta que los necesita.
+    """
+
+    def __init__(self, module, attribute=None):
+        self._module = module
+        self._attribute = attribute
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            target = importlib.import_module(self._module)
+            if self._attribute:
+                target = getattr(target, self._attribute)
+            self._target = target
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+
+pd = LazyImport("pandas")
+webdriver = LazyImport("selenium.webdriver")
+By = LazyImport("selenium.webdriver.common.by", "By")
+WebDriverWait = LazyImport("selenium.webdriver.support.ui", "WebDriverWait")
+EC = LazyImport("selenium.webdriver.support.expected_conditions")
+Select = LazyImport("selenium.webdriver.support.ui", "Select")
+ActionChains = LazyImport("selenium.webdriver.common.action_chains", "ActionChains")
+FirefoxProfile = LazyImport("selenium.webdriver.firefox.firefox_profile", "FirefoxProfile")
+Options = LazyImport("selenium.webdriver.firefox.options", "Options")
+tk = LazyImport("tkinter")
+ttk = LazyImport("tkinter.ttk")
+filedialog = LazyImport("tkinter.filedialog")
+messagebox = LazyImport("tkinter.messagebox")
+scrolledtext = LazyImport("tkinter.scrolledtext")
+
+
+class ProgressAggregator:
+    """Acumula el progreso de todos los workers y lo reporta con progress_callback(current, total, successful, failed)"""
+
+    def __init__(self, total, progress_callback=None):
+        self.total = total
+        self.progress_callback = progress_callback
+        self.processed = 0
+        self.successful = 0
+        self.failed = 0
+        self.failure_kinds = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.progress_callback:
+            self.progress_callback(self.processed, self.total, self.successful, self.failed)
+
+    def record(self, ok, failure_kind=None):
+        # El callback se llama dentro del lock para que el progreso nunca retroceda
+        with self.lock:
+            self.processed += 1
+            if ok:
+                self.successful += 1
+            else:
+                self.failed += 1
+                kind = failure_kind or FailureKind.DESCONOCIDA
+                self.failure_kinds[kind] = self.failure_kinds.get(kind, 0) + 1
+            if self.progress_callback:
+                self.progress_callback(self.processed, self.total, self.successful, self.failed)
+
+
+class FailureKind:
+    """Tipos de falla de una ficha y cuáles vale la pena reintentar"""
+
+    LOGIN = "login_fallido"
+    TIMEOUT = "timeout_elemento"
+    IFRAME_OBSOLETO = "iframe_obsoleto"
+    ERROR_SERVIDOR = "error_servidor"
+    FICHA_NO_ENCONTRADA = "ficha_no_encontrada"
+    DESCONOCIDA = "desconocida"
+
+    RETRYABLE = {LOGIN, TIMEOUT, IFRAME_OBSOLETO, ERROR_SERVIDOR, DESCONOCIDA}
+
+    SERVER_ERROR_MARKERS = (
+        "http status 500", "error 500", "internal server error", "error interno",
+        "viewexpiredexception", "service unavailable", "error 503", "bad gateway"
+    )
+
+    @classmethod
+    def from_exception(cls, error):
+        """Clasifica una excepción de Selenium por el nombre de su clase (sin importar selenium.common)"""
+        name = type(error).__name__
+        message = str(error).lower()
+        if name in ("StaleElementReferenceException", "NoSuchFrameException") or "browsing context" in message:
+            return cls.IFRAME_OBSOLETO
+        if name in ("TimeoutException", "NoSuchElementException", "ElementNotInteractableException",
+                    "ElementClickInterceptedException"):
+            return cls.TIMEOUT
+        if name == "SessionExpiredError":
+            return cls.LOGIN
+        if any(marker in message for marker in cls.SERVER_ERROR_MARKERS):
+            return cls.ERROR_SERVIDOR
+        return cls.DESCONOCIDA
+
+
+class RetryScheduler:
+    """Cola compartida de fichas con reintentos diferidos (backoff exponencial con jitter).
+
+    get() entrega primero las fichas nuevas y luego los reintentos cuyo turno
+    llegó; termina (devuelve None) cuando no queda nada pendiente ni en curso.
+    """
+
+    def __init__(self, items, max_attempts=3, base_delay=30, max_delay=600):
+        self.ready = deque(items)
+        self.deferred = []
+        self.attempts = {}
+        self.in_flight = 0
+        self.active = set()
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sequence = 0
+        self.condition = threading.Condition()
+
+    def get(self, stop_event=None):
+        with self.condition:
+            while True:
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                if self.ready:
+                    return self.take(self.ready.popleft())
+                now = time.monotonic()
+                if self.deferred and self.deferred[0][0] <= now:
+                    return self.take(heapq.heappop(self.deferred)[2])
+                if not self.deferred and self.in_flight == 0:
+                    return None
+                timeout = self.deferred[0][0] - now if self.deferred else 1.0
+                # Despertar al menos cada segundo para revisar stop_event
+                self.condition.wait(min(timeout, 1.0))
+
+    def get_batch(self, stop_event=None, size=1):
+        """Como get(), pero entrega hasta size fichas listas de una vez (modo lote); [] al terminar"""
+        first = self.get(stop_event)
+        if first is None:
+            return []
+        items = [first]
+        with self.condition:
+            now = time.monotonic()
+            while len(items) < size:
+                if self.ready:
+                    items.append(self.take(self.ready.popleft()))
+                elif self.deferred and self.deferred[0][0] <= now:
+                    items.append(self.take(heapq.heappop(self.deferred)[2]))
+                else:
+                    break
+        return items
+
+    def take(self, item):
+        """Marca la ficha como en curso (se llama con el lock tomado)"""
+        self.in_flight += 1
+        self.active.add(item[0])
+        return item
+
+    def in_progress(self, item):
+        with self.condition:
+            return item[0] in self.active
+
+    def complete(self, item):
+        with self.condition:
+            if item[0] not in self.active:
+                return
+            self.active.discard(item[0])
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def release(self, items):
+        """Da por terminadas las fichas que sigan en curso; idempotente, para usar en un finally"""
+        for item in items:
+            self.complete(item)
+
+    def retry_later(self, item):
+        """Programa un reintento; devuelve el retraso en segundos o None si ya se agotaron los intentos"""
+        with self.condition:
+            self.active.discard(item[0])
+            self.in_flight -= 1
+            attempt = self.attempts.get(item[0], 0) + 1
+            self.attempts[item[0]] = attempt
+            if attempt >= self.max_attempts:
+                self.condition.notify_all()
+                return None
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+            delay = random.uniform(delay / 2, delay)
+            self.sequence += 1
+            heapq.heappush(self.deferred, (time.monotonic() + delay, self.sequence, item))
+            self.condition.notify_all()
+            return delay
+
+
+class RunJournal:
+    """Diario append-only (JSON lines con fsync) del estado de cada ficha de un archivo de entrada.
+
+    Permite reanudar una ejecución interrumpida saltando las fichas completadas.
+    Cada línea es un evento; al cargar, el último evento de cada ficha manda.
+    """
+
+    PENDIENTE = "pendiente"
+    EN_PROCESO = "en_proceso"
+    COMPLETADA = "completada"
+    FALLIDA = "fallida"
+
+    def __init__(self, input_path, journal_dir=os.path.join("logs", "journal")):
+        input_path = os.path.abspath(input_path)
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        digest = hashlib.sha1(input_path.encode('utf-8')).hexdigest()[:8]
+        self.path = os.path.join(journal_dir, f"{stem}_{digest}.jsonl")
+        self.lock = threading.Lock()
+        self.file = None
+
+    def load(self):
+        """Devuelve {ficha: último evento}; ignora una última línea truncada por un corte"""
+        states = {}
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return states
+        for line in data.splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            states[event['ficha']] = event
+        return states
+
+    def completed_fichas(self):
+        return {ficha for ficha, event in self.load().items() if event['estado'] == self.COMPLETADA}
+
+    def open(self, resume=False):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        if resume and self.file.tell() > 0:
+            # Un corte a mitad de escritura deja la última línea sin '\n'; se cierra para no pegarle eventos nuevos
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+            if torn:
+                self.file.write("\n")
+                self.file.flush()
+
+    def write_events(self, events):
+        lines = "".join(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + "\n" for event in events)
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(lines)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def record(self, ficha, estado, motivo=None, duracion=None):
+        event = {'ficha': str(ficha), 'estado': estado, 'ts': round(time.time(), 3)}
+        if motivo:
+            event['motivo'] = motivo
+        if duracion is not None:
+            event['duracion'] = round(duracion, 3)
+        self.write_events([event])
+
+    def record_pending(self, fichas):
+        """Registra todas las fichas como pendientes con un solo fsync"""
+        ts = round(time.time(), 3)
+        self.write_events({'ficha': str(ficha), 'estado': self.PENDIENTE, 'ts': ts} for ficha in fichas)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class FichaParseResult:
+    """Fichas leídas de un archivo; la GUI y run_automation comparten el mismo resultado"""
+
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature
+        self.fichas = []
+        self.total_rows = 0
+        self.blank_rows = 0
+        self.duplicates = 0
+        self.invalid_count = 0
+        self.invalid_samples = []
+        self.header = None
+
+    def matches(self, path):
+        """Indica si el resultado sigue correspondiendo al archivo en disco"""
+        try:
+            return self.path == path and self.signature == FichaIngestion.file_signature(path)
+        except OSError:
+            return False
+
+    def summary(self):
+        text = f"{len(self.fichas)} fichas válidas de {self.total_rows} filas"
+        details = []
+        if self.duplicates:
+            details.append(f"{self.duplicates} duplicadas")
+        if self.blank_rows:
+            details.append(f"{self.blank_rows} vacías")
+        if self.invalid_count:
+            details.append(f"{self.invalid_count} inválidas")
+        if details:
+            text += f" ({', '.join(details)})"
+        return text
+
+
+class FichaIngestion:
+    """Lee la primera columna de un Excel, CSV o lista de texto sin cargar todo el archivo.
+
+    Las filas se recorren de forma perezosa y se normalizan por bloques con pandas:
+    '2345678.0' pasa a '2345678', se descartan vacías y duplicadas y se valida el
+    formato. Si el primer valor no es una ficha se toma como encabezado.
+    """
+
+    FICHA_PATTERN = r"\d{4,12}"
+    CHUNK_SIZE = 50000
+    MAX_INVALID_SAMPLES = 20
+    EXCEL_STREAMING_EXTENSIONS = ('.xlsx', '.xlsm')
+    TEXT_EXTENSIONS = ('.csv', '.tsv', '.txt')
+    BLANK_VALUES = ("", "nan", "NaN", "None", "NaT", "<NA>")
+
+    @staticmethod
+    def file_signature(path):
+        stat = os.stat(path)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    @classmethod
+    def iter_first_column(cls, path):
+        """Genera los valores de la primera columna, fila por fila"""
+        extension = Path(path).suffix.lower()
+        if extension in cls.EXCEL_STREAMING_EXTENSIONS:
+            from openpyxl import load_workbook
+            workbook = load_workbook(path, read_only=True, data_only=True)
+            try:
+                for row in workbook.active.iter_rows(values_only=True):
+                    yield row[0] if row else None
+            finally:
+                workbook.close()
+        elif extension in cls.TEXT_EXTENSIONS:
+            with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+                sample = f.read(4096)
+                f.seek(0)
+                try:
+                    dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+                except csv.Error:
+                    dialect = csv.excel
+                for row in csv.reader(f, dialect):
+                    yield row[0] if row else None
+        else:
+            # .xls y otros formatos: pandas lee solo la primera columna
+            column = pd.read_excel(path, usecols=[0], header=None, dtype=object).iloc[:, 0]
+            yield from column
+
+    @classmethod
+    def iter_chunks(cls, path):
+        chunk = []
+        for value in cls.iter_first_column(path):
+            chunk.append(value)
+            if len(chunk) >= cls.CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @classmethod
+    def parse(cls, path):
+        """Lee y valida las fichas de path; devuelve un FichaParseResult"""
+        result = FichaParseResult(path, cls.file_signature(path))
+        seen = set()
+        offset = 0
+        header_checked = False
+
+        for chunk in cls.iter_chunks(path):
+            raw = pd.Series(chunk, dtype=object)
+            text = raw.astype(str).str.strip().str.replace(r"^(\d+)\.0*$", r"\1", regex=True)
+            blank = raw.isna() | text.isin(cls.BLANK_VALUES)
+            valid = ~blank & text.str.fullmatch(cls.FICHA_PATTERN).fillna(False).astype(bool)
+
+            if not header_checked:
+                filled = (~blank).to_numpy().nonzero()[0]
+                if len(filled):
+                    header_checked = True
+                    first = filled[0]
+                    if not valid.iloc[first]:
+                        result.header = text.iloc[first]
+                        blank.iloc[first] = True
+
+            result.total_rows += len(raw)
+            result.blank_rows += int(blank.sum())
+
+            invalid = text[~blank & ~valid]
+            result.invalid_count += len(invalid)
+            room = cls.MAX_INVALID_SAMPLES - len(result.invalid_samples)
+            if room > 0:
+                result.invalid_samples.extend(
+                    (offset + int(index) + 1, value) for index, value in invalid.head(room).items()
+                )
+
+            candidates = text[valid]
+            unique = candidates[~candidates.duplicated() & ~candidates.isin(seen)]
+            result.duplicates += len(candidates) - len(unique)
+            seen.update(unique)
+            result.fichas.extend(unique.tolist())
+            offset += len(raw)
+
+        if result.header is not None:
+            result.total_rows -= 1
+            result.blank_rows -= 1
+        return result
+
+
+class WorkerLoggerAdapter(logging.LoggerAdapter):
+    """Prefija los mensajes de log con el número de worker"""
+
+    def process(self, msg, kwargs):
+        return f"[Worker {self.extra['worker_id']}] {msg}", kwargs
+
+
+class Telemetry:
+    """Spans de tiempo por fase: tiempo total, tiempo en esperas y comandos WebDriver, por ficha.
+
+    Cada hilo (worker) lleva sus propios contadores; un span guarda la diferencia
+    entre su inicio y su fin, así que los spans anidados se suman al padre. Los
+    spans terminados se escriben como JSON lines y al exportar se generan un
+    resumen CSV (p50/p95/p99) y un archivo de texto para Prometheus.
+    """
+
+    PERCENTILES = (0.5, 0.95, 0.99)
+    PROMETHEUS_FILE = "sena_automation.prom"
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, output_dir=os.path.join("logs", "telemetry")):
+        self.output_dir = output_dir
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.phases = {}
+        self.file = None
+        self.run_id = None
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def thread_state(self):
+        state = self.local
+        if not hasattr(state, 'commands'):
+            state.commands = 0
+            state.wait = 0.0
+            state.ficha = None
+        return state
+
+    def set_ficha(self, ficha):
+        """Asocia los spans siguientes de este hilo a una ficha (o a un lote)"""
+        self.thread_state().ficha = None if ficha is None else str(ficha)
+
+    def add_wait(self, seconds):
+        self.thread_state().wait += seconds
+
+    def instrument(self, driver):
+        """Cuenta los comandos WebDriver envolviendo driver.execute (atributo de la instancia)"""
+        execute = driver.execute
+
+        def counted_execute(driver_command, params=None):
+            self.thread_state().commands += 1
+            return execute(driver_command, params)
+
+        driver.execute = counted_execute
+        return driver
+
+    def span(self, name):
+        return TelemetrySpan(self, name)
+
+    def finish(self, span):
+        state = self.thread_state()
+        record = {
+            'fase': span.name,
+            'ficha': state.ficha,
+            'hilo': threading.current_thread().name,
+            'inicio': round(span.started_at, 3),
+            'duracion': round(time.monotonic() - span.started, 4),
+            'espera': round(state.wait - span.wait, 4),
+            'comandos': state.commands - span.commands,
+            'ok': span.ok,
+        }
+        with self.lock:
+            phase = self.phases.setdefault(span.name, {'duraciones': [], 'espera': 0.0, 'comandos': 0, 'errores': 0})
+            phase['duraciones'].append(record['duracion'])
+            phase['espera'] += record['espera']
+            phase['comandos'] += record['comandos']
+            if not span.ok:
+                phase['errores'] += 1
+            if self.file is not None:
+                self.file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+
+    def open(self):
+        """Empieza una ejecución nueva: reinicia los acumulados y abre el archivo de spans"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        with self.lock:
+            self.phases = {}
+            self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.file = open(os.path.join(self.output_dir, f"spans_{self.run_id}.jsonl"), 'w', encoding='utf-8')
+
+    @staticmethod
+    def percentile(sorted_values, q):
+        """Percentil por rango más cercano sobre una lista ordenada"""
+        if not sorted_values:
+            return 0.0
+        rank = max(1, -(-int(q * 1000) * len(sorted_values) // 1000))
+        return sorted_values[min(rank, len(sorted_values)) - 1]
+
+    def summary(self):
+        """Filas del resumen por fase, de la que más tiempo consume a la que menos"""
+        with self.lock:
+            phases = {name: dict(phase, duraciones=sorted(phase['duraciones'])) for name, phase in self.phases.items()}
+        rows = []
+        for name, phase in phases.items():
+            durations = phase['duraciones']
+            count = len(durations)
+            row = {
+                'fase': name,
+                'cantidad': count,
+                'errores': phase['errores'],
+                'total_s': round(sum(durations), 3),
+                'media_s': round(sum(durations) / count, 4) if count else 0.0,
+            }
+            for q in self.PERCENTILES:
+                row[f"p{int(q * 100)}_s"] = self.percentile(durations, q)
+            row['espera_total_s'] = round(phase['espera'], 3)
+            row['comandos_total'] = phase['comandos']
+            row['comandos_media'] = round(phase['comandos'] / count, 2) if count else 0.0
+            rows.append(row)
+        rows.sort(key=lambda row: -row['total_s'])
+        return rows
+
+    def write_csv(self, path, rows):
+        fields = ['fase', 'cantidad', 'errores', 'total_s', 'media_s'] + \
+                 [f"p{int(q * 100)}_s" for q in self.PERCENTILES] + \
+                 ['espera_total_s', 'comandos_total', 'comandos_media']
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def write_prometheus(self, path, rows):
+        """Formato de texto de Prometheus (para el textfile collector de node_exporter), escrito de forma atómica"""
+        lines = [
+            "# HELP sena_fase_duracion_segundos Duración de cada fase de la automatización.",
+            "# TYPE sena_fase_duracion_segundos summary",
+        ]
+        for row in rows:
+            label = row['fase'].replace('\\', '\\\\').replace('"', '\\"')
+            for q in self.PERCENTILES:
+                lines.append(f'sena_fase_duracion_segundos{{fase="{label}",quantile="{q}"}} {row[f"p{int(q * 100)}_s"]}')
+            lines.append(f'sena_fase_duracion_segundos_sum{{fase="{label}"}} {row["total_s"]}')
+            lines.append(f'sena_fase_duracion_segundos_count{{fase="{label}"}} {row["cantidad"]}')
+        for metric, key, help_text in (
+            ("sena_fase_espera_segundos_total", 'espera_total_s', "Tiempo en esperas dentro de cada fase."),
+            ("sena_fase_comandos_webdriver_total", 'comandos_total', "Comandos WebDriver enviados en cada fase."),
+            ("sena_fase_errores_total", 'errores', "Fases que terminaron con error."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for row in rows:
+                label = row['fase'].replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{metric}{{fase="{label}"}} {row[key]}')
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, path)
+
+    def export(self):
+        """Cierra el archivo de spans y escribe el resumen CSV y el archivo de Prometheus; devuelve sus rutas"""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+        os.makedirs(self.output_dir, exist_ok=True)
+        run_id = self.run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        rows = self.summary()
+        csv_path = os.path.join(self.output_dir, f"resumen_{run_id}.csv")
+        prometheus_path = os.path.join(self.output_dir, self.PROMETHEUS_FILE)
+        self.write_csv(csv_path, rows)
+        self.write_prometheus(prometheus_path, rows)
+        return csv_path, prometheus_path
+
+
+class TelemetrySpan:
+    """Un span de Telemetry; se usa con 'with' y se marca ok=False si hay excepción"""
+
+    def __init__(self, telemetry, name):
+        self.telemetry = telemetry
+        self.name = name
+        self.ok = True
+
+    def __enter__(self):
+        state = self.telemetry.thread_state()
+        self.started = time.monotonic()
+        self.started_at = time.time()
+        self.commands = state.commands
+        self.wait = state.wait
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.ok = False
+        self.telemetry.finish(self)
+        return False
+
+
+class CommandRecorder:
+    """Registro opcional de cada comando WebDriver (ida y vuelta a geckodriver).
+
+    Por comando guarda el nombre, el método de SenaAutomation que lo originó,
+    la latencia y el tamaño del payload (petición + respuesta). Exporta totales
+    por ficha y por método y pilas plegadas (formato 'folded' de flamegraph.pl
+    y speedscope) con el tiempo en microsegundos.
+    """
+
+    MODULE_FILE = os.path.abspath(__file__)
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, output_dir=os.path.join("logs", "comandos")):
+        self.output_dir = output_dir
+        self.lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def reset(self):
+        with self.lock:
+            self.total = {'comandos': 0, 'latencia': 0.0, 'bytes': 0}
+            self.by_method = {}
+            self.by_ficha = {}
+            self.folded = {}
+
+    def instrument(self, driver):
+        """Envuelve driver.execute; los comandos de WebElement también pasan por ahí"""
+        execute = driver.execute
+
+        def recorded_execute(driver_command, params=None):
+            started = time.perf_counter()
+            response = None
+            try:
+                response = execute(driver_command, params)
+                return response
+            finally:
+                self.record(driver_command, time.perf_counter() - started, params, response)
+
+        driver.execute = recorded_execute
+        return driver
+
+    @classmethod
+    def caller_stack(cls):
+        """Funciones de este módulo en la pila, de la más externa a la más interna"""
+        names = []
+        frame = sys._getframe(2)
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == cls.MODULE_FILE:
+                qualname = getattr(code, 'co_qualname', code.co_name).replace("<locals>.", "")
+                # Omitir los envoltorios de driver.execute (este registro y Telemetry)
+                if not qualname.startswith(("CommandRecorder.", "Telemetry.")):
+                    names.append(qualname)
+            frame = frame.f_back
+        names.reverse()
+        return names
+
+    @staticmethod
+    def payload_size(value):
+        if value is None:
+            return 0
+        try:
+            return len(json.dumps(value, default=str))
+        except (TypeError, ValueError):
+            return 0
+
+    def record(self, command, latency, params, response):
+        stack = self.caller_stack()
+        names = [name for name in stack if name.startswith("SenaAutomation.")]
+        method = names[-1].split(".")[1] if names else (stack[-1] if stack else "<fuera de SenaAutomation>")
+        size = self.payload_size(params) + self.payload_size(response)
+        ficha = Telemetry.shared().thread_state().ficha or "<sin ficha>"
+        folded_key = ";".join([name.replace("SenaAutomation.", "") for name in stack] + [command])
+
+        with self.lock:
+            self.total['comandos'] += 1
+            self.total['latencia'] += latency
+            self.total['bytes'] += size
+
+            entry = self.by_method.setdefault(method, {'comandos': 0, 'latencia': 0.0, 'bytes': 0, 'por_comando': {}})
+            entry['comandos'] += 1
+            entry['latencia'] += latency
+            entry['bytes'] += size
+            entry['por_comando'][command] = entry['por_comando'].get(command, 0) + 1
+
+            entry = self.by_ficha.setdefault(ficha, {'comandos': 0, 'latencia': 0.0, 'bytes': 0})
+            entry['comandos'] += 1
+            entry['latencia'] += latency
+            entry['bytes'] += size
+
+            self.folded[folded_key] = self.folded.get(folded_key, 0) + int(latency * 1e6)
+
+    def export(self, run_id=None):
+        """Escribe el resumen JSON y el archivo .folded; devuelve sus rutas"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        with self.lock:
+            summary = {
+                'total': dict(self.total),
+                'por_metodo': {
+                    method: dict(entry, por_comando=dict(entry['por_comando']))
+                    for method, entry in sorted(self.by_method.items(), key=lambda item: -item[1]['comandos'])
+                },
+                'por_ficha': {ficha: dict(entry) for ficha, entry in self.by_ficha.items()},
+            }
+            folded = sorted(self.folded.items())
+
+        summary_path = os.path.join(self.output_dir, f"comandos_{run_id}.json")
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        folded_path = os.path.join(self.output_dir, f"comandos_{run_id}.folded")
+        with open(folded_path, 'w', encoding='utf-8') as f:
+            for stack, micros in folded:
+                f.write(f"{stack} {micros}\n")
+        return summary_path, folded_path
+
+
+def traced(name, fail_on_none=False):
+    """Decorador: mide la función como un span de Telemetry.shared(); un retorno False cuenta como error"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Telemetry.shared().span(name) as span:
+                result = func(*args, **kwargs)
+                span.ok = not (result is False or (fail_on_none and result is None))
+                return result
+        return wrapper
+    return decorator
+
+
+class WaitEngine:
+    """Esperas por eventos para páginas JSF/RichFaces.
+
+    Cada espera termina en cuanto se cumple su condición (documento listo, cola
+    AJAX vacía, elemento estable); los antiguos time.sleep quedan solo como tope
+    máximo. Registra cuánto duró realmente cada espera para medir el ahorro.
+    """
+
+    POLL_INTERVAL = 0.1
+
+    # Instala (una vez por documento) un contador de XHR en vuelo y revisa las
+    # colas de jQuery, RichFaces 4, A4J (RichFaces 3) y el a4j:status visible
+    PAGE_IDLE_SCRIPT = """
+        var w = window;
+        if (!w.__senaXhrHook && w.XMLHttpRequest) {
+            w.__senaXhrHook = true;
+            w.__senaPendingXhr = 0;
+            var send = w.XMLHttpRequest.prototype.send;
+            w.XMLHttpRequest.prototype.send = function () {
+                w.__senaPendingXhr++;
+                this.addEventListener('loadend', function () {
+                    w.__senaPendingXhr = Math.max(0, w.__senaPendingXhr - 1);
+                });
+                return send.apply(this, arguments);
+            };
+        }
+        if (document.readyState !== 'complete') { return false; }
+        if (w.__senaPendingXhr > 0) { return false; }
+        if (w.jQuery && w.jQuery.active > 0) { return false; }
+        try {
+            if (w.RichFaces && w.RichFaces.queue && w.RichFaces.queue.isEmpty &&
+                !w.RichFaces.queue.isEmpty()) { return false; }
+        } catch (e) {}
+        try {
+            var queues = w.A4J && w.A4J.AJAX && w.A4J.AJAX._eventQueues;
+            for (var name in (queues || {})) {
+                if (queues[name] && queues[name].getSize && queues[name].getSize() > 0) { return false; }
+            }
+        } catch (e) {}
+        var status = document.querySelector('[id$="status.start"]');
+        if (status && status.offsetParent !== null) { return false; }
+        return true;
+    """
+
+    ELEMENT_RECT_SCRIPT = """
+        var r = arguments[0].getBoundingClientRect();
+        return [r.top, r.left, r.width, r.height, arguments[0].offsetParent !== null];
+    """
+
+    # Marca el documento actual del iframe 'contenido' para detectar cuándo se reemplaza
+    MARK_REPORT_FRAME_SCRIPT = """
+        var marked = document.getElementById('contenido') || document.getElementsByName('contenido')[0];
+        try { if (marked && marked.contentWindow) { marked.contentWindow.__senaStale = true; } } catch (e) {}
+    """
+
+    REPORT_FRAME_READY_SCRIPT = """
+        var frame = document.getElementById('contenido') || document.getElementsByName('contenido')[0];
+        if (!frame) { return false; }
+        try {
+            var doc = frame.contentDocument;
+            return !!doc && !frame.contentWindow.__senaStale &&
+                   doc.readyState === 'complete' && doc.location.href !== 'about:blank';
+        } catch (e) {
+            return true;
+        }
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.driver = None
+        self.stats = {}
+
+    def attach(self, driver):
+        self.driver = driver
+
+    def until(self, name, condition, max_wait):
+        """Espera hasta que condition() sea verdadera o se agote max_wait; devuelve si se cumplió"""
+        start = time.monotonic()
+        deadline = start + max_wait
+        while True:
+            try:
+                met = bool(condition())
+            except Exception:
+                met = False
+            now = time.monotonic()
+            if met or now >= deadline:
+                break
+            time.sleep(min(self.POLL_INTERVAL, deadline - now))
+        waited = time.monotonic() - start
+        self.record(name, waited, max_wait, met)
+        Telemetry.shared().add_wait(waited)
+        return met
+
+    def page_idle(self):
+        """Documento listo y sin peticiones AJAX pendientes en el frame actual"""
+        return self.driver.execute_script(self.PAGE_IDLE_SCRIPT)
+
+    def report_frame_ready(self):
+        """El iframe 'contenido' terminó de cargar un documento nuevo (desde el contexto principal)"""
+        return self.driver.execute_script(self.REPORT_FRAME_READY_SCRIPT)
+
+    def settle(self, name, max_wait, locator=None, quiet=0.2):
+        """Espera a que la página quede inactiva durante 'quiet' segundos y, si se indica, a que el elemento esté estable"""
+        state = {'idle_since': None, 'rect': None}
+
+        def condition():
+            if not self.page_idle():
+                state['idle_since'] = None
+                return False
+            now = time.monotonic()
+            if state['idle_since'] is None:
+                state['idle_since'] = now
+            if locator is not None:
+                elements = self.driver.find_elements(*locator)
+                if not elements:
+                    return False
+                rect = self.driver.execute_script(self.ELEMENT_RECT_SCRIPT, elements[0])
+                if rect != state['rect'] or not rect[4]:
+                    state['rect'] = rect
+                    return False
+            return now - state['idle_since'] >= quiet
+
+        return self.until(name, condition, max_wait)
+
+    def element_stable(self, name, element, max_wait):
+        """Espera a que el elemento sea visible y su posición no cambie entre dos sondeos (p. ej. tras un scroll)"""
+        state = {'rect': None}
+
+        def condition():
+            rect = self.driver.execute_script(self.ELEMENT_RECT_SCRIPT, element)
+            stable = rect == state['rect'] and rect[4]
+            state['rect'] = rect
+            return stable
+
+        return self.until(name, condition, max_wait)
+
+    def record(self, name, waited, budget, met):
+        step = self.stats.setdefault(name, {'count': 0, 'waited': 0.0, 'budget': 0.0, 'timeouts': 0})
+        step['count'] += 1
+        step['waited'] += waited
+        step['budget'] += budget
+        if not met:
+            step['timeouts'] += 1
+
+    def log_summary(self):
+        """Escribe en el log el tiempo real de cada espera frente al sleep fijo que reemplazó"""
+        if not self.stats:
+            return
+        total_waited = sum(step['waited'] for step in self.stats.values())
+        total_budget = sum(step['budget'] for step in self.stats.values())
+        self.logger.info("⏱️ Resumen de esperas (real / tope fijo):")
+        for name, step in sorted(self.stats.items(), key=lambda item: -item[1]['waited']):
+            self.logger.info(
+                f"  {name}: {step['count']}x, {step['waited']:.1f}s / {step['budget']:.1f}s, "
+                f"agotadas: {step['timeouts']}"
+            )
+        self.logger.info(
+            f"⏱️ Total esperado: {total_waited:.1f}s de {total_budget:.1f}s "
+            f"(ahorro: {total_budget - total_waited:.1f}s)"
+        )
+
+
+class DumpStore:
+    """Almacén acotado de dumps HTML por paso.
+
+    Cada entrada se comprime por separado (gzip, o zstd si está instalado) y se
+    agrega al segmento actual; los segmentos concatenados se leen con zcat/zstdcat.
+    Las capturas idénticas (mismo hash de contenido) no se vuelven a escribir y los
+    éxitos se muestrean 1 de cada sample_every (las fallas siempre se guardan).
+    Cada ejecución y cada worker escriben sus propios segmentos, pero el tope
+    max_total_bytes vale para todo dump_dir: al crear el almacén y tras cada
+    escritura se borran los segmentos más antiguos de cualquier ejecución, y los
+    índices que ya no tienen segmentos. Un índice JSON lines permite ubicar una
+    ficha o un paso sin descomprimir el archivo.
+    """
+
+    SEGMENT_EXTENSIONS = (".html.gz", ".html.zst")
+    INDEX_SUFFIX = ".index.jsonl"
+
+    def __init__(self, dump_dir, name, sample_every=10, max_segment_bytes=16 * 1024 * 1024,
+                 max_total_bytes=256 * 1024 * 1024, compression="gzip"):
+        self.dump_dir = dump_dir
+        self.name = name
+        self.sample_every = sample_every
+        self.max_segment_bytes = max_segment_bytes
+        self.max_total_bytes = max_total_bytes
+        self.compressor = None
+        if compression == "zstd":
+            try:
+                import zstandard
+                self.compressor = zstandard.ZstdCompressor(level=6)
+            except ImportError:
+                compression = "gzip"
+        self.compression = compression
+        self.extension = ".html.zst" if compression == "zstd" else ".html.gz"
+        self.index_path = os.path.join(dump_dir, f"dumps_{name}{self.INDEX_SUFFIX}")
+        self.lock = threading.Lock()
+        self.success_count = 0
+        self.segment = 0
+        self.segment_size = 0
+        self.hashes = {}
+        # Lo que dejaron ejecuciones anteriores también cuenta para el tope
+        self.rotate()
+
+    def should_capture(self, failure=False):
+        """Las fallas siempre se capturan; los éxitos, 1 de cada sample_every (0 = nunca)"""
+        if failure:
+            return True
+        if not self.sample_every:
+            return False
+        with self.lock:
+            self.success_count += 1
+            return (self.success_count - 1) % self.sample_every == 0
+
+    def segment_path(self, segment):
+        return os.path.join(self.dump_dir, f"dumps_{self.name}.{segment:03d}{self.extension}")
+
+    def compress(self, data):
+        if self.compressor is not None:
+            return self.compressor.compress(data)
+        return gzip.compress(data, compresslevel=5)
+
+    def add(self, content, ficha=None, paso="", failure=False, content_hash=None):
+        """Guarda una entrada (o solo la referencia si ya existe); devuelve la línea del índice"""
+        data = content.encode('utf-8')
+        content_hash = content_hash or hashlib.sha1(data).hexdigest()
+        entry = {
+            'ts': round(time.time(), 3),
+            'ficha': ficha,
+            'paso': paso,
+            'falla': failure,
+            'hash': content_hash,
+        }
+        with self.lock:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            previous = self.hashes.get(content_hash)
+            if previous is not None and not os.path.exists(os.path.join(self.dump_dir, previous['archivo'])):
+                # Otro almacén rotó el segmento donde estaba
+                previous = None
+            if previous is not None:
+                entry.update(previous, duplicado=True)
+            else:
+                blob = self.compress(data)
+                if self.segment_size and self.segment_size + len(blob) > self.max_segment_bytes:
+                    self.segment += 1
+                    self.segment_size = 0
+                path = self.segment_path(self.segment)
+                with open(path, 'ab') as f:
+                    offset = f.tell()
+                    f.write(blob)
+                self.segment_size = offset + len(blob)
+                location = {'archivo': os.path.basename(path), 'offset': offset, 'longitud': len(blob)}
+                self.hashes[content_hash] = location
+                entry.update(location, bytes_html=len(data))
+                self.rotate()
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n")
+        return entry
+
+    def directory_segments(self):
+        """Segmentos de todas las ejecuciones en dump_dir como (mtime, ruta, tamaño), del más antiguo al más nuevo"""
+        try:
+            names = os.listdir(self.dump_dir)
+        except OSError:
+            return []
+        segments = []
+        for name in names:
+            if not (name.startswith("dumps_") and name.endswith(self.SEGMENT_EXTENSIONS)):
+                continue
+            path = os.path.join(self.dump_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            segments.append((stat.st_mtime, path, stat.st_size))
+        segments.sort()
+        return segments
+
+    def rotate(self):
+        """Borra los segmentos más antiguos de todo dump_dir mientras el total supere max_total_bytes"""
+        current = self.segment_path(self.segment)
+        segments = self.directory_segments()
+        total = sum(size for _, _, size in segments)
+        for _, path, size in segments:
+            if total <= self.max_total_bytes:
+                break
+            if path == current:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self.remove_orphan_indexes({os.path.basename(path) for _, path, _ in segments if os.path.exists(path)})
+
+    def remove_orphan_indexes(self, segment_names):
+        """Borra los índices de otras ejecuciones cuyos segmentos ya se rotaron todos"""
+        try:
+            names = os.listdir(self.dump_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.dump_dir, name)
+            if not name.endswith(self.INDEX_SUFFIX) or path == self.index_path:
+                continue
+            prefix = name[:-len(self.INDEX_SUFFIX)] + "."
+            if not any(segment.startswith(prefix) for segment in segment_names):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def find(self, ficha=None, paso=None):
+        """Entradas del índice que coinciden con la ficha y/o el paso"""
+        matches = []
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if ficha is not None and entry.get('ficha') != str(ficha):
+                        continue
+                    if paso is not None and entry.get('paso') != paso:
+                        continue
+                    matches.append(entry)
+        except OSError:
+            pass
+        return matches
+
+    def read(self, entry):
+        """Descomprime una entrada del índice; None si su segmento ya se rotó"""
+        path = os.path.join(self.dump_dir, entry['archivo'])
+        try:
+            with open(path, 'rb') as f:
+                f.seek(entry['offset'])
+                blob = f.read(entry['longitud'])
+        except OSError:
+            return None
+        if path.endswith(".zst"):
+            import zstandard
+            return zstandard.ZstdDecompressor().decompress(blob).decode('utf-8')
+        return gzip.decompress(blob).decode('utf-8')
+
+
+class FramePathCache:
+    """Cache de rutas de iframes por objetivo lógico (p. ej. 'opcionesInscritos select').
+
+    Una ruta es la lista de índices de iframe desde el contexto principal. Al
+    reutilizarla se valida con una sola comprobación barata y solo se repite el
+    recorrido completo de iframes si esa comprobación falla.
+    """
+
+    def __init__(self):
+        self.paths = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        return self.paths.get(key)
+
+    def store(self, key, path):
+        self.paths[key] = list(path)
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.paths.clear()
+        else:
+            self.paths.pop(key, None)
+
+
+class SelectorRegistry:
+    """Registro compartido de estrategias de selector con estadísticas de acierto.
+
+    Cada objetivo (p. ej. 'consultar_aspirantes') recuerda qué estrategia ganó y
+    cuánto tardó; las estrategias se reordenan por tasa de éxito y latencia, y
+    las estadísticas se guardan en disco para la siguiente ejecución. Los
+    conteos decaen con cada intento, así que tras un cambio del sitio una
+    estrategia que empieza a fallar baja en pocas fichas.
+    """
+
+    DECAY = 0.8  # peso de las observaciones anteriores; ventana efectiva de ~5 intentos
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, stats_file=os.path.join("logs", "selector_stats.json")):
+        self.stats_file = stats_file
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.load()
+
+    @classmethod
+    def shared(cls):
+        """Instancia única compartida por todos los workers del proceso"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def strategy_key(strategy):
+        return "|".join(part for part in strategy if isinstance(part, str))
+
+    def load(self):
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                self.stats = json.load(f)
+        except (OSError, ValueError):
+            self.stats = {}
+        # Estadísticas guardadas sin decaimiento: se llevan al tope de la ventana
+        limit = 1 / (1 - self.DECAY)
+        for target_stats in self.stats.values():
+            for entry in target_stats.values():
+                if entry['tries'] > limit:
+                    self.decay(entry, limit / entry['tries'])
+
+    @staticmethod
+    def decay(entry, factor):
+        for field in ('tries', 'wins', 'win_time'):
+            entry[field] *= factor
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.stats, indent=2, ensure_ascii=False)
+        os.makedirs(os.path.dirname(self.stats_file) or ".", exist_ok=True)
+        tmp_file = f"{self.stats_file}.{threading.get_ident()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_file, self.stats_file)
+
+    def ordered(self, target, strategies):
+        """Devuelve las estrategias ordenadas por tasa de éxito (suavizada) y luego por latencia media"""
+        with self.lock:
+            target_stats = dict(self.stats.get(target, {}))
+
+        def score(strategy):
+            entry = target_stats.get(self.strategy_key(strategy))
+            if not entry:
+                return (-0.5, 0.0)
+            success_rate = (entry['wins'] + 1) / (entry['tries'] + 2)
+            mean_latency = entry['win_time'] / entry['wins'] if entry['wins'] else float('inf')
+            return (-success_rate, mean_latency)
+
+        # sorted es estable: sin estadísticas se respeta el orden original
+        return sorted(strategies, key=score)
+
+    def record(self, target, strategy, ok, elapsed):
+        with self.lock:
+            entry = self.stats.setdefault(target, {}).setdefault(
+                self.strategy_key(strategy), {'tries': 0, 'wins': 0, 'win_time': 0.0}
+            )
+            self.decay(entry, self.DECAY)
+            entry['tries'] += 1
+            if ok:
+                entry['wins'] += 1
+                entry['win_time'] += elapsed
+
+    def first_success(self, target, strategies, attempt):
+        """Prueba las estrategias en orden de ranking y devuelve el primer resultado verdadero de attempt(strategy)"""
+        for strategy in self.ordered(target, strategies):
+            start = time.monotonic()
+            try:
+                result = attempt(strategy)
+            except Exception:
+                result = None
+            self.record(target, strategy, bool(result), time.monotonic() - start)
+            if result:
+                return result
+        return None
+
+
+class SessionCookieStore:
+    """Cookies del login JOSSO guardadas en disco con vencimiento.
+
+    Permite que los workers y las ejecuciones siguientes inyecten el login en
+    un navegador o motor HTTP nuevo y solo hagan el login JOSSO completo cuando
+    las cookies ya no sirven. Solo se comparten las cookies de JOSSO: la sesión
+    de la aplicación (JSESSIONID, con su ViewState y la selección de fichas) es
+    propia de cada worker, que la obtiene del servidor y elige su rol.
+    login_lock evita que varios workers hagan login a la vez.
+    """
+
+    SSO_COOKIE_MARKER = "josso"
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cookie_file=os.path.join("logs", "session_cookies.json"), ttl=3600):
+        self.cookie_file = cookie_file
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.login_lock = threading.RLock()
+
+    @classmethod
+    def shared(cls):
+        """Instancia única compartida por todos los workers del proceso"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def sso_cookies(cls, cookies):
+        """Filtra las cookies del login JOSSO (con el formato de Selenium)"""
+        return [cookie for cookie in cookies or [] if cls.SSO_COOKIE_MARKER in cookie.get('name', '').lower()]
+
+    def load(self):
+        """Devuelve las cookies de JOSSO guardadas o None si no existen o ya vencieron"""
+        with self.lock:
+            try:
+                with open(self.cookie_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return None
+        if data.get('expires_at', 0) <= time.time():
+            return None
+        # Los archivos anteriores guardaban todo el jar, JSESSIONID incluido
+        return self.sso_cookies(data.get('cookies')) or None
+
+    def save(self, cookies):
+        """Guarda solo las cookies de JOSSO; devuelve False si no había ninguna"""
+        cookies = self.sso_cookies(cookies)
+        if not cookies:
+            return False
+        data = json.dumps({
+            'saved_at': time.time(),
+            'expires_at': time.time() + self.ttl,
+            'cookies': cookies
+        })
+        with self.lock:
+            os.makedirs(os.path.dirname(self.cookie_file) or ".", exist_ok=True)
+            tmp_file = f"{self.cookie_file}.tmp"
+            # Solo el usuario actual puede leer las cookies de sesión
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_file, self.cookie_file)
+        return True
+
+    def invalidate(self):
+        with self.lock:
+            try:
+                os.remove(self.cookie_file)
+            except OSError:
+                pass
+
+
+class HttpConnectionPool:
+    """Pool de conexiones HTTP keep-alive por host, compartible entre hilos"""
+
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, max_per_host=4, timeout=30):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, key):
+        """Devuelve (conexión, reutilizada); descarta las conexiones ociosas que el servidor ya cerró"""
+        while True:
+            with self.lock:
+                connections = self.idle.get(key)
+                connection = connections.pop() if connections else None
+            if connection is None:
+                break
+            if self.is_idle_alive(connection):
+                return connection, True
+            connection.close()
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout), False
+        return http.client.HTTPConnection(host, port, timeout=self.timeout), False
+
+    @staticmethod
+    def is_idle_alive(connection):
+        """Una conexión ociosa sirve si su socket no es legible: legible significa EOF o datos inesperados"""
+        if connection.sock is None:
+            return False
+        try:
+            readable, _, _ = select.select([connection.sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def can_retry(self, method, reused, sent, error):
+        """Solo se reintenta si una conexión reutilizada resultó cerrada por el servidor.
+
+        Si falló al enviar, el servidor no recibió la petición completa; si ya se
+        había enviado, solo se repiten los métodos idempotentes. Un timeout nunca
+        se reintenta: el servidor pudo haber procesado un POST (Agregar, Generar).
+        """
+        if not reused or isinstance(error, socket.timeout):
+            return False
+        if not sent:
+            return True
+        return method.upper() in self.IDEMPOTENT_METHODS and isinstance(
+            error, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+        )
+
+    def release(self, key, connection):
+        with self.lock:
+            connections = self.idle.setdefault(key, [])
+            if len(connections) < self.max_per_host:
+                connections.append(connection)
+                return
+        connection.close()
+
+    def request(self, method, url, body=None, headers=None):
+        """Envía la petición y devuelve un PooledResponse; reintenta una vez solo según can_retry"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        for attempt in range(2):
+            connection, reused = self.acquire(key)
+            sent = False
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                sent = True
+                return PooledResponse(self, key, connection, connection.getresponse())
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                if attempt or not self.can_retry(method, reused, sent, e):
+                    raise
+
+    def close(self):
+        with self.lock:
+            for connections in self.idle.values():
+                for connection in connections:
+                    connection.close()
+            self.idle.clear()
+
+
+class PooledResponse:
+    """Respuesta HTTP que devuelve su conexión al pool al cerrarse"""
+
+    def __init__(self, pool, key, connection, response):
+        self.pool = pool
+        self.key = key
+        self.connection = connection
+        self.response = response
+        self.status = response.status
+        self.headers = response.headers
+
+    def read(self):
+        try:
+            return self.response.read()
+        finally:
+            self.close()
+
+    def iter_chunks(self, chunk_size=64 * 1024):
+        try:
+            while True:
+                chunk = self.response.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self.close()
+
+    def text(self):
+        charset = self.headers.get_content_charset() or "utf-8"
+        return self.read().decode(charset, errors="replace")
+
+    def close(self):
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        try:
+            # Vaciar la respuesta para poder reutilizar la conexión
+            self.response.read()
+        except Exception:
+            connection.close()
+            return
+        if self.response.will_close:
+            connection.close()
+        else:
+            self.pool.release(self.key, connection)
+
+
+class JsfFormParser(HTMLParser):
+    """Extrae formularios (campos, botones), iframes y ViewState de una página JSF"""
+
+    def __init__(self, page_url):
+        super().__init__(convert_charrefs=True)
+        self.page_url = page_url
+        self.forms = {}
+        self.iframes = []
+        self.current_form = None
+        self.current_select = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "form":
+            form_id = attrs.get("id") or attrs.get("name") or f"form{len(self.forms)}"
+            self.current_form = {
+                'action': urljoin(self.page_url, attrs.get("action") or self.page_url),
+                'fields': {},
+                'buttons': {},
+                'selects': []
+            }
+            self.forms[form_id] = self.current_form
+        elif tag == "iframe":
+            if attrs.get("src"):
+                self.iframes.append(urljoin(self.page_url, attrs["src"]))
+        elif tag == "option":
+            if self.current_form is not None and self.current_select is not None:
+                self.collect_option(attrs)
+        elif self.current_form is None or not attrs.get("name"):
+            return
+        elif tag == "input":
+            input_type = (attrs.get("type") or "text").lower()
+            if input_type in ("submit", "button", "image"):
+                self.current_form['buttons'][attrs["name"]] = (input_type, attrs.get("value") or "")
+            elif input_type in ("checkbox", "radio"):
+                if "checked" in attrs:
+                    self.current_form['fields'][attrs["name"]] = attrs.get("value") or "on"
+            else:
+                self.current_form['fields'][attrs["name"]] = attrs.get("value") or ""
+        elif tag == "button":
+            self.current_form['buttons'][attrs["name"]] = ("submit", attrs.get("value") or "")
+        elif tag == "select":
+            self.current_select = attrs["name"]
+            self.current_form['selects'].append(attrs["name"])
+        elif tag == "textarea":
+            self.current_form['fields'][attrs["name"]] = ""
+
+    def collect_option(self, attrs):
+        fields = self.current_form['fields']
+        if self.current_select not in fields or "selected" in attrs:
+            fields[self.current_select] = attrs.get("value") or ""
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self.current_form = None
+        elif tag == "select":
+            self.current_select = None
+
+
+class SessionExpiredError(Exception):
+    """La sesión HTTP ya no es válida (redirección al login JOSSO)"""
+
+
+class SofiaHttpEngine:
+    """Motor sin navegador: reproduce los POST del formulario JSF del reporte.
+
+    Usa las cookies del login JOSSO (SessionCookieStore); el servidor le abre
+    su propia sesión de la aplicación, en la que elige el rol. Lleva el
+    javax.faces.ViewState de cada vista y guarda el reporte generado
+    directamente en disco, sin abrir Firefox por ficha.
+    """
+
+    REPORT_PATH = "/sofia/inscripcion/generarreporteinscripcion/generarReporteInscripcion.faces"
+    ROLE_FIELD = "seleccionRol:roles"
+    USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
+
+    def __init__(self, base_url, logger, download_dir, pool=None):
+        self.report_url = urljoin(base_url, self.REPORT_PATH)
+        self.logger = logger
+        self.download_dir = download_dir
+        self.pool = pool or HttpConnectionPool()
+        self.cookies = {}
+        self.forms = {}
+        self.session_expired = False
+        self.last_report_path = None
+        self.last_report_paths = {}
+        self.last_failure = None
+
+    def set_cookies(self, cookies):
+        """Carga cookies con el formato de Selenium (lista de dicts con name/value)"""
+        self.cookies = {cookie['name']: cookie['value'] for cookie in cookies}
+        self.session_expired = False
+
+    def has_session(self):
+        return bool(self.cookies) and not self.session_expired
+
+    def close(self):
+        self.pool.close()
+
+    def store_cookies(self, headers):
+        for header in headers.get_all('Set-Cookie') or []:
+            parsed = SimpleCookie()
+            try:
+                parsed.load(header)
+            except Exception:
+                continue
+            for name, morsel in parsed.items():
+                self.cookies[name] = morsel.value
+
+    def fetch(self, method, url, fields=None):
+        """Petición con cookies siguiendo redirecciones; devuelve (url_final, PooledResponse)"""
+        for _ in range(5):
+            body = urlencode(fields).encode('utf-8') if fields is not None else None
+            headers = {
+                'User-Agent': self.USER_AGENT,
+                'Accept-Encoding': 'identity',
+                'Cookie': "; ".join(f"{name}={value}" for name, value in self.cookies.items())
+            }
+            if body is not None:
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+            response = self.pool.request(method, url, body, headers)
+            self.store_cookies(response.headers)
+
+            if response.status in (301, 302, 303, 307, 308):
+                location = response.headers.get('Location') or url
+                response.close()
+                url = urljoin(url, location)
+                if "josso" in url.lower() or "login" in url.lower():
+                    self.session_expired = True
+                    raise SessionExpiredError(f"Redirección al login: {url}")
+                if response.status in (301, 302, 303):
+                    method, fields = "GET", None
+                continue
+
+            return url, response
+
+        raise http.client.HTTPException(f"Demasiadas redirecciones hacia {url}")
+
+    def parse_page(self, url, page_html):
+        parser = JsfFormParser(url)
+        parser.feed(page_html)
+        self.forms.update(parser.forms)
+        return parser
+
+    def check_page(self, status, page_html):
+        if status >= 500 or "ViewExpiredException" in page_html:
+            raise http.client.HTTPException(f"Página de error del servidor: internal server error (HTTP {status})")
+
+    @traced("http.seleccionar_rol")
+    def select_role(self, form_id):
+        """Envía el selector de rol de la portada con el rol de encargado de ingreso"""
+        form = self.forms[form_id]
+        fields = dict(form['fields'])
+        for name in form['selects']:
+            if name.endswith(self.ROLE_FIELD):
+                fields[name] = SenaAutomation.ROL_ENCARGADO_INGRESO
+        _, response = self.fetch("POST", form['action'], fields)
+        page_html = response.text()
+        self.check_page(response.status, page_html)
+        self.logger.info("[HTTP] Rol seleccionado en la nueva sesión de la aplicación")
+
+    @traced("http.load_view")
+    def load_view(self):
+        """Carga el formulario del reporte y los iframes .faces que contiene"""
+        for _ in range(2):
+            self.forms = {}
+            url, response = self.fetch("GET", self.report_url)
+            page_html = response.text()
+            self.check_page(response.status, page_html)
+            parser = self.parse_page(url, page_html)
+            role_form = self.find_form(self.ROLE_FIELD)
+            if role_form is None:
+                break
+            # Sesión de la aplicación recién abierta con el login JOSSO: el servidor pide el rol
+            self.select_role(role_form)
+        else:
+            raise http.client.HTTPException("El servidor sigue pidiendo el rol después de seleccionarlo")
+
+        for iframe_url in parser.iframes:
+            if urlsplit(iframe_url).netloc == urlsplit(url).netloc and ".faces" in iframe_url:
+                iframe_final_url, iframe_response = self.fetch("GET", iframe_url)
+                iframe_html = iframe_response.text()
+                self.check_page(iframe_response.status, iframe_html)
+                self.parse_page(iframe_final_url, iframe_html)
+
+    def find_form(self, field_suffix):
+        for form_id, form in self.forms.items():
+            names = list(form['fields']) + list(form['buttons'])
+            if any(name.endswith(field_suffix) for name in names):
+                return form_id
+        return None
+
+    def submit(self, form_id, button, overrides=None):
+        """Envía el formulario como si se hiciera clic en 'button'; devuelve (html, None) o (None, respuesta de descarga)"""
+        form = self.forms[form_id]
+        fields = dict(form['fields'])
+        fields.update(overrides or {})
+
+        button_type, button_value = form['buttons'].get(button, ("submit", button))
+        if button_type == "image":
+            fields[f"{button}.x"] = "1"
+            fields[f"{button}.y"] = "1"
+        else:
+            fields[button] = button_value
+
+        url, response = self.fetch("POST", form['action'], fields)
+        disposition = response.headers.get('Content-Disposition') or ""
+        if "attachment" in disposition.lower():
+            return None, response
+
+        page_html = response.text()
+        self.check_page(response.status, page_html)
+        self.parse_page(url, page_html)
+        return page_html, None
+
+    def stream_to_disk(self, response, ficha):
+        """Guarda la descarga por bloques como '<ficha>_<timestamp>.<ext>' pasando por un '.part'"""
+        disposition = response.headers.get('Content-Disposition') or ""
+        match = re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', disposition, re.IGNORECASE)
+        extension = os.path.splitext(match.group(1))[1] if match else ".xls"
+
+        os.makedirs(self.download_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        final_path = os.path.join(self.download_dir, f"{ficha}_{timestamp}{extension}")
+        part_path = f"{final_path}.part"
+        with open(part_path, 'wb') as f:
+            for chunk in response.iter_chunks():
+                f.write(chunk)
+        os.replace(part_path, final_path)
+        return final_path
+
+    @traced("http.agregar_ficha")
+    def add_ficha(self, fichas_form, ficha):
+        """Primera Opción -> Consultar -> Agregar; devuelve False si la ficha no existe"""
+        overrides = {}
+        for name in self.forms[fichas_form]['fields']:
+            if name.endswith("codigoFichaITX"):
+                overrides[name] = ficha
+            elif name.endswith("opcionesInscritos"):
+                overrides[name] = SenaAutomation.PRIMERA_OPCION
+
+        page_html, _ = self.submit(fichas_form, "form:buscarCBT", overrides)
+        if "form:dtFichas:0:imgSelec" not in page_html:
+            return False
+        self.submit(fichas_form, "form:dtFichas:0:imgSelec")
+        return True
+
+    @traced("http.generar_reporte", fail_on_none=True)
+    def generate_report(self, name):
+        """Consultar aspirantes -> Generar reporte; devuelve la ruta guardada o None (con last_failure)"""
+        report_form = self.find_form("cmdlnkSearch")
+        if report_form is None:
+            self.logger.error("❌ [HTTP] No se encontró el formulario 'frmPrincipal'")
+            self.last_failure = (FailureKind.TIMEOUT, "Formulario 'frmPrincipal' ausente")
+            return None
+        self.submit(report_form, "frmPrincipal:cmdlnkSearch")
+
+        _, download = self.submit(report_form, "frmPrincipal:btnGenerar")
+        if download is None:
+            self.logger.error(f"❌ [HTTP] 'Generar reporte' no devolvió un archivo para {name}")
+            self.last_failure = (FailureKind.ERROR_SERVIDOR, "'Generar reporte' sin archivo")
+            return None
+        return self.stream_to_disk(download, name)
+
+    def process_batch(self, fichas):
+        """Modo lote: agrega todas las fichas, genera un solo reporte y lo divide por ficha.
+
+        Devuelve {ficha: None si se guardó su reporte, o (tipo, detalle) de la falla}.
+        """
+        fichas = [str(ficha) for ficha in fichas]
+        results = {}
+        self.last_failure = None
+        self.last_report_paths = {}
+        try:
+            self.logger.info(f"[HTTP] Procesando lote de {len(fichas)} fichas")
+            self.load_view()
+
+            fichas_form = self.find_form("codigoFichaITX")
+            if fichas_form is None:
+                self.logger.error("❌ [HTTP] No se encontró el formulario de búsqueda de fichas")
+                self.last_failure = (FailureKind.TIMEOUT, "Formulario de fichas ausente")
+                return {ficha: self.last_failure for ficha in fichas}
+
+            added = []
+            for ficha in fichas:
+                if self.add_ficha(fichas_form, ficha):
+                    added.append(ficha)
+                else:
+                    self.logger.error(f"❌ [HTTP] Ficha {ficha} no encontrada")
+                    results[ficha] = (FailureKind.FICHA_NO_ENCONTRADA, f"Ficha {ficha} sin resultados")
+            if not added:
+                return results
+
+            combined = self.generate_report("lote")
+            if combined is None:
+                results.update((ficha, self.last_failure) for ficha in added)
+                return results
+
+            self.last_report_paths = ReportSplitter.split(combined, added, self.download_dir)
+            for ficha in added:
+                path = self.last_report_paths.get(ficha)
+                if path is None:
+                    self.logger.error(f"❌ [HTTP] El reporte combinado no trae filas de la ficha {ficha}")
+                    results[ficha] = (FailureKind.ERROR_SERVIDOR, f"Reporte combinado sin filas de la ficha {ficha}")
+                    continue
+                self.logger.info(f"✓ [HTTP] Reporte de la ficha {ficha} guardado en {path}")
+                results[ficha] = None
+            return results
+
+        except SessionExpiredError as e:
+            self.logger.warning(f"⚠️ [HTTP] Sesión expirada: {e}")
+            self.last_failure = (FailureKind.LOGIN, str(e))
+        except Exception as e:
+            self.logger.error(f"❌ [HTTP] Error procesando el lote: {e}")
+            self.last_failure = (FailureKind.from_exception(e), str(e))
+        for ficha in fichas:
+            results.setdefault(ficha, self.last_failure)
+        return results
+
+    def process_single_ficha(self, ficha, timeout=10):
+        """Primera Opción -> Consultar -> Agregar -> Consultar aspirantes -> Generar reporte, solo con HTTP"""
+        ficha = str(ficha)
+        self.last_failure = None
+        try:
+            self.logger.info(f"[HTTP] Procesando ficha {ficha}")
+            self.load_view()
+
+            fichas_form = self.find_form("codigoFichaITX")
+            if fichas_form is None:
+                self.logger.error("❌ [HTTP] No se encontró el formulario de búsqueda de fichas")
+                self.last_failure = (FailureKind.TIMEOUT, "Formulario de fichas ausente")
+                return False
+
+            if not self.add_ficha(fichas_form, ficha):
+                self.logger.error(f"❌ [HTTP] Ficha {ficha} no encontrada")
+                self.last_failure = (FailureKind.FICHA_NO_ENCONTRADA, f"Ficha {ficha} sin resultados")
+                return False
+
+            self.last_report_path = self.generate_report(ficha)
+            if self.last_report_path is None:
+                return False
+            self.logger.info(f"✓ [HTTP] Reporte de la ficha {ficha} guardado en {self.last_report_path}")
+            return True
+
+        except SessionExpiredError as e:
+            self.logger.warning(f"⚠️ [HTTP] Sesión expirada: {e}")
+            self.last_failure = (FailureKind.LOGIN, str(e))
+            return False
+        except Exception as e:
+            self.logger.error(f"❌ [HTTP] Error procesando ficha {ficha}: {e}")
+            self.last_failure = (FailureKind.from_exception(e), str(e))
+            return False
+
+
+class InotifyWatch:
+    """Vigilancia de un directorio con inotify (Linux) vía ctypes; create() devuelve None si no está disponible"""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    @classmethod
+    def create(cls, path):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return None
+            mask = cls.IN_CLOSE_WRITE | cls.IN_MOVED_FROM | cls.IN_MOVED_TO | cls.IN_CREATE | cls.IN_DELETE
+            if libc.inotify_add_watch(fd, os.fsencode(path), mask) < 0:
+                os.close(fd)
+                return None
+            return cls(fd)
+        except (OSError, AttributeError):
+            return None
+
+    def wait(self, timeout):
+        """Bloquea hasta que haya eventos o pase 'timeout'; descarta los eventos leídos"""
+        readable, _, _ = select.select([self.fd], [], [], max(0, timeout))
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class DownloadWatcher:
+    """Espera a que termine la descarga de un reporte y la renombra como '<ficha>_<timestamp>.<ext>'.
+
+    Cada worker descarga en su propio directorio, así el archivo nuevo que
+    aparece después de 'Generar reporte' corresponde a su ficha. Usa inotify
+    cuando está disponible y si no, sondea el directorio.
+    """
+
+    PARTIAL_SUFFIXES = ('.part', '.crdownload', '.download', '.tmp')
+    POLL_INTERVAL = 0.25
+
+    def __init__(self, watch_dir, output_dir, logger):
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir
+        self.logger = logger
+        os.makedirs(self.watch_dir, exist_ok=True)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.inotify = InotifyWatch.create(self.watch_dir)
+
+    def snapshot(self):
+        """Archivos presentes antes de pedir la descarga"""
+        return set(os.listdir(self.watch_dir))
+
+    def find_completed(self, before, sizes):
+        names = set(os.listdir(self.watch_dir))
+        if any(name.endswith(self.PARTIAL_SUFFIXES) for name in names - before):
+            return None
+        for name in sorted(names - before):
+            path = os.path.join(self.watch_dir, name)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            # Tamaño estable entre dos revisiones y mayor que cero
+            if size > 0 and sizes.get(name) == size:
+                return path
+            sizes[name] = size
+        return None
+
+    @traced("descarga", fail_on_none=True)
+    def wait_for_download(self, ficha, before, timeout=120):
+        """Bloquea hasta que la descarga quede completa; devuelve la ruta final o None si se agota el tiempo"""
+        started = time.monotonic()
+        deadline = started + timeout
+        sizes = {}
+        try:
+            while True:
+                path = self.find_completed(before, sizes)
+                if path:
+                    return self.finalize(path, ficha)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.logger.error(f"❌ La descarga de la ficha {ficha} no terminó en {timeout} segundos")
+                    return None
+                if self.inotify is None or sizes:
+                    time.sleep(min(self.POLL_INTERVAL, remaining))
+                else:
+                    self.inotify.wait(min(1.0, remaining))
+        finally:
+            Telemetry.shared().add_wait(time.monotonic() - started)
+
+    def finalize(self, path, ficha):
+        extension = os.path.splitext(path)[1] or ".xls"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        final_path = os.path.join(self.output_dir, f"{ficha}_{timestamp}{extension}")
+        shutil.move(path, final_path)
+        self.logger.info(f"📥 Reporte de la ficha {ficha} guardado en {final_path}")
+        return final_path
+
+    def close(self):
+        if self.inotify:
+            self.inotify.close()
+            self.inotify = None
+
+
+class ReportSplitter:
+    """Divide el reporte combinado de un lote en un archivo por ficha usando su columna de ficha"""
+
+    # Nombres normalizados (ReportWarehouse.normalize_column) de la columna de ficha, en orden de preferencia
+    FICHA_COLUMNS = ("ficha", "codigo_ficha", "codigo_de_ficha", "numero_ficha", "numero_de_ficha",
+                     "no_ficha", "nro_ficha", "id_ficha")
+
+    @staticmethod
+    def normalize(values):
+        return values.astype(str).str.strip().str.replace(r"^(\d+)\.0*$", r"\1", regex=True)
+
+    @staticmethod
+    def read(path):
+        """Devuelve (DataFrame, separador) del reporte; el separador es None para Excel"""
+        if os.path.splitext(path)[1].lower() in ('.csv', '.txt'):
+            with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+                sample = f.read(4096)
+            try:
+                separator = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+            except csv.Error:
+                separator = ","
+            return pd.read_csv(path, sep=separator, dtype=str, encoding='utf-8-sig'), separator
+        return pd.read_excel(path, dtype=str), None
+
+    @classmethod
+    def find_ficha_column(cls, df, fichas):
+        """Columna de ficha por nombre exacto (normalizado) o, si no hay, la que más valores comparte
+        con las fichas del lote; None si ninguna columna contiene fichas del lote.
+
+        Columnas como 'Estado ficha' o 'Fecha inicio ficha' solo se eligen si sus valores coinciden.
+        """
+        wanted = set(fichas)
+        matches = {column: int(cls.normalize(df[column]).isin(wanted).sum()) for column in df.columns}
+        names = {column: ReportWarehouse.normalize_column(column) for column in df.columns}
+        for name in cls.FICHA_COLUMNS:
+            for column in df.columns:
+                if names[column] == name and matches[column]:
+                    return column
+        best = max(df.columns, key=lambda column: matches[column], default=None)
+        return best if best is not None and matches[best] else None
+
+    @classmethod
+    def split(cls, path, fichas, output_dir):
+        """Escribe '<ficha>_<timestamp>.<ext>' por ficha, borra el combinado y devuelve {ficha: ruta}.
+
+        Las fichas sin filas en el reporte combinado no reciben archivo ni aparecen en el resultado.
+        """
+        df, separator = cls.read(path)
+        column = cls.find_ficha_column(df, fichas)
+        if column is None:
+            raise ValueError(f"El reporte combinado {path} no tiene una columna con las fichas del lote")
+
+        keys = cls.normalize(df[column])
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        extension = os.path.splitext(path)[1].lower() if separator else ".xlsx"
+        paths = {}
+        for ficha in fichas:
+            rows = df[keys == ficha]
+            if rows.empty:
+                continue
+            target = os.path.join(output_dir, f"{ficha}_{timestamp}{extension}")
+            if separator:
+                rows.to_csv(target, sep=separator, index=False)
+            else:
+                rows.to_excel(target, index=False)
+            paths[ficha] = target
+        os.remove(path)
+        return paths
+
+
+class ReportWarehouse:
+    """Almacén SQLite con las filas de todos los reportes, una por (ficha, documento del aspirante).
+
+    Cada reporte se carga apenas termina su descarga: las columnas se normalizan
+    (minúsculas, sin tildes, snake_case), las nuevas se agregan a la tabla y las
+    filas de la ficha se reemplazan en una sola transacción, sin tocar las demás.
+    fecha_ejecucion permite consultar por día de ejecución.
+    """
+
+    DB_FILE = "reportes_sena.sqlite"
+    TABLE = "aspirantes"
+    RESERVED_COLUMNS = ("ficha", "documento", "archivo", "fecha_ejecucion")
+    # Nombres normalizados de la columna de documento, en orden de preferencia
+    DOCUMENT_COLUMNS = ("numero_de_documento", "numero_documento", "nro_documento", "no_documento",
+                        "documento", "numero_de_identificacion", "numero_identificacion", "identificacion", "cedula")
+    _lock = threading.Lock()
+
+    def __init__(self, db_path, logger=None, run_date=None):
+        self.db_path = db_path
+        self.logger = logger or logging.getLogger(__name__)
+        self.run_date = run_date or datetime.now().strftime("%Y-%m-%d")
+
+    @staticmethod
+    def normalize_column(name):
+        text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+        return re.sub(r"[^0-9a-z]+", "_", text.lower()).strip("_") or "columna"
+
+    @classmethod
+    def normalize(cls, df):
+        """Renombra las columnas a nombres SQL seguros y únicos y limpia espacios y celdas vacías"""
+        names = []
+        for column in df.columns:
+            name = cls.normalize_column(column)
+            if name in cls.RESERVED_COLUMNS:
+                name = f"reporte_{name}"
+            base, suffix = name, 2
+            while name in names:
+                name, suffix = f"{base}_{suffix}", suffix + 1
+            names.append(name)
+        df = df.astype(object)
+        df.columns = names
+        for name in names:
+            df[name] = df[name].str.strip()
+        df = df.replace("", None).dropna(how='all')
+        return df.where(df.notna(), None)
+
+    @classmethod
+    def find_document_column(cls, columns):
+        """Columna del número de documento: primero por nombre exacto y luego como sufijo
+        (p. ej. 'reporte_documento'); nunca 'tipo_de_documento' ni similares."""
+        candidates = [column for column in columns if not column.startswith("tipo")]
+        for name in cls.DOCUMENT_COLUMNS:
+            if name in candidates:
+                return name
+        for name in cls.DOCUMENT_COLUMNS:
+            for column in candidates:
+                if column.endswith(f"_{name}"):
+                    return column
+        return None
+
+    def connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} (ficha TEXT NOT NULL, documento TEXT NOT NULL, "
+            "archivo TEXT, fecha_ejecucion TEXT, PRIMARY KEY (ficha, documento))"
+        )
+        connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_fecha ON {self.TABLE} (fecha_ejecucion)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS ingestas (ficha TEXT PRIMARY KEY, archivo TEXT, filas INTEGER, "
+            "fecha_ejecucion TEXT, ingestado_en TEXT)"
+        )
+        return connection
+
+    def ingest(self, ficha, path):
+        """Reemplaza las filas de la ficha con las del reporte y devuelve cuántas quedaron guardadas"""
+        ficha = str(ficha)
+        df = self.normalize(ReportSplitter.read(path)[0])
+        document_column = self.find_document_column(df.columns)
+        # Sin documento se usa la posición de la fila para no colapsar aspirantes
+        fallback = pd.Series([f"fila_{n}" for n in range(len(df))], index=df.index, dtype=object)
+        documents = df[document_column].fillna(fallback) if document_column else fallback
+        # Un documento repetido reemplazaría filas en silencio: se avisa y se numeran las repeticiones
+        repeats = documents.groupby(documents).cumcount()
+        if repeats.any():
+            duplicated = sorted(set(documents[repeats > 0]))
+            self.logger.warning(
+                f"⚠️ Ficha {ficha}: documentos repetidos en '{document_column}' "
+                f"({', '.join(duplicated[:5])}{'...' if len(duplicated) > 5 else ''}); se guardan como documento#n"
+            )
+            documents = documents.where(repeats == 0, documents + "#" + (repeats + 1).astype(str))
+
+        report_columns = list(df.columns)
+        df.insert(0, "ficha", ficha)
+        df.insert(1, "documento", documents)
+        df.insert(2, "archivo", os.path.abspath(path))
+        df.insert(3, "fecha_ejecucion", self.run_date)
+
+        columns = ", ".join(f'"{name}"' for name in df.columns)
+        placeholders = ", ".join("?" for _ in df.columns)
+        with self._lock, closing(self.connect()) as connection:
+            with connection:
+                existing = {row[1] for row in connection.execute(f"PRAGMA table_info({self.TABLE})")}
+                for name in report_columns:
+                    if name not in existing:
+                        connection.execute(f'ALTER TABLE {self.TABLE} ADD COLUMN "{name}" TEXT')
+                connection.execute(f"DELETE FROM {self.TABLE} WHERE ficha = ?", (ficha,))
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO {self.TABLE} ({columns}) VALUES ({placeholders})",
+                    df.itertuples(index=False, name=None)
+                )
+                stored = connection.execute(
+                    f"SELECT COUNT(*) FROM {self.TABLE} WHERE ficha = ?", (ficha,)
+                ).fetchone()[0]
+                connection.execute(
+                    "INSERT OR REPLACE INTO ingestas VALUES (?, ?, ?, ?, ?)",
+                    (ficha, os.path.abspath(path), stored, self.run_date, datetime.now().isoformat(timespec='seconds'))
+                )
+        return stored
+
+
+class ReportCache:
+    """Caché de reportes recientes por (sitio, ficha, valor de 'Primera Opción').
+
+    Guarda ruta, sha256 y fecha de cada reporte generado; una ficha cuyo reporte
+    tiene menos de ttl segundos, sigue en disco y conserva su hash se sirve sin
+    abrir el navegador. Se persiste en disco para las siguientes ejecuciones.
+    """
+
+    DEFAULT_TTL = 3600
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_file=os.path.join("logs", "report_cache.json"), ttl=DEFAULT_TTL):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.load()
+
+    @classmethod
+    def shared(cls):
+        """Instancia única compartida por todos los workers del proceso"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def key(site, ficha, opcion):
+        """El sitio (esquema y host) separa los reportes del sitio real de los de un servidor de pruebas"""
+        parts = urlsplit(site)
+        return f"{parts.scheme}://{parts.netloc.lower()}|{ficha}|{opcion}"
+
+    @staticmethod
+    def file_hash(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.entries, indent=2, ensure_ascii=False)
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        tmp_file = f"{self.cache_file}.{threading.get_ident()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_file, self.cache_file)
+
+    def lookup(self, site, ficha, opcion):
+        """Ruta del reporte vigente de la ficha en el sitio o None si no hay, venció o el archivo cambió"""
+        with self.lock:
+            entry = self.entries.get(self.key(site, ficha, opcion))
+        if not entry or time.time() - entry['ts'] > self.ttl:
+            return None
+        try:
+            if self.file_hash(entry['path']) != entry['sha256']:
+                return None
+        except OSError:
+            return None
+        return entry['path']
+
+    def store(self, site, ficha, opcion, path):
+        entry = {'path': os.path.abspath(path), 'sha256': self.file_hash(path), 'ts': round(time.time(), 3)}
+        with self.lock:
+            self.entries[self.key(site, ficha, opcion)] = entry
+
 
 class SenaAutomation:
-    def __init__(self, gui_callback=None):
-        self.gui_callback = gui_callback
+    BASE_URL = "http://senasofiaplus.edu.co/sofia-public/"
+
+    # Valor de 'opcionesInscritos' que se consulta (Primera Opción); también es parte de la clave de ReportCache
+    PRIMERA_OPCION = "1"
+
+    # Valor de 'seleccionRol:roles' para 'Encargado de ingreso centro formación'
+    ROL_ENCARGADO_INGRESO = "33"
+
+    CONTENIDO_XPATH = "//iframe[@id='contenido' or @name='contenido' or contains(@src, 'generarReporteInscripcion.faces')]"
+
+    STEP_RING_SIZE = 20
+
+    # Instantánea liviana del paso: URL, ruta de iframes, elemento con foco y hash del DOM
+    STEP_SNAPSHOT_SCRIPT = """
+        var path = [];
+        var w = window;
+        while (w !== w.parent) {
+            var parent = w.parent;
+            for (var i = 0; i < parent.frames.length; i++) {
+                if (parent.frames[i] === w) { path.unshift(i); break; }
+            }
+            w = parent;
+        }
+        var el = document.activeElement;
+        var focused = el ? el.tagName.toLowerCase() + (el.id ? '#' + el.id : '') +
+                           (el.name ? '[name=' + el.name + ']' : '') : null;
+        var dom = document.documentElement ? document.documentElement.outerHTML : '';
+        var hash = 0x811c9dc5;
+        for (var j = 0; j < dom.length; j++) {
+            hash ^= dom.charCodeAt(j);
+            hash = Math.imul(hash, 0x01000193);
+        }
+        return [String(location.href), path, focused, (hash >>> 0).toString(16), dom.length];
+    """
+
+    # Llena form:codigoFichaITX, dispara los eventos que escucha JSF, verifica el valor y
+    # pulsa form:buscarCBT en un solo comando. Devuelve 'ok', 'valor:<leído>' o el faltante.
+    # arguments[1] es un token por intento: si el clic ya ocurrió (aunque la página haya
+    # navegado, por eso también va en sessionStorage), repetir el script no reenvía.
+    FILL_AND_SUBMIT_SCRIPT = """
+        var value = arguments[0], token = arguments[1];
+        var storage = null;
+        try { storage = window.sessionStorage; } catch (e) { storage = null; }
+        if (window.__senaBusqueda === token || (storage && storage.getItem('senaBusqueda') === token)) return 'ok';
+        var field = document.getElementById('form:codigoFichaITX');
+        if (!field) return 'sin_campo';
+        if (field.disabled || field.readOnly || !field.getClientRects().length) return 'no_interactuable';
+        var button = document.getElementById('form:buscarCBT') ||
+                     document.getElementsByName('form:buscarCBT')[0];
+        if (!button || button.disabled) return 'sin_boton';
+        field.scrollIntoView(true);
+        field.focus();
+        field.value = value;
+        ['input', 'keyup', 'change'].forEach(function (type) {
+            field.dispatchEvent(new Event(type, {bubbles: true}));
+        });
+        if (field.value !== value) return 'valor:' + field.value;
+        field.blur();
+        window.__senaBusqueda = token;
+        if (storage) storage.setItem('senaBusqueda', token);
+        button.click();
+        return 'ok';
+    """
+
+    # Recorre en preorden el documento y sus iframes del mismo origen buscando el localizador
+    # (by, valor); los índices son los de find_elements(By.TAG_NAME, "iframe") en cada nivel.
+    # Los iframes de otro origen no se pueden leer y se devuelven aparte para entrar con el driver.
+    FRAME_LOCATOR_SCRIPT = """
+        var by = arguments[0], value = arguments[1], visibleOnly = arguments[2], includeTop = arguments[3];
+        function visible(el) {
+            var style = el.ownerDocument.defaultView.getComputedStyle(el);
+            return style.display !== 'none' && style.visibility !== 'hidden' && el.getClientRects().length > 0;
+        }
+        function matches(doc) {
+            var list = [];
+            if (by === 'id') {
+                var el = doc.getElementById(value);
+                list = el ? [el] : [];
+            } else if (by === 'name') {
+                list = doc.getElementsByName(value);
+            } else if (by === 'class name') {
+                list = doc.getElementsByClassName(value);
+            } else if (by === 'tag name') {
+                list = doc.getElementsByTagName(value);
+            } else if (by === 'css selector') {
+                list = doc.querySelectorAll(value);
+            } else if (by === 'xpath') {
+                var snapshot = doc.evaluate(value, doc, null, 7, null);
+                for (var k = 0; k < snapshot.snapshotLength; k++) list.push(snapshot.snapshotItem(k));
+            } else {
+                throw new Error('Estrategia no soportada: ' + by);
+            }
+            for (var i = 0; i < list.length; i++) {
+                if (!visibleOnly || visible(list[i])) return true;
+            }
+            return false;
+        }
+        var crossOrigin = [];
+        function walk(doc, path, check) {
+            if (check && matches(doc)) return path;
+            var frames = doc.getElementsByTagName('iframe');
+            for (var i = 0; i < frames.length; i++) {
+                var child = null;
+                try { child = frames[i].contentDocument; } catch (e) { child = null; }
+                if (!child) { crossOrigin.push(path.concat([i])); continue; }
+                var found = walk(child, path.concat([i]), true);
+                if (found) return found;
+            }
+            return null;
+        }
+        var found = walk(document, [], includeTop);
+        return {ruta: found, origen_cruzado: found ? [] : crossOrigin};
+    """
+
+    # Cualquiera de los campos del formulario de JOSSO identifica el frame de login
+    LOGIN_FORM_LOCATOR = ("css selector", "#username, input[name='josso_password'], input.login100-form-btn")
+
+    # Tope del llenado por script: si el formulario no aparece en este frame se pasa enseguida a los demás
+    FILL_SCRIPT_MAX_WAIT = 3
+
+    # Valores literales de By (ID, NAME, XPATH, CLASS_NAME) para no importar selenium al cargar la clase
+    CONSULTAR_ASPIRANTES_SELECTORS = [
+        ("id", "frmPrincipal:cmdlnkSearch"),
+        ("name", "frmPrincipal:cmdlnkSearch"),
+        ("xpath", "//input[@value='Consultar aspirantes ']"),
+        ("xpath", "//input[contains(@value, 'Consultar aspirantes')]"),
+        ("class name", "boton_app")
+    ]
+
+    def __init__(self, gui_callback=None, worker_id=None, performance_mode=False, engine="selenium",
+                 record_commands=False):
+        self.worker_id = worker_id
+        self.performance_mode = performance_mode
+        self.engine = engine
+        self.record_commands = record_commands
+        self.http_engine = None
+        self.base_url = self.BASE_URL
+        # Reportes finales en Descargas; cada worker descarga primero en su propio directorio
+        self.output_dir = str(Path.home() / "Downloads")
+        self.download_dir = os.path.join(self.output_dir, ".sena_descargas", f"worker_{worker_id or 0}")
+        self.downloads = None
+        self.download_timeout = 120
+        self.element_timeout = 20
+        self.last_report_path = None
+        self.report_paths = {}
+        self.warehouse = None
+        self.report_cache = None
+        if gui_callback and worker_id is not None:
+            self.gui_callback = lambda message: gui_callback(f"[Worker {worker_id}] {message}")
+        else:
+            self.gui_callback = gui_callback
+        self.driver = None
+        self.session_ready = False
+        self.stop_event = threading.Event()
+        self.workers = []
+        self.journal = None
+        self.batch_size = 1
+        self.telemetry = Telemetry.shared()
+        self.step_ring = deque(maxlen=self.STEP_RING_SIZE)
+        self.last_failure = None
+        self.last_fill_result = None
         self.setup_logging()
+        self.waits = WaitEngine(self.logger)
+        self.frame_cache = FramePathCache()
+        self.selectors = SelectorRegistry.shared()
+        self.session_cookies = SessionCookieStore.shared()
         
     def setup_logging(self):
         """Configura el sistema de logging avanzado"""
@@ -43,22 +2406,26 @@ class SenaAutomation:
         )
         
         self.logger = logging.getLogger(__name__)
-        self.html_dump_file = os.path.join(log_dir, f"html_dumps_{timestamp}.html")
-        
-        # Inicializar archivo HTML
-        with open(self.html_dump_file, 'w', encoding='utf-8') as f:
-            f.write("<html><head><title>SENA Automation HTML Dumps</title></head><body>\n")
+        dump_suffix = ""
+        if self.worker_id is not None:
+            self.logger = WorkerLoggerAdapter(self.logger, {'worker_id': self.worker_id})
+            dump_suffix = f"_worker{self.worker_id}"
+        # Dumps HTML comprimidos y muestreados; los archivos se crean con la primera entrada
+        self.dumps = DumpStore(os.path.join(log_dir, "dumps"), f"{timestamp}{dump_suffix}")
         
         self.logger.info("Sistema de logging inicializado")
         if self.gui_callback:
             self.gui_callback("Sistema de logging inicializado")
             
 
+    @traced("setup_driver")
     def setup_driver(self):
         """Configura el driver de Firefox para descargar sin preguntar y guardar en Descargas."""
 
-        # Carpeta Descargas
-        download_dir = str(Path.home() / "Downloads")
+        # Carpeta de descargas propia del worker
+        download_dir = self.download_dir
+        if self.downloads is None:
+            self.downloads = DownloadWatcher(download_dir, self.output_dir, self.logger)
 
         # Crear perfil
         profile = FirefoxProfile()
@@ -84,19 +2451,73 @@ class SenaAutomation:
 
         # Configurar opciones y asignar perfil
         options = Options()
+
+        if self.performance_mode:
+            self.apply_performance_profile(profile, options)
+
         options.profile = profile
 
         # Iniciar Firefox con el perfil
-        self.driver = webdriver.Firefox(options=options)
-        self.wait = WebDriverWait(self.driver, 20)
+        self.driver = self.telemetry.instrument(webdriver.Firefox(options=options))
+        if self.record_commands:
+            CommandRecorder.shared().instrument(self.driver)
+        self.wait = WebDriverWait(self.driver, self.element_timeout)
+        self.waits.attach(self.driver)
+        self.frame_cache.invalidate()
         self.logger.info(f"Firefox configurado para descargar en: {download_dir}")
         if self.gui_callback:
             self.gui_callback(f"Firefox configurado para descargar en: {download_dir}")
+
+    def apply_performance_profile(self, profile, options):
+        """Perfil de rendimiento: headless, sin imágenes/fuentes/animaciones, sin telemetría ni prefetch"""
+        options.add_argument("-headless")
+        options.page_load_strategy = "eager"
+
+        performance_preferences = {
+            # Contenido que la automatización no necesita
+            "permissions.default.image": 2,
+            "browser.display.use_document_fonts": 0,
+            "gfx.downloadable_fonts.enabled": False,
+            "ui.prefersReducedMotion": 1,
+            "toolkit.cosmeticAnimations.enabled": False,
+            "image.animation_mode": "none",
+            # Sin restauración de sesión
+            "browser.sessionstore.resume_from_crash": False,
+            "browser.sessionstore.max_tabs_undo": 0,
+            "browser.startup.page": 0,
+            "browser.startup.homepage": "about:blank",
+            # Sin telemetría ni reportes
+            "toolkit.telemetry.enabled": False,
+            "toolkit.telemetry.unified": False,
+            "datareporting.healthreport.uploadEnabled": False,
+            "datareporting.policy.dataSubmissionEnabled": False,
+            "app.shield.optoutstudies.enabled": False,
+            "app.update.auto": False,
+            "extensions.update.enabled": False,
+            "browser.safebrowsing.malware.enabled": False,
+            "browser.safebrowsing.phishing.enabled": False,
+            # Sin prefetch ni conexiones especulativas
+            "network.prefetch-next": False,
+            "network.dns.disablePrefetch": True,
+            "network.http.speculative-parallel-limit": 0,
+            "network.predictor.enabled": False,
+            "browser.urlbar.speculativeConnect.enabled": False,
+        }
+        for name, value in performance_preferences.items():
+            profile.set_preference(name, value)
+
+        self.logger.info("Perfil de rendimiento activado (headless, page load 'eager')")
         
 
-    def save_page_html(self, step_name, additional_info=""):
-        """Guarda el HTML completo de la página actual con análisis"""
+    def save_page_html(self, step_name, additional_info="", failure=False):
+        """Guarda el HTML completo de la página actual con análisis en el almacén de dumps (muestreado en éxitos).
+
+        Devuelve la línea del índice de la entrada, o None si no se capturó.
+        """
         try:
+            if not self.dumps.should_capture(failure):
+                return
+
             timestamp = datetime.now().strftime("%H:%M:%S")
             
             # Obtener HTML de la página principal
@@ -104,23 +2525,141 @@ class SenaAutomation:
             
             # Analizar elementos importantes
             analysis = self.analyze_page_elements()
+            content_hash = hashlib.sha1((analysis + main_html).encode('utf-8')).hexdigest()
             
-            # Guardar en archivo HTML
-            with open(self.html_dump_file, 'a', encoding='utf-8') as f:
-                f.write(f"\n<hr><h2>PASO: {step_name} - {timestamp}</h2>\n")
-                if additional_info:
-                    f.write(f"<p><strong>Info adicional:</strong> {additional_info}</p>\n")
-                
-                f.write(f"<h3>Análisis de elementos:</h3>\n<pre>{analysis}</pre>\n")
-                f.write(f"<h3>HTML completo:</h3>\n<textarea style='width:100%;height:400px;'>{main_html}</textarea>\n")
+            parts = [f"<hr><h2>PASO: {html.escape(step_name)} - {timestamp}</h2>\n"]
+            if additional_info:
+                parts.append(f"<p><strong>Info adicional:</strong> {html.escape(additional_info)}</p>\n")
+            parts.append(f"<h3>Análisis de elementos:</h3>\n<pre>{html.escape(analysis)}</pre>\n")
+            parts.append(f"<h3>HTML completo:</h3>\n<textarea style='width:100%;height:400px;'>{html.escape(main_html)}</textarea>\n")
             
-            self.logger.info(f"HTML guardado para paso: {step_name}")
+            entry = self.dumps.add(
+                "".join(parts), ficha=self.telemetry.thread_state().ficha, paso=step_name,
+                failure=failure, content_hash=content_hash
+            )
+            if entry.get('duplicado'):
+                self.logger.info(f"HTML del paso {step_name} idéntico a uno ya guardado ({entry['archivo']})")
+            else:
+                self.logger.info(f"HTML guardado para paso: {step_name}")
+            return entry
             
         except Exception as e:
             self.logger.error(f"Error guardando HTML: {e}")
 
+    # Recolecta en una sola ida y vuelta botones, elementos con 'consultar' y
+    # formularios del documento actual y de todos sus iframes del mismo origen
+    PAGE_ANALYSIS_SCRIPT = """
+        var CONSULTAR_XPATH = "//*[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', " +
+                              "'abcdefghijklmnopqrstuvwxyz'), 'consultar')]";
+        function visible(el) {
+            var style = el.ownerDocument.defaultView.getComputedStyle(el);
+            return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length) &&
+                   style.visibility !== 'hidden' && style.display !== 'none';
+        }
+        function text(el) {
+            return visible(el) ? (el.innerText || el.textContent || '').trim() : '';
+        }
+        function analyze(win, path) {
+            var doc = win.document;
+            var frame = {ruta: path, url: String(win.location.href), titulo: doc.title,
+                         botones: [], consultar: [], formularios: [], iframes: []};
+            ['button', "input[type='button']", "input[type='submit']"].forEach(function (selector) {
+                var found = doc.querySelectorAll(selector);
+                for (var i = 0; i < found.length; i++) {
+                    var el = found[i];
+                    frame.botones.push({
+                        id: el.id, name: el.getAttribute('name'), value: el.value, text: text(el),
+                        clase: el.getAttribute('class'), onclick: el.getAttribute('onclick'),
+                        visible: visible(el), habilitado: !el.disabled
+                    });
+                }
+            });
+            var result = doc.evaluate(CONSULTAR_XPATH, doc, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (var j = 0; j < result.snapshotLength; j++) {
+                var node = result.snapshotItem(j);
+                frame.consultar.push({tag: node.tagName.toLowerCase(), id: node.id, text: text(node),
+                                      visible: visible(node)});
+            }
+            var forms = doc.getElementsByTagName('form');
+            for (var k = 0; k < forms.length; k++) {
+                var action = forms[k].getAttribute('action');
+                frame.formularios.push({id: forms[k].id, name: forms[k].getAttribute('name'),
+                                        action: action === null ? null : new URL(action, doc.baseURI).href});
+            }
+            var iframes = doc.getElementsByTagName('iframe');
+            for (var n = 0; n < iframes.length; n++) {
+                try {
+                    frame.iframes.push(analyze(iframes[n].contentWindow, path.concat([n])));
+                } catch (e) {
+                    frame.iframes.push({ruta: path.concat([n]), url: iframes[n].getAttribute('src'),
+                                        error: 'origen distinto'});
+                }
+            }
+            return frame;
+        }
+        return analyze(window, []);
+    """
+
     def analyze_page_elements(self):
-        """Analiza todos los elementos importantes de la página"""
+        """Analiza todos los elementos importantes de la página (y de sus iframes) con un solo script"""
+        try:
+            frame = self.driver.execute_script(self.PAGE_ANALYSIS_SCRIPT)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Análisis por script no disponible ({e}), usando el análisis elemento por elemento")
+            return self.analyze_page_elements_legacy()
+
+        analysis = []
+        analysis.append("="*80)
+        analysis.append("ANÁLISIS COMPLETO DE ELEMENTOS")
+        analysis.append("="*80)
+        self.render_frame_analysis(frame, analysis)
+        return "\n".join(analysis)
+
+    def render_frame_analysis(self, frame, analysis):
+        """Escribe el análisis de un frame con el formato del dump y sigue con sus iframes"""
+        if frame['ruta']:
+            analysis.append(f"\n{'='*80}")
+            analysis.append(f"IFRAME {frame['ruta']}")
+            analysis.append("="*80)
+        if frame.get('error'):
+            analysis.append(f"URL: {frame.get('url') or 'Sin src'} ({frame['error']}, no analizado)")
+            return
+
+        # Información básica
+        analysis.append(f"URL actual: {frame['url']}")
+        analysis.append(f"Título: {frame['titulo']}")
+
+        analysis.append("\n--- TODOS LOS BOTONES ---")
+        for i, btn in enumerate(frame['botones']):
+            analysis.append(f"Botón {i+1}:")
+            analysis.append(f"  ID: {btn['id'] or 'Sin ID'}")
+            analysis.append(f"  Name: {btn['name'] or 'Sin name'}")
+            analysis.append(f"  Value: {btn['value'] or 'Sin value'}")
+            analysis.append(f"  Text: {btn['text'] or 'Sin texto'}")
+            analysis.append(f"  Class: {btn['clase'] or 'Sin class'}")
+            analysis.append(f"  OnClick: {btn['onclick'] or 'Sin onclick'}")
+            analysis.append(f"  Visible: {btn['visible']}, Enabled: {btn['habilitado']}")
+            analysis.append("")
+
+        analysis.append("\n--- ELEMENTOS CON 'CONSULTAR' ---")
+        for i, elem in enumerate(frame['consultar']):
+            analysis.append(
+                f"Elemento {i+1}: <{elem['tag']}> ID: {elem['id'] or 'Sin ID'}, "
+                f"Text: '{elem['text'] or 'Sin texto'}', Visible: {elem['visible']}"
+            )
+
+        analysis.append("\n--- FORMULARIOS ---")
+        for i, form in enumerate(frame['formularios']):
+            analysis.append(
+                f"Formulario {i+1}: ID: {form['id'] or 'Sin ID'}, Name: {form['name'] or 'Sin name'}, "
+                f"Action: {form['action'] or 'Sin action'}"
+            )
+
+        for child in frame['iframes']:
+            self.render_frame_analysis(child, analysis)
+
+    def analyze_page_elements_legacy(self):
+        """Análisis anterior, elemento por elemento (8+ comandos WebDriver por botón); solo el frame actual"""
         try:
             analysis = []
             analysis.append("="*80)
@@ -196,35 +2735,19 @@ class SenaAutomation:
     def validate_iframes_after_modal_close(self):
         """Valida el iframe específico 'contenido' después de cerrar la modal"""
         try:
-            target_iframe = None
-            
-            # Buscar por ID primero
-            try:
-                target_iframe = self.driver.find_element(By.ID, "contenido")
-            except:
-                # Si no se encuentra por ID, buscar por name
-                try:
-                    target_iframe = self.driver.find_element(By.NAME, "contenido")
-                except:
-                    # Buscar por src que contenga la ruta específica
-                    try:
-                        target_iframe = self.driver.find_element(
-                            By.XPATH, 
-                            "//iframe[contains(@src, '/sofia/inscripcion/generarreporteinscripcion/generarReporteInscripcion.faces')]"
-                        )
-                    except:
-                        return [], []
-            
-            if not target_iframe:
+            self.driver.switch_to.default_content()
+            target_iframes = self.driver.find_elements(By.XPATH, self.CONTENIDO_XPATH)
+            if not target_iframes:
                 return [], []
+            target_iframe = target_iframes[0]
             
             # Obtener información del iframe encontrado
             iframe_id = target_iframe.get_attribute('id') or 'Sin ID'
             iframe_name = target_iframe.get_attribute('name') or 'Sin name'
             iframe_src = target_iframe.get_attribute('src') or 'Sin src'
             
-            self.driver.switch_to.default_content()
-            self.driver.switch_to.frame(target_iframe)
+            if not self.switch_to_contenido():
+                return [], []
             
             # Buscar el botón directamente en este iframe
             button_found = self.search_button_in_specific_iframe()
@@ -248,24 +2771,12 @@ class SenaAutomation:
     def search_button_in_specific_iframe(self):
         """Busca el botón 'Consultar aspirantes' en el iframe actual"""
         try:
-            # Selectores para el botón
-            selectors = [
-                (By.ID, "frmPrincipal:cmdlnkSearch"),
-                (By.NAME, "frmPrincipal:cmdlnkSearch"),
-                (By.XPATH, "//input[@value='Consultar aspirantes ']"),
-                (By.XPATH, "//input[contains(@value, 'Consultar aspirantes')]"),
-                (By.CLASS_NAME, "boton_app")
-            ]
-            
-            for selector_type, selector_value in selectors:
-                try:
-                    element = self.driver.find_element(selector_type, selector_value)
-                    if element and element.is_displayed():
-                        return True
-                except:
-                    continue
-            
-            return False
+            found = self.selectors.first_success(
+                "consultar_aspirantes.visible",
+                self.CONSULTAR_ASPIRANTES_SELECTORS,
+                lambda selector: self.driver.find_element(*selector).is_displayed()
+            )
+            return bool(found)
             
         except Exception as e:
             return False
@@ -273,80 +2784,42 @@ class SenaAutomation:
     def click_consultar_aspirantes_with_validation(self):
         """Hace clic en 'Consultar aspirantes' en el iframe 'contenido'"""
         try:
-            self.driver.switch_to.default_content()
-            
-            # Buscar el iframe "contenido"
-            target_iframe = None
-            try:
-                target_iframe = self.driver.find_element(By.ID, "contenido")
-            except:
-                try:
-                    target_iframe = self.driver.find_element(By.NAME, "contenido")
-                except:
-                    try:
-                        target_iframe = self.driver.find_element(
-                            By.XPATH, 
-                            "//iframe[contains(@src, '/sofia/inscripcion/generarreporteinscripcion/generarReporteInscripcion.faces')]"
-                        )
-                    except:
-                        return False
-            
-            if not target_iframe:
+            # Cambiar al iframe "contenido"
+            if not self.switch_to_contenido():
                 return False
             
-            # Cambiar al iframe específico
-            self.driver.switch_to.frame(target_iframe)
-            
             # Esperar que el botón esté disponible
             wait = WebDriverWait(self.driver, 15)
             
-            # Selectores para el botón
-            selectors = [
-                (By.ID, "frmPrincipal:cmdlnkSearch"),
-                (By.NAME, "frmPrincipal:cmdlnkSearch"),
-                (By.XPATH, "//input[@value='Consultar aspirantes ']"),
-                (By.XPATH, "//input[contains(@value, 'Consultar aspirantes')]"),
-                (By.CLASS_NAME, "boton_app")
-            ]
-            
-            boton_aspirantes = None
-            for selector_type, selector_value in selectors:
-                try:
-                    boton_aspirantes = wait.until(
-                        EC.element_to_be_clickable((selector_type, selector_value))
-                    )
-                    break
-                except:
-                    continue
+            boton_aspirantes = self.selectors.first_success(
+                "consultar_aspirantes.clickable",
+                self.CONSULTAR_ASPIRANTES_SELECTORS,
+                lambda selector: wait.until(EC.element_to_be_clickable(selector))
+            )
             
             if not boton_aspirantes:
                 return False
             
             # Scroll al elemento
             self.driver.execute_script("arguments[0].scrollIntoView(true);", boton_aspirantes)
-            time.sleep(1)
+            self.waits.element_stable("consultar_aspirantes.scroll", boton_aspirantes, max_wait=1)
             
             click_strategies = [
-                lambda: boton_aspirantes.click(),
-                lambda: self.driver.execute_script("arguments[0].click();", boton_aspirantes),
-                lambda: self.driver.execute_script("document.forms['frmPrincipal'].submit();"),
-                lambda: ActionChains(self.driver).move_to_element(boton_aspirantes).click().perform()
+                ("click", lambda: boton_aspirantes.click()),
+                ("js_click", lambda: self.driver.execute_script("arguments[0].click();", boton_aspirantes)),
+                ("form_submit", lambda: self.driver.execute_script("document.forms['frmPrincipal'].submit();")),
+                ("action_chains", lambda: ActionChains(self.driver).move_to_element(boton_aspirantes).click().perform())
             ]
             
-            for i, strategy in enumerate(click_strategies, 1):
-                try:
-                    strategy()
-                    time.sleep(2)
-                    
-                    # Verificar éxito básico
-                    current_url = self.driver.current_url
-                    if "aspirantes" in current_url.lower() or "consulta" in current_url.lower():
-                        return True
-                        
-                except Exception as e:
-                    continue
+            def attempt_click(strategy):
+                strategy[1]()
+                self.waits.settle("consultar_aspirantes.click", max_wait=2)
+                
+                # Verificar éxito básico
+                current_url = self.driver.current_url
+                return "aspirantes" in current_url.lower() or "consulta" in current_url.lower()
             
-            return False
+            return bool(self.selectors.first_success("consultar_aspirantes.click", click_strategies, attempt_click))
             
         except Exception as e:
             return False
@@ -402,7 +2875,7 @@ class SenaAutomation:
                     
                     # Hacer scroll al botón
                     self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", button)
-                    time.sleep(1)
+                    self.waits.element_stable("estrategias_clic.scroll", button, max_wait=1)
                     
                     # Resaltar el botón
                     original_style = button.get_attribute('style')
@@ -439,7 +2912,7 @@ class SenaAutomation:
         """Verifica si el clic fue exitoso"""
         try:
             # Esperar cambios en la página
-            time.sleep(2)
+            self.waits.settle("verificar_clic", max_wait=2)
             
             # Verificar si hay indicadores de carga o cambios
             loading_indicators = [
@@ -507,57 +2980,82 @@ class SenaAutomation:
 
             
 
-    def click_agregar_y_consultar_aspirantes_with_validation(self, timeout=10):
-        """Clic en Agregar, luego en Consultar Aspirantes y finalmente en Generar Reporte."""
-        try:
-            self.logger.info("🎯 AGREGAR Y CONSULTAR ASPIRANTES CON VALIDACIÓN")
+    def click_agregar_y_consultar_aspirantes_with_validation(self, timeout=10, ficha=None):
+        """Clic en Agregar, luego en Consultar Aspirantes, Generar Reporte y espera la descarga."""
+        self.logger.info("🎯 AGREGAR Y CONSULTAR ASPIRANTES CON VALIDACIÓN")
+        if not self.click_agregar_ficha():
+            return False
+        return self.consultar_aspirantes_y_generar_reporte(timeout, ficha)
 
-            # Paso 1: Clic en Agregar
+    @traced("agregar")
+    def click_agregar_ficha(self):
+        """Clic en 'Agregar' sobre el resultado de la búsqueda (siempre la fila 0)"""
+        try:
             agregar_button = self.wait.until(
                 EC.element_to_be_clickable((By.ID, "form:dtFichas:0:imgSelec"))
             )
             self.driver.execute_script("arguments[0].scrollIntoView(true);", agregar_button)
-            time.sleep(0.5)
+            self.waits.element_stable("agregar.scroll", agregar_button, max_wait=0.5)
             agregar_button.click()
             self.logger.info("✅ Clic en 'Agregar' exitoso")
+            self.remember_step("agregar")
+            return True
 
-            # Paso 2: Esperar iframe objetivo
+        except Exception as e:
+            self.logger.error(f"❌ Error al hacer clic en 'Agregar': {e}")
+            self.record_failure(FailureKind.from_exception(e), str(e))
             self.driver.switch_to.default_content()
-            self.logger.info("⏳ Esperando iframe 'contenido'...")
-            target_iframe = WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_element_located(
-                    (By.XPATH, "//iframe[@id='contenido' or @name='contenido' or contains(@src, 'generarReporteInscripcion.faces')]")
+            return False
+
+    def consultar_aspirantes_y_generar_reporte(self, timeout=10, ficha=None):
+        """Consultar Aspirantes -> Generar Reporte -> espera la descarga, con las fichas ya agregadas"""
+        try:
+            with self.telemetry.span("consultar_aspirantes"):
+                # Paso 2: Esperar iframe objetivo
+                self.driver.switch_to.default_content()
+                self.logger.info("⏳ Esperando iframe 'contenido'...")
+                WebDriverWait(self.driver, timeout).until(lambda driver: self.switch_to_contenido())
+                self.logger.info("✅ Iframe 'contenido' encontrado y activado")
+
+                # Paso 3: Clic en Consultar Aspirantes
+                consultar_btn = WebDriverWait(self.driver, timeout).until(
+                    EC.element_to_be_clickable((By.XPATH, "//input[contains(@value, 'Consultar aspirantes')]"))
                 )
-            )
-            self.driver.switch_to.frame(target_iframe)
-            self.logger.info("✅ Iframe 'contenido' encontrado y activado")
+                self.driver.execute_script("arguments[0].scrollIntoView(true);", consultar_btn)
+                self.waits.element_stable("consultar_aspirantes.scroll", consultar_btn, max_wait=0.5)
+                consultar_btn.click()
+                self.logger.info("✅ Clic en 'Consultar aspirantes' exitoso")
+                self.remember_step("consultar_aspirantes")
 
-            # Paso 3: Clic en Consultar Aspirantes
-            consultar_btn = WebDriverWait(self.driver, timeout).until(
-                EC.element_to_be_clickable((By.XPATH, "//input[contains(@value, 'Consultar aspirantes')]"))
-            )
-            self.driver.execute_script("arguments[0].scrollIntoView(true);", consultar_btn)
-            time.sleep(0.5)
-            consultar_btn.click()
-            self.logger.info("✅ Clic en 'Consultar aspirantes' exitoso")
-
-            # Paso 4: Esperar y hacer clic en Generar Reporte
-            self.logger.info("⏳ Esperando 2 segundos para 'Generar reporte'...")
-            time.sleep(2)
-            generar_btn = WebDriverWait(self.driver, 5).until(
-                EC.element_to_be_clickable((By.ID, "frmPrincipal:btnGenerar"))
-            )
-            self.driver.execute_script("arguments[0].scrollIntoView(true);", generar_btn)
-            time.sleep(0.5)
-            generar_btn.click()
-            self.logger.info("✅ Clic en 'Generar reporte' exitoso")
+            with self.telemetry.span("generar_reporte"):
+                # Paso 4: Esperar y hacer clic en Generar Reporte
+                self.logger.info("⏳ Esperando 'Generar reporte' (máx. 2 segundos)...")
+                self.waits.settle("generar_reporte.espera", max_wait=2, locator=(By.ID, "frmPrincipal:btnGenerar"))
+                generar_btn = WebDriverWait(self.driver, 5).until(
+                    EC.element_to_be_clickable((By.ID, "frmPrincipal:btnGenerar"))
+                )
+                self.driver.execute_script("arguments[0].scrollIntoView(true);", generar_btn)
+                self.waits.element_stable("generar_reporte.scroll", generar_btn, max_wait=0.5)
+                archivos_previos = self.downloads.snapshot()
+                generar_btn.click()
+                self.logger.info("✅ Clic en 'Generar reporte' exitoso")
+                self.remember_step("generar_reporte")
 
             # Volver al contexto principal
             self.driver.switch_to.default_content()
+
+            # Paso 5: Esperar a que la descarga termine antes de seguir
+            self.logger.info("⏳ Esperando la descarga del reporte...")
+            self.last_report_path = self.downloads.wait_for_download(
+                ficha or "reporte", archivos_previos, timeout=self.download_timeout
+            )
+            if self.last_report_path is None:
+                return self.record_failure(FailureKind.TIMEOUT, "La descarga del reporte no terminó")
             return True
 
         except Exception as e:
             self.logger.error(f"❌ Error en flujo completo: {e}")
+            self.record_failure(FailureKind.from_exception(e), str(e))
             self.driver.switch_to.default_content()
             return False
 
@@ -565,14 +3063,15 @@ class SenaAutomation:
 
     # ... resto de métodos originales sin cambios ...
     def read_excel_fichas(self, excel_path):
-        """Lee el archivo Excel y extrae los números de ficha"""
+        """Lee el archivo de fichas (Excel, CSV o texto) y extrae los números de ficha"""
         try:
-            df = pd.read_excel(excel_path)
-            fichas = df.iloc[:, 0].tolist()
-            self.logger.info(f"Se encontraron {len(fichas)} fichas en el Excel")
+            result = FichaIngestion.parse(excel_path)
+            self.logger.info(f"Se encontraron {result.summary()} en el archivo")
             if self.gui_callback:
-                self.gui_callback(f"Se encontraron {len(fichas)} fichas en el Excel")
-            return fichas
+                self.gui_callback(f"Se encontraron {result.summary()} en el archivo")
+            for row, value in result.invalid_samples:
+                self.logger.warning(f"⚠️ Fila {row}: valor de ficha inválido '{value}'")
+            return result.fichas
         except Exception as e:
             self.logger.error(f"Error al leer el Excel: {e}")
             if self.gui_callback:
@@ -587,7 +3086,17 @@ class SenaAutomation:
                 self.gui_callback("Buscando iframe de login...")
             
             # Esperar un poco más para que la página cargue completamente
-            time.sleep(3)
+            self.waits.settle("login_iframe.carga", max_wait=3)
+            
+            # Localizador de un solo script; el iframe de JOSSO (otro origen) se revisa entrando con el driver
+            try:
+                located = self.locate_element(self.LOGIN_FORM_LOCATOR, include_default_content=True)
+                if located is not None:
+                    self.logger.info(f"✅ Formulario de login encontrado en ruta de iframes {located[0] or 'principal'}")
+                    return True
+            except Exception as e:
+                self.logger.warning(f"⚠️ Localizador de frames no disponible ({e}), probando iframe por iframe")
+            self.driver.switch_to.default_content()
             
             # Estrategia 1: Buscar por src que contenga 'josso'
             iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
@@ -658,6 +3167,7 @@ class SenaAutomation:
             self.driver.switch_to.default_content()
             return False
 
+    @traced("navigate_to_sena")
     def navigate_to_sena(self):
         """Navega al sitio de SENA Sofia Plus y hace login"""
         try:
@@ -665,8 +3175,8 @@ class SenaAutomation:
             if self.gui_callback:
                 self.gui_callback("Navegando a SENA Sofia Plus...")
             
-            self.driver.get("http://senasofiaplus.edu.co/sofia-public/")
-            time.sleep(5)  # Aumentar tiempo de espera
+            self.driver.get(self.base_url)
+            self.waits.settle("navigate_to_sena.carga_inicial", max_wait=5)
             
             # Manejar advertencia SSL con múltiples selectores
             try:
@@ -678,32 +3188,38 @@ class SenaAutomation:
                     (By.XPATH, "//a[contains(text(), 'Continuar')]")
                 ]
                 
-                for selector_type, selector_value in ssl_selectors:
-                    try:
-                        continue_button = self.driver.find_element(selector_type, selector_value)
-                        continue_button.click()
-                        self.logger.info("✅ Advertencia SSL manejada")
-                        time.sleep(3)
-                        break
-                    except:
-                        continue
+                def click_ssl_button(selector):
+                    self.driver.find_element(*selector).click()
+                    return True
+                
+                if self.selectors.first_success("advertencia_ssl", ssl_selectors, click_ssl_button):
+                    self.logger.info("✅ Advertencia SSL manejada")
+                    self.waits.settle("navigate_to_sena.ssl", max_wait=3)
                         
             except:
                 self.logger.info("No se encontró advertencia SSL o ya se pasó")
             
             # Esperar más tiempo para que la página cargue completamente
-            time.sleep(3)
+            self.waits.settle("navigate_to_sena.carga_completa", max_wait=3)
             
-            if not self.switch_to_login_iframe():
-                self.logger.error("❌ Error en la navegación inicial")
-                if self.gui_callback:
-                    self.gui_callback("❌ Error en la navegación inicial")
-                return False
-            
-            if not self.login():
-                return False
+            # Un solo worker hace login a la vez; los demás reutilizan sus cookies
+            with self.session_cookies.login_lock:
+                if not self.restore_session_cookies():
+                    if not self.switch_to_login_iframe():
+                        self.logger.error("❌ Error en la navegación inicial")
+                        if self.gui_callback:
+                            self.gui_callback("❌ Error en la navegación inicial")
+                        return False
+                    
+                    if not self.login():
+                        return False
+                    
+                    if not self.select_role():
+                        return False
+                    
+                    self.save_session_cookies()
             
-            if not self.post_login_navigation():
+            if not self.navigate_to_inscripcion():
                 return False
             
             return True
@@ -714,6 +3230,72 @@ class SenaAutomation:
                 self.gui_callback(f"Error al navegar al sitio: {e}")
             return False
 
+    def save_session_cookies(self):
+        """Guarda las cookies del login JOSSO para reutilizarlas en otros navegadores"""
+        try:
+            self.driver.switch_to.default_content()
+            if self.session_cookies.save(self.driver.get_cookies()):
+                self.logger.info("🍪 Cookies de login guardadas")
+            else:
+                self.logger.warning("⚠️ No hay cookies de JOSSO visibles; cada worker hará su propio login")
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudieron guardar las cookies de sesión: {e}")
+
+    def restore_session_cookies(self):
+        """Inyecta las cookies del login JOSSO guardado y verifica que sigan siendo válidas.
+
+        El servidor abre para este navegador su propia sesión de la aplicación,
+        así que puede pedir el rol antes de mostrar el menú.
+        """
+        cookies = self.session_cookies.load()
+        if not cookies:
+            return False
+        
+        try:
+            self.logger.info("🍪 Probando sesión guardada...")
+            self.driver.switch_to.default_content()
+            for cookie in cookies:
+                cookie = {
+                    key: value for key, value in cookie.items()
+                    if key in ('name', 'value', 'path', 'domain', 'secure', 'httpOnly', 'expiry', 'sameSite')
+                }
+                if cookie.get('sameSite') not in ('Strict', 'Lax', 'None'):
+                    cookie.pop('sameSite', None)
+                try:
+                    self.driver.add_cookie(cookie)
+                except:
+                    continue
+            
+            self.driver.get(self.base_url)
+            landed = self.waits.until(
+                "sesion_cookies.validacion",
+                lambda: self.waits.page_idle() and self.driver.find_elements(
+                    By.XPATH, "//span[@class='menuPrimario'] | //*[@id='seleccionRol:roles']"
+                ),
+                max_wait=5
+            )
+            if landed and self.driver.find_elements(By.ID, "seleccionRol:roles"):
+                self.select_role()
+            valid = self.driver.find_elements(By.XPATH, "//span[@class='menuPrimario']")
+            if valid:
+                self.logger.info("✅ Sesión reutilizada sin login")
+                if self.gui_callback:
+                    self.gui_callback("✅ Sesión reutilizada sin login")
+                return True
+            
+            self.logger.info("Sesión guardada inválida, se hará login completo")
+            self.session_cookies.invalidate()
+            self.driver.delete_all_cookies()
+            self.driver.get(self.base_url)
+            self.waits.settle("navigate_to_sena.carga_completa", max_wait=3)
+            return False
+            
+        except Exception as e:
+            self.logger.warning(f"⚠️ Error reutilizando la sesión guardada: {e}")
+            self.session_cookies.invalidate()
+            return False
+
+    @traced("login")
     def login(self):
         """Realiza el proceso de login"""
         try:
@@ -737,12 +3319,16 @@ class SenaAutomation:
             ingresar_button.click()
             self.logger.info("Botón INGRESAR presionado")
             
-            time.sleep(5)
             self.driver.switch_to.default_content()
             self.logger.info("Volviendo al contexto principal")
             
             try:
-                time.sleep(3)
+                # Esperar a que aparezca el selector de rol (máx. 8 s)
+                self.waits.until(
+                    "login.respuesta",
+                    lambda: self.waits.page_idle() and self.driver.find_elements(By.ID, "seleccionRol:roles"),
+                    max_wait=8
+                )
                 current_url = self.driver.current_url
                 self.logger.info(f"URL actual después del login: {current_url}")
                 
@@ -770,6 +3356,8 @@ class SenaAutomation:
             if not self.select_role():
                 return False
             
+            self.save_session_cookies()
+            
             if not self.navigate_to_inscripcion():
                 return False
             
@@ -778,6 +3366,7 @@ class SenaAutomation:
             self.logger.error(f"Error en la navegación post-login: {e}")
             return False
 
+    @traced("select_role")
     def select_role(self):
         """Selecciona el rol después del login"""
         try:
@@ -790,15 +3379,20 @@ class SenaAutomation:
             )
             
             select = Select(role_select)
-            select.select_by_value("33")
+            select.select_by_value(self.ROL_ENCARGADO_INGRESO)
             self.logger.info("Rol 'Encargado de ingreso centro formación' seleccionado")
-            time.sleep(2)
+            self.waits.until(
+                "select_role.menu",
+                lambda: self.waits.page_idle() and self.driver.find_elements(By.XPATH, "//span[@class='menuPrimario']"),
+                max_wait=2
+            )
             return True
             
         except Exception as e:
             self.logger.error(f"Error al seleccionar rol: {e}")
             return False
 
+    @traced("navigate_to_inscripcion")
     def navigate_to_inscripcion(self):
         """Navega a la opción 'Inscripción' en el menú principal"""
         try:
@@ -811,21 +3405,23 @@ class SenaAutomation:
             )
             inscripcion_link.click()
             self.logger.info("Clic en 'Inscripción' exitoso")
-            time.sleep(2)
+            self.waits.settle("inscripcion.menu", max_wait=2)
             
             consultas_link = self.wait.until(
                 EC.element_to_be_clickable((By.XPATH, "//a[contains(text(),'Consultas')]"))
             )
             consultas_link.click()
             self.logger.info("Clic en 'Consultas' exitoso")
-            time.sleep(2)
+            self.waits.settle("inscripcion.consultas", max_wait=2)
             
             generar_reporte_link = self.wait.until(
                 EC.element_to_be_clickable((By.XPATH, "//a[contains(text(),'Generar Reporte de Inscripción')]"))
             )
+            self.driver.execute_script(WaitEngine.MARK_REPORT_FRAME_SCRIPT)
             generar_reporte_link.click()
             self.logger.info("Clic en 'Generar Reporte de Inscripción' exitoso")
-            time.sleep(3)
+            self.waits.until("inscripcion.generar_reporte", self.waits.report_frame_ready, max_wait=3)
+            self.remember_step("formulario_reporte")
             
             return True
             
@@ -833,41 +3429,163 @@ class SenaAutomation:
             self.logger.error(f"Error al navegar a 'Inscripción': {e}")
             return False
 
-    def seleccionar_primera_opcion(self):
-        """Selecciona 'Primera Opción' y devuelve la ruta de iframes donde se encontró"""
+    def switch_to_frame_path(self, ruta_iframes):
+        """Entra desde el contexto principal a la ruta de iframes indicada"""
+        self.driver.switch_to.default_content()
+        for pos in ruta_iframes:
+            frame = self.driver.find_elements(By.TAG_NAME, "iframe")[pos]
+            self.driver.switch_to.frame(frame)
+
+    def locate_element(self, locator, include_default_content=False, visible_only=False):
+        """Busca 'locator' en todo el árbol de iframes con FRAME_LOCATOR_SCRIPT.
+
+        Los iframes del mismo origen se recorren dentro del script; solo los de
+        otro origen (p. ej. el login de JOSSO) obligan a entrar con el driver y
+        repetir el script desde ahí. Deja el driver en el frame encontrado y
+        devuelve (ruta, elemento), o None si no está en ningún frame.
+        """
+        by, value = locator
+        pending = [[]]
+        while pending:
+            base = pending.pop(0)
+            try:
+                self.switch_to_frame_path(base)
+                result = self.driver.execute_script(
+                    self.FRAME_LOCATOR_SCRIPT, by, value, visible_only, include_default_content or bool(base)
+                )
+            except Exception:
+                if not base:
+                    raise
+                continue
+
+            if result['ruta'] is not None:
+                ruta = base + result['ruta']
+                if result['ruta']:
+                    self.switch_to_frame_path(ruta)
+                for element in self.driver.find_elements(*locator):
+                    if not visible_only or element.is_displayed():
+                        return ruta, element
+            pending.extend(base + ruta for ruta in result['origen_cruzado'])
+
+        self.driver.switch_to.default_content()
+        return None
+
+    def discover_frame_path(self, locator, include_default_content=False, visible_only=False):
+        """Busca 'locator' en todos los iframes con un solo script; deja el driver en ese frame y devuelve la ruta"""
         try:
-            self.driver.switch_to.default_content()
-            time.sleep(1)
+            located = self.locate_element(locator, include_default_content, visible_only)
+            return located[0] if located else None
+        except Exception as e:
+            self.logger.warning(f"⚠️ Localizador de frames falló ({e}), recorriendo iframes uno a uno")
+            return self.discover_frame_path_legacy(locator, include_default_content, visible_only)
+
+    def discover_frame_path_legacy(self, locator, include_default_content=False, visible_only=False):
+        """Recorre iframes externos e internos buscando 'locator'; deja el driver en ese frame y devuelve la ruta"""
 
-            outer_iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
+        def found():
+            elements = self.driver.find_elements(*locator)
+            if visible_only:
+                return any(element.is_displayed() for element in elements)
+            return len(elements) > 0
+
+        self.driver.switch_to.default_content()
+        if include_default_content and found():
+            return []
 
-            for i, outer in enumerate(outer_iframes):
+        outer_iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
+        for i, outer in enumerate(outer_iframes):
+            try:
                 self.driver.switch_to.default_content()
                 self.driver.switch_to.frame(outer)
+                if found():
+                    return [i]
 
-                # Buscar en iframe externo
-                try:
-                    select_element = self.driver.find_element(By.ID, "opcionesInscritos")
-                    Select(select_element).select_by_value("1")
-                    self.logger.info("✓ 'Primera Opción' seleccionada correctamente")
-                    return [i]  # Ruta de iframes: solo el externo
-                except:
-                    # Buscar en iframes internos
-                    inner_iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
-                    for j, inner in enumerate(inner_iframes):
+                inner_iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
+                for j, inner in enumerate(inner_iframes):
+                    try:
                         self.driver.switch_to.default_content()
                         self.driver.switch_to.frame(outer)
                         self.driver.switch_to.frame(inner)
-                        try:
-                            select_element = self.driver.find_element(By.ID, "opcionesInscritos")
-                            Select(select_element).select_by_value("1")
-                            self.logger.info("✓ 'Primera Opción' seleccionada correctamente (iframe interno)")
-                            return [i, j]  # Ruta: externo + interno
-                        except:
-                            continue
-
-            self.logger.error("❌ No se encontró el select 'opcionesInscritos'")
-            return None
+                        if found():
+                            return [i, j]
+                    except:
+                        continue
+            except:
+                continue
+
+        self.driver.switch_to.default_content()
+        return None
+
+    def enter_cached_frame(self, key, locator, include_default_content=False, visible_only=False):
+        """Entra al frame donde está 'locator' usando la ruta cacheada; solo recorre los iframes si la ruta dejó de ser válida"""
+        ruta_iframes = self.frame_cache.get(key)
+        if ruta_iframes is not None:
+            try:
+                self.switch_to_frame_path(ruta_iframes)
+                elements = self.driver.find_elements(*locator)
+                # Con visible_only un elemento oculto en la ruta cacheada no cuenta como acierto
+                if any(element.is_displayed() for element in elements) if visible_only else elements:
+                    self.frame_cache.hits += 1
+                    return ruta_iframes
+            except:
+                pass
+            self.logger.info(f"Ruta de iframes para '{key}' inválida, buscando de nuevo...")
+            self.frame_cache.invalidate(key)
+
+        self.frame_cache.misses += 1
+        ruta_iframes = self.discover_frame_path(locator, include_default_content, visible_only)
+        if ruta_iframes is not None:
+            self.frame_cache.store(key, ruta_iframes)
+        return ruta_iframes
+
+    def switch_to_contenido(self):
+        """Entra al iframe 'contenido' del reporte usando la ruta cacheada"""
+        key = "contenido iframe"
+        ruta_iframes = self.frame_cache.get(key)
+        if ruta_iframes is not None:
+            try:
+                self.switch_to_frame_path(ruta_iframes)
+                pathname = self.driver.execute_script("return location.pathname;") or ""
+                if "generarreporteinscripcion" in pathname.lower():
+                    self.frame_cache.hits += 1
+                    return True
+            except:
+                pass
+            self.frame_cache.invalidate(key)
+
+        self.frame_cache.misses += 1
+        self.driver.switch_to.default_content()
+        target_iframes = self.driver.find_elements(By.XPATH, self.CONTENIDO_XPATH)
+        if not target_iframes:
+            return False
+        pos = self.driver.execute_script(
+            "return Array.prototype.indexOf.call(document.getElementsByTagName('iframe'), arguments[0]);",
+            target_iframes[0]
+        )
+        self.driver.switch_to.frame(target_iframes[0])
+        if pos is not None and pos >= 0:
+            self.frame_cache.store(key, [pos])
+        return True
+
+    @traced("seleccionar_primera_opcion", fail_on_none=True)
+    def seleccionar_primera_opcion(self):
+        """Selecciona 'Primera Opción' y devuelve la ruta de iframes donde se encontró"""
+        try:
+            self.driver.switch_to.default_content()
+            self.waits.settle("primera_opcion.inicio", max_wait=1)
+
+            ruta_iframes = self.enter_cached_frame("opcionesInscritos select", (By.ID, "opcionesInscritos"))
+            if ruta_iframes is None:
+                self.logger.error("❌ No se encontró el select 'opcionesInscritos'")
+                return None
+
+            select_element = self.driver.find_element(By.ID, "opcionesInscritos")
+            Select(select_element).select_by_value(self.PRIMERA_OPCION)
+            if len(ruta_iframes) > 1:
+                self.logger.info("✓ 'Primera Opción' seleccionada correctamente (iframe interno)")
+            else:
+                self.logger.info("✓ 'Primera Opción' seleccionada correctamente")
+            return ruta_iframes
 
         except Exception as e:
             self.logger.error(f"❌ Error seleccionando opción: {e}")
@@ -884,18 +3602,18 @@ class SenaAutomation:
                 "//*[contains(@title, 'Consultar ficha')]"
             ]
             
-            for selector in selectors:
-                try:
-                    boton = self.driver.find_element(By.XPATH, selector)
-                    self.driver.execute_script("arguments[0].scrollIntoView(true);", boton)
-                    time.sleep(0.5)
-                    boton.click()
-                    self.logger.info(f"✓ Clic exitoso con selector: {selector}")
-                    return True
-                except:
-                    continue
-                    
-            return False
+            def click_selector(selector):
+                boton = self.driver.find_element(By.XPATH, selector[0])
+                self.driver.execute_script("arguments[0].scrollIntoView(true);", boton)
+                self.waits.element_stable("consultar_ficha.scroll", boton, max_wait=0.5)
+                boton.click()
+                self.logger.info(f"✓ Clic exitoso con selector: {selector[0]}")
+                return True
+            
+            clicked = self.selectors.first_success(
+                "consultar_ficha", [(selector,) for selector in selectors], click_selector
+            )
+            return bool(clicked)
             
         except:
             return False
@@ -909,14 +3627,7 @@ class SenaAutomation:
                 return False
 
             # Navegar de nuevo a la misma ruta de iframes
-            self.driver.switch_to.default_content()
-            for idx, pos in enumerate(ruta_iframes):
-                if idx == 0:
-                    outer = self.driver.find_elements(By.TAG_NAME, "iframe")[pos]
-                    self.driver.switch_to.frame(outer)
-                elif idx == 1:
-                    inner = self.driver.find_elements(By.TAG_NAME, "iframe")[pos]
-                    self.driver.switch_to.frame(inner)
+            self.enter_cached_frame("opcionesInscritos select", (By.ID, "opcionesInscritos"))
 
             # Buscar el botón en el mismo contexto
             if self.try_click_ficha_button_in_current_frame():
@@ -930,50 +3641,45 @@ class SenaAutomation:
             self.logger.error(f"❌ Error al buscar el botón: {e}")
             return False
 
-    def wait_for_form_and_insert_ficha(self, ficha):
-        """Espera a que aparezca el formulario y procesa la ficha completa"""
+    def wait_for_form_and_insert_ficha(self, ficha, generate=True):
+        """Espera a que aparezca el formulario y procesa la ficha completa (con generate=False solo la agrega)"""
         try:
             self.logger.info(f"Esperando formulario para ficha: {ficha}")
             
-            # PASO 1: Esperar un poco para que el formulario se cargue después del clic
-            self.logger.info("Esperando que se cargue el formulario...")
-            time.sleep(1)
-            
-            # PASO 2: Buscar e insertar la ficha en el campo de input
-            self.logger.info("Buscando el campo de input en el contexto actual (iframe)...")
-            input_ficha = None
-            
-            try:
-                # Intentar encontrar el input en el iframe actual (donde se hizo el clic)
-                input_ficha = self.wait.until(
-                    EC.element_to_be_clickable((By.ID, "form:codigoFichaITX"))
-                )
-                self.logger.info("✓ Campo de input encontrado en el iframe actual")
-                
-                # Procesar el input
-                if not self.process_input_field(input_ficha, ficha):
+            # PASOS 1-3 en un solo script; con teclado solo si el valor no quedó
+            if self.fill_and_submit_ficha(ficha):
+                self.remember_step("buscar_ficha")
+            else:
+                if self.last_fill_result in (None, 'sin_campo', 'no_interactuable'):
+                    # El campo no está (o no se ve) en este frame: buscarlo directamente en los demás contextos
+                    if not self.find_and_process_input_in_all_contexts(ficha):
+                        return self.record_failure(FailureKind.TIMEOUT, "Campo 'form:codigoFichaITX' no disponible")
+                elif not self.insert_ficha_in_current_frame(ficha):
                     return False
+                self.remember_step("ficha_insertada")
                 
-            except:
-                self.logger.error("❌ No se encontró el input en el iframe actual, buscando en otros contextos...")
-                # Si no se encuentra en el iframe actual, buscar en todos los contextos
-                if not self.find_and_process_input_in_all_contexts(ficha):
-                    return False
-            
-            # PASO 3: Hacer clic en el botón "Consultar" después de insertar la ficha
-            self.logger.info("Buscando el botón 'Consultar' para ejecutar la búsqueda (en iframe)...")
-            if not self.click_consultar_button_in_iframe():
-                self.logger.error("❌ No se pudo hacer clic en el botón 'Consultar'")
-                return False
+                # PASO 3: Hacer clic en el botón "Consultar" después de insertar la ficha
+                self.logger.info("Buscando el botón 'Consultar' para ejecutar la búsqueda (en iframe)...")
+                if not self.click_consultar_button_in_iframe():
+                    self.logger.error("❌ No se pudo hacer clic en el botón 'Consultar'")
+                    return self.record_failure(FailureKind.TIMEOUT, "Botón 'form:buscarCBT' no disponible")
+                self.remember_step("buscar_ficha")
             
-            # PASO 4: Esperar 2 segundos y hacer clic en el botón "Agregar"
-            self.logger.info("Esperando 2 segundos para que aparezcan los resultados (en iframe)...")
-            time.sleep(1)
+            # PASO 4: Esperar los resultados y hacer clic en el botón "Agregar"
+            self.logger.info("Esperando que aparezcan los resultados (en iframe)...")
+            self.waits.settle("resultados_ficha", max_wait=1, locator=(By.ID, "form:dtFichas:0:imgSelec"))
+            self.remember_step("resultados_ficha")
+            if self.ficha_not_found():
+                self.logger.error(f"❌ La ficha {ficha} no existe")
+                return self.record_failure(FailureKind.FICHA_NO_ENCONTRADA, f"Ficha {ficha} sin resultados")
 
 
+            if not generate:
+                # Modo lote: solo agregar la ficha a la selección
+                return self.click_agregar_ficha()
             
             # USAR LA NUEVA FUNCIÓN CON VALIDACIÓN
-            if not self.click_agregar_y_consultar_aspirantes_with_validation():
+            if not self.click_agregar_y_consultar_aspirantes_with_validation(ficha=ficha):
                 self.logger.error(f"❌ No se pudo completar el paso Agregar -> Consultar aspirantes para ficha {ficha}")
                 return False
 
@@ -981,68 +3687,107 @@ class SenaAutomation:
                 
         except Exception as e:
             self.logger.error(f"❌ Error general al procesar ficha {ficha}: {e}")
-            try:
-                self.driver.save_screenshot(f"error_ficha_{ficha}_form.png")
-                self.logger.info(f"Screenshot guardado: error_ficha_{ficha}_form.png")
-            except:
-                pass
+            # La captura y el HTML se guardan al cerrar la ficha fallida (capture_failure)
+            return self.record_failure(FailureKind.from_exception(e), str(e))
+
+    def insert_ficha_in_current_frame(self, ficha):
+        """Camino con teclado en el frame actual; si el campo no aparece, lo busca en los demás contextos"""
+        # PASO 1: Esperar un poco para que el formulario se cargue después del clic
+        self.logger.info("Esperando que se cargue el formulario...")
+        self.waits.settle("formulario_ficha.carga", max_wait=1)
+        
+        # PASO 2: Buscar e insertar la ficha en el campo de input
+        self.logger.info("Buscando el campo de input en el contexto actual (iframe)...")
+        try:
+            # Intentar encontrar el input en el iframe actual (donde se hizo el clic)
+            input_ficha = self.wait.until(
+                EC.element_to_be_clickable((By.ID, "form:codigoFichaITX"))
+            )
+            self.logger.info("✓ Campo de input encontrado en el iframe actual")
+        except:
+            self.logger.error("❌ No se encontró el input en el iframe actual, buscando en otros contextos...")
+            # Si no se encuentra en el iframe actual, buscar en todos los contextos
+            if not self.find_and_process_input_in_all_contexts(ficha):
+                return self.record_failure(FailureKind.TIMEOUT, "Campo 'form:codigoFichaITX' no disponible")
+            return True
+        
+        # Procesar el input
+        return self.process_input_field(input_ficha, ficha)
+
+    @traced("llenar_y_buscar")
+    def fill_and_submit_ficha(self, ficha):
+        """Inserta la ficha y pulsa 'Consultar' con FILL_AND_SUBMIT_SCRIPT; False para usar el teclado.
+
+        El resultado del script queda en self.last_fill_result para elegir el camino alternativo.
+        """
+        state = {'result': None}
+        token = f"{ficha}-{time.time_ns()}"
+
+        def condition():
+            state['result'] = None
+            state['result'] = self.driver.execute_script(self.FILL_AND_SUBMIT_SCRIPT, str(ficha), token)
+            # Mientras el formulario no esté completo se sigue sondeando; un valor distinto corta la espera
+            return state['result'] not in ('sin_campo', 'no_interactuable', 'sin_boton')
+
+        self.waits.until("formulario_ficha.llenar_y_buscar", condition, max_wait=self.FILL_SCRIPT_MAX_WAIT)
+        result = self.last_fill_result = state['result']
+        if result == 'ok':
+            self.logger.info(f"✓ Ficha '{ficha}' insertada y 'Consultar' pulsado (un solo script)")
+            return True
+        self.logger.warning(f"⚠️ Llenado por script no verificado ({result}), se usa el teclado")
+        return False
+
+    def ficha_not_found(self):
+        """Sin fila 'Agregar' y con mensaje de 'sin resultados' en el iframe actual"""
+        try:
+            if self.driver.find_elements(By.ID, "form:dtFichas:0:imgSelec"):
+                return False
+            text = self.driver.execute_script(
+                "return document.body ? document.body.innerText.slice(0, 5000) : '';"
+            ) or ""
+        except Exception:
             return False
+        text = text.lower()
+        return any(marker in text for marker in ("no se encontr", "no existen registros", "sin resultados"))
 
+    @traced("click_consultar_button_in_iframe")
     def click_consultar_button_in_iframe(self):
         """Hace clic en el botón 'Consultar' dentro del iframe para ejecutar la búsqueda"""
         try:
             self.logger.info("Buscando el botón 'Consultar' (form:buscarCBT) dentro del iframe...")
             
-            # Estrategia 1: Buscar por ID específico
-            try:
-                consultar_button = self.wait.until(
-                    EC.element_to_be_clickable((By.ID, "form:buscarCBT"))
-                )
-                self.logger.info("✓ Botón 'Consultar' encontrado por ID en iframe")
+            # Por ID se espera hasta que sea clickeable; por NAME o valor se busca directamente
+            strategies = [
+                ("ID", By.ID, "form:buscarCBT"),
+                ("NAME", By.NAME, "form:buscarCBT"),
+                ("valor", By.XPATH, "//input[@value='Consultar']")
+            ]
+            
+            def click_strategy(strategy):
+                label, by_type, selector = strategy
+                if by_type == By.ID:
+                    consultar_button = self.wait.until(EC.element_to_be_clickable((by_type, selector)))
+                else:
+                    consultar_button = self.driver.find_element(by_type, selector)
+                    if not (consultar_button.is_displayed() and consultar_button.is_enabled()):
+                        return False
+                self.logger.info(f"✓ Botón 'Consultar' encontrado por {label} en iframe")
                 
                 # Hacer scroll al botón
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", consultar_button)
-                time.sleep(0.5)
+                self.waits.element_stable("consultar.scroll", consultar_button, max_wait=0.5)
                 
                 # Hacer clic
                 consultar_button.click()
                 self.logger.info("✓ Clic exitoso en el botón 'Consultar' en iframe")
                 
                 # Esperar a que se procese la búsqueda
-                self.logger.info("Esperando 2 segundos para que aparezcan los resultados (en iframe)...")
-                time.sleep(1)
+                self.logger.info("Esperando que aparezcan los resultados (en iframe)...")
+                self.waits.settle("consultar.busqueda", max_wait=2)
+                return True
+            
+            if self.selectors.first_success("consultar_ficha_busqueda", strategies, click_strategy):
                 return True
-                
-            except:
-                self.logger.error("❌ No se encontró el botón por ID en iframe, probando otros selectores...")
-                
-                # Estrategia 2: Buscar por name
-                try:
-                    consultar_button = self.driver.find_element(By.NAME, "form:buscarCBT")
-                    if consultar_button.is_displayed() and consultar_button.is_enabled():
-                        self.logger.info("✓ Botón 'Consultar' encontrado por NAME en iframe")
-                        self.driver.execute_script("arguments[0].scrollIntoView(true);", consultar_button)
-                        time.sleep(0.5)
-                        consultar_button.click()
-                        self.logger.info("✓ Clic exitoso en el botón 'Consultar' en iframe")
-                        time.sleep(2)
-                        return True
-                except:
-                    pass
-                
-                # Estrategia 3: Buscar por valor "Consultar"
-                try:
-                    consultar_button = self.driver.find_element(By.XPATH, "//input[@value='Consultar']")
-                    if consultar_button.is_displayed() and consultar_button.is_enabled():
-                        self.logger.info("✓ Botón 'Consultar' encontrado por valor en iframe")
-                        self.driver.execute_script("arguments[0].scrollIntoView(true);", consultar_button)
-                        time.sleep(0.5)
-                        consultar_button.click()
-                        self.logger.info("✓ Clic exitoso en el botón 'Consultar' en iframe")
-                        time.sleep(2)
-                        return True
-                except:
-                    pass
             
             self.logger.error("❌ No se pudo encontrar el botón 'Consultar' con ninguna estrategia en iframe")
             return False
@@ -1056,59 +3801,18 @@ class SenaAutomation:
         try:
             self.logger.info("Buscando el campo de input en todos los contextos (fallback)...")
             
-            # Contexto 1: Página principal
-            self.logger.info("Probando contexto principal...")
-            self.driver.switch_to.default_content()
-            try:
+            ruta_iframes = self.enter_cached_frame(
+                "form:codigoFichaITX input",
+                (By.ID, "form:codigoFichaITX"),
+                include_default_content=True,
+                visible_only=True
+            )
+            if ruta_iframes is not None:
                 input_ficha = self.driver.find_element(By.ID, "form:codigoFichaITX")
                 if input_ficha.is_displayed():
-                    self.logger.info("✓ Campo encontrado en contexto principal")
+                    self.logger.info(f"✓ Campo encontrado en ruta de iframes {ruta_iframes or 'principal'}")
                     return self.process_input_field(input_ficha, ficha)
-            except:
-                pass
-            
-            # Contexto 2: Buscar en todos los iframes
-            self.logger.info("Buscando en todos los iframes...")
-            self.driver.switch_to.default_content()
-            all_iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
-            
-            for i, iframe in enumerate(all_iframes):
-                try:
-                    iframe_id = iframe.get_attribute('id')
-                    self.logger.info(f"Probando iframe {i+1} (ID: {iframe_id})...")
-                    
-                    # Cambiar al iframe
-                    self.driver.switch_to.default_content()
-                    self.driver.switch_to.frame(iframe)
-                    
-                    # Buscar el input
-                    try:
-                        input_ficha = self.driver.find_element(By.ID, "form:codigoFichaITX")
-                        if input_ficha.is_displayed():
-                            self.logger.info(f"✓ Campo encontrado en iframe {i+1}")
-                            return self.process_input_field(input_ficha, ficha)
-                    except:
-                        pass
-                    
-                    # Buscar en iframes anidados
-                    nested_iframes = self.driver.find_elements(By.TAG_NAME, "iframe")
-                    for j, nested in enumerate(nested_iframes):
-                        try:
-                            self.logger.info(f"  Probando iframe anidado {i+1}.{j+1}...")
-                            self.driver.switch_to.default_content()
-                            self.driver.switch_to.frame(iframe)
-                            self.driver.switch_to.frame(nested)
-                            
-                            input_ficha = self.driver.find_element(By.ID, "form:codigoFichaITX")
-                            if input_ficha.is_displayed():
-                                self.logger.info(f"✓ Campo encontrado en iframe anidado {i+1}.{j+1}")
-                                return self.process_input_field(input_ficha, ficha)
-                                
-                        except:
-                            continue
-                            
-                except Exception as e:
-                    continue
+                self.frame_cache.invalidate("form:codigoFichaITX input")
             
             self.logger.error("❌ No se encontró el campo de input en ningún contexto")
             self.driver.switch_to.default_content()
@@ -1119,6 +3823,7 @@ class SenaAutomation:
             self.driver.switch_to.default_content()
             return False
 
+    @traced("process_input_field")
     def process_input_field(self, input_element, ficha):
         """Procesa el campo de input insertando la ficha"""
         try:
@@ -1135,28 +3840,28 @@ class SenaAutomation:
             
             # Hacer scroll al elemento
             self.driver.execute_script("arguments[0].scrollIntoView(true);", input_element)
-            time.sleep(0.5)
+            self.waits.element_stable("input_ficha.scroll", input_element, max_wait=0.5)
             
             # Hacer clic para enfocar el campo
             self.logger.info("Haciendo clic en el campo de input...")
             input_element.click()
-            time.sleep(0.5)
+            self.waits.settle("input_ficha.click", max_wait=0.5)
             
             # Limpiar el campo
             self.logger.info("Limpiando el campo...")
             input_element.clear()
-            time.sleep(0.5)
+            self.waits.settle("input_ficha.limpiar", max_wait=0.5)
             
             # Insertar la ficha
             self.logger.info(f"Insertando ficha: {ficha}")
             input_element.send_keys(str(ficha))
-            time.sleep(1)
+            self.waits.settle("input_ficha.escritura", max_wait=1)
             
             # Verificar que se insertó correctamente
             inserted_value = input_element.get_attribute('value')
             if inserted_value == str(ficha):
                 self.logger.info(f"✓ Ficha '{ficha}' insertada correctamente")
-                time.sleep(1)
+                self.waits.settle("input_ficha.confirmacion", max_wait=1)
                 return True
             else:
                 self.logger.error(f"❌ Error: Se esperaba '{ficha}' pero se insertó '{inserted_value}'")
@@ -1179,21 +3884,16 @@ class SenaAutomation:
             ruta_iframes = self.seleccionar_primera_opcion()
             if ruta_iframes is None:
                 self.logger.error("❌ No se pudo seleccionar 'Primera Opción'")
-                return False
+                return self.record_failure(FailureKind.IFRAME_OBSOLETO, "No se encontró 'opcionesInscritos'")
+            self.remember_step("primera_opcion")
 
             # 2. Volver al mismo iframe y hacer clic en Consultar ficha
-            self.driver.switch_to.default_content()
-            for idx, pos in enumerate(ruta_iframes):
-                if idx == 0:
-                    outer = self.driver.find_elements(By.TAG_NAME, "iframe")[pos]
-                    self.driver.switch_to.frame(outer)
-                elif idx == 1:
-                    inner = self.driver.find_elements(By.TAG_NAME, "iframe")[pos]
-                    self.driver.switch_to.frame(inner)
+            self.enter_cached_frame("opcionesInscritos select", (By.ID, "opcionesInscritos"))
 
             if not self.try_click_ficha_button_in_current_frame():
                 self.logger.error(f"❌ No se pudo hacer clic en 'Consultar ficha' para ficha {ficha}")
-                return False
+                return self.record_failure(FailureKind.TIMEOUT, "Botón 'Consultar ficha' no disponible")
+            self.remember_step("consultar_ficha")
 
             self.logger.info("Esperando formulario para ficha...")
             if not self.wait_for_form_and_insert_ficha(ficha):
@@ -1207,62 +3907,626 @@ class SenaAutomation:
 
         except Exception as e:
             self.logger.error(f"❌ Error general al procesar ficha {ficha}: {e}")
+            return self.record_failure(FailureKind.from_exception(e), str(e))
+
+    def add_ficha_to_selection(self, ficha):
+        """Modo lote: Consultar ficha -> Insertar ficha -> Consultar -> Agregar, sin generar el reporte"""
+        self.driver.switch_to.default_content()
+        self.enter_cached_frame("opcionesInscritos select", (By.ID, "opcionesInscritos"))
+
+        # Si la búsqueda anterior no encontró la ficha el formulario sigue abierto;
+        # wait_for_form_and_insert_ficha lo busca en todos los contextos
+        if not self.try_click_ficha_button_in_current_frame():
+            self.logger.warning(f"⚠️ No se pudo hacer clic en 'Consultar ficha' para ficha {ficha}, "
+                                f"se intenta con el formulario abierto")
+
+        return self.wait_for_form_and_insert_ficha(ficha, generate=False)
+
+    def process_ficha_batch(self, fichas):
+        """Modo lote: agrega varias fichas a la selección, genera un solo reporte y lo divide por ficha.
+
+        Cada búsqueda muestra un único resultado, así que 'Agregar' siempre es la
+        fila 0. Devuelve {ficha: None si se guardó su reporte, o (tipo, detalle)}.
+        """
+        fichas = [str(ficha) for ficha in fichas]
+        self.report_paths = {}
+        self.logger.info(f"\n{'='*50}")
+        self.logger.info(f"PROCESANDO LOTE: {', '.join(fichas)}")
+        self.logger.info(f"{'='*50}")
+        if self.gui_callback:
+            self.gui_callback(f"PROCESANDO LOTE DE {len(fichas)} FICHAS")
+
+        if self.seleccionar_primera_opcion() is None:
+            failure = (FailureKind.IFRAME_OBSOLETO, "No se encontró 'opcionesInscritos'")
+            return {ficha: failure for ficha in fichas}
+
+        results = {}
+        added = []
+        for ficha in fichas:
+            self.last_failure = None
+            if self.add_ficha_to_selection(ficha):
+                added.append(ficha)
+                self.logger.info(f"✓ Ficha {ficha} agregada al lote ({len(added)}/{len(fichas)})")
+                continue
+            failure = self.classify_failure()
+            results[ficha] = failure
+            if failure[0] != FailureKind.FICHA_NO_ENCONTRADA:
+                # La página quedó en un estado incierto: se reintenta el resto del lote
+                for pending in fichas:
+                    results.setdefault(pending, failure)
+                return results
+
+        if not added:
+            return results
+
+        self.last_failure = None
+        if not self.consultar_aspirantes_y_generar_reporte(ficha="lote"):
+            failure = self.classify_failure()
+            results.update((ficha, failure) for ficha in added)
+            return results
+
+        try:
+            paths = ReportSplitter.split(self.last_report_path, added, self.output_dir)
+        except Exception as e:
+            self.logger.error(f"❌ No se pudo dividir el reporte combinado: {e}")
+            failure = (FailureKind.DESCONOCIDA, f"No se pudo dividir el reporte combinado: {e}")
+            results.update((ficha, failure) for ficha in added)
+            return results
+
+        self.report_paths = paths
+        for ficha in added:
+            path = paths.get(ficha)
+            if path is None:
+                self.logger.error(f"❌ El reporte combinado no trae filas de la ficha {ficha}")
+                results[ficha] = (FailureKind.ERROR_SERVIDOR, f"Reporte combinado sin filas de la ficha {ficha}")
+                continue
+            self.logger.info(f"📥 Reporte de la ficha {ficha} guardado en {path}")
+            results[ficha] = None
+        if self.gui_callback:
+            self.gui_callback(f"✓ Lote procesado: {len(paths)} reportes generados")
+        return results
+
+    def remember_step(self, step):
+        """Agrega una instantánea liviana del paso al buffer circular del worker (un solo comando)"""
+        if self.driver is None:
+            return
+        snapshot = {'paso': step, 'ts': round(time.time(), 3)}
+        try:
+            url, path, focused, dom_hash, dom_size = self.driver.execute_script(self.STEP_SNAPSHOT_SCRIPT)
+            snapshot.update(url=url, ruta_iframes=path, foco=focused, hash_dom=dom_hash, tamano_dom=dom_size)
+        except Exception as e:
+            snapshot['error'] = str(e)
+        self.step_ring.append(snapshot)
+
+    def capture_success(self, ficha):
+        """Guarda el estado final de una ficha exitosa; el almacén de dumps solo conserva 1 de cada sample_every"""
+        if self.driver is None:
+            return
+        self.save_page_html("Exito", f"Ficha {ficha}")
+
+    def capture_failure(self, ficha):
+        """Guarda la evidencia de una ficha fallida mientras el navegador sigue abierto"""
+        if self.driver is None:
+            return
+        kind, detail = self.last_failure or (FailureKind.DESCONOCIDA, "")
+        dump = self.save_page_html(f"Falla_{kind}", f"Ficha {ficha}: {detail}", failure=True)
+        self.flush_step_ring(ficha, kind, detail, dump)
+
+    def flush_step_ring(self, ficha, kind, detail, dump=None):
+        """Vuelca a logs/fallas los pasos de la ficha, una captura de pantalla y el HTML del documento principal.
+
+        El HTML del frame actual ya quedó en el almacén de dumps; pasos.json apunta a esa entrada.
+        """
+        self.remember_step(f"falla_{kind}")
+        name = re.sub(r"[^\w.-]", "_", str(ficha))[:60]
+        worker = f"_worker{self.worker_id}" if self.worker_id is not None else ""
+        failure_dir = os.path.join("logs", "fallas", f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{name}{worker}")
+        try:
+            os.makedirs(failure_dir, exist_ok=True)
+            with open(os.path.join(failure_dir, "pasos.json"), 'w', encoding='utf-8') as f:
+                json.dump({'ficha': str(ficha), 'falla': kind, 'detalle': detail, 'dump_frame_actual': dump,
+                           'pasos': list(self.step_ring)}, f, ensure_ascii=False, indent=2)
+            self.driver.save_screenshot(os.path.join(failure_dir, "captura.png"))
+            self.driver.switch_to.default_content()
+            with open(os.path.join(failure_dir, "pagina.html"), 'w', encoding='utf-8') as f:
+                f.write(self.driver.page_source)
+            self.logger.info(f"🧾 Evidencia de la falla guardada en {failure_dir}")
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo guardar la evidencia de la falla: {e}")
+        finally:
+            self.step_ring.clear()
+
+    def record_failure(self, kind, detail=""):
+        """Registra la causa de falla de la ficha actual; se conserva la primera (la más específica)"""
+        if self.last_failure is None:
+            self.last_failure = (kind, detail)
+        return False
+
+    def detect_server_error_page(self):
+        """Revisa si la página (o el iframe actual) es una página de error del servidor"""
+        try:
+            text = self.driver.execute_script(
+                "return (document.title + ' ' + (document.body ? document.body.innerText : '')).slice(0, 3000);"
+            ) or ""
+        except Exception:
+            return False
+        text = text.lower()
+        return any(marker in text for marker in FailureKind.SERVER_ERROR_MARKERS)
+
+    def classify_failure(self):
+        """Devuelve (tipo, detalle) de la última falla, revisando la página si no se registró una causa"""
+        if self.last_failure is not None:
+            return self.last_failure
+        if self.engine != "http" and self.driver is not None:
+            if self.detect_server_error_page():
+                return (FailureKind.ERROR_SERVIDOR, "Página de error del servidor")
+            try:
+                self.driver.switch_to.default_content()
+                if self.detect_server_error_page():
+                    return (FailureKind.ERROR_SERVIDOR, "Página de error del servidor")
+            except Exception:
+                pass
+        return (FailureKind.DESCONOCIDA, "")
+
+    def start_session(self):
+        """Abre Firefox y hace el login completo hasta 'Generar Reporte de Inscripción'"""
+        self.setup_driver()
+        if not self.navigate_to_sena():
+            self.logger.error("❌ Error en la navegación inicial")
+            if self.detect_server_error_page():
+                return self.record_failure(FailureKind.ERROR_SERVIDOR, "Error del servidor durante el login")
+            return self.record_failure(FailureKind.LOGIN, "No se completó el login")
+        return True
+
+    def close_driver(self):
+        """Cierra el navegador actual ignorando errores (p. ej. si ya se cerró)"""
+        driver = self.driver
+        self.driver = None
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except:
+            pass
+
+    def is_session_healthy(self):
+        """Health check barato: navegador vivo, fuera del login y con el iframe del reporte presente"""
+        if self.driver is None:
+            return False
+        try:
+            self.driver.switch_to.default_content()
+            current_url = self.driver.current_url.lower()
+            if "josso" in current_url or "login" in current_url:
+                self.logger.warning(f"⚠️ Sesión expirada, URL actual: {current_url}")
+                return False
+            report_iframes = self.driver.find_elements(By.XPATH, self.CONTENIDO_XPATH)
+            return len(report_iframes) > 0
+        except Exception as e:
+            self.logger.warning(f"⚠️ Health check fallido: {e}")
+            return False
+
+    def reset_report_form(self):
+        """Recarga el formulario de reporte para procesar la siguiente ficha sin repetir el login"""
+        try:
+            self.driver.switch_to.default_content()
+            reloaded = self.driver.execute_script(WaitEngine.MARK_REPORT_FRAME_SCRIPT + """
+                var frame = document.getElementById('contenido') ||
+                            document.getElementsByName('contenido')[0];
+                if (!frame) { return false; }
+                frame.src = frame.getAttribute('src');
+                return true;
+            """)
+            if reloaded:
+                self.waits.until("reset_report_form", self.waits.report_frame_ready, max_wait=2)
+                return True
+
+            # Sin iframe recargable: volver a entrar por el menú
+            return self.navigate_to_inscripcion()
+
+        except Exception as e:
+            self.logger.error(f"❌ Error recargando el formulario de reporte: {e}")
+            return False
+
+    def ensure_session(self):
+        """Deja una sesión lista en el formulario, reiniciando el navegador solo si falla el health check"""
+        if self.driver is not None:
+            if self.is_session_healthy() and self.reset_report_form():
+                return True
+            self.logger.warning("⚠️ Sesión no saludable, reiniciando navegador...")
+            if self.gui_callback:
+                self.gui_callback("⚠️ Sesión no saludable, reiniciando navegador...")
+            self.close_driver()
+
+        try:
+            return self.start_session()
+        except Exception as e:
+            self.logger.error(f"❌ Error iniciando sesión: {e}")
+            self.close_driver()
+            return False
+
+    def ensure_http_session(self):
+        """Prepara el motor HTTP con las cookies compartidas; el navegador solo se abre si hace falta un login"""
+        if self.http_engine is None:
+            self.http_engine = SofiaHttpEngine(self.base_url, self.logger, self.output_dir)
+
+        if not self.http_engine.has_session():
+            cookies = self.session_cookies.load()
+            if not cookies:
+                self.logger.info("Sin sesión guardada: login con navegador para el motor HTTP...")
+                try:
+                    self.start_session()
+                finally:
+                    self.close_driver()
+                cookies = self.session_cookies.load()
+            if not cookies:
+                self.logger.error("❌ No se pudo obtener una sesión para el motor HTTP")
+                return self.record_failure(FailureKind.LOGIN, "Sin sesión para el motor HTTP")
+            self.http_engine.set_cookies(cookies)
+        return True
+
+    def process_ficha_http(self, ficha):
+        """Procesa una ficha con el motor HTTP"""
+        if not self.ensure_http_session():
             return False
 
-    def run_automation(self, excel_path, progress_callback=None, pause_between_fichas=3):
-        """Ejecuta la automatización abriendo/cerrando navegador por ficha"""
+        ok = self.http_engine.process_single_ficha(ficha)
+        self.last_report_path = self.http_engine.last_report_path if ok else None
+        if not ok and self.http_engine.last_failure:
+            self.record_failure(*self.http_engine.last_failure)
+        if self.http_engine.session_expired:
+            self.session_cookies.invalidate()
+        return ok
+
+    def process_batch_http(self, fichas):
+        """Procesa un lote de fichas con el motor HTTP (un solo reporte dividido por ficha)"""
+        if not self.ensure_http_session():
+            return {str(ficha): self.last_failure for ficha in fichas}
+
+        results = self.http_engine.process_batch(fichas)
+        self.report_paths = self.http_engine.last_report_paths
+        if self.http_engine.session_expired:
+            self.session_cookies.invalidate()
+        return results
+
+    def prepare_session(self, reuse_session=True):
+        """Deja el navegador en el formulario de reporte, reutilizando la sesión o abriendo una nueva"""
+        if reuse_session:
+            # Reutilizar la sesión abierta (o reiniciarla si no está sana)
+            if self.session_ready:
+                self.session_ready = self.ensure_session()
+            else:
+                self.close_driver()
+                self.session_ready = self.start_session()
+            return self.session_ready
+        # Abrir nuevo navegador y hacer login por ficha
+        return self.start_session()
+
+    def process_ficha_in_session(self, ficha, reuse_session=True):
+        """Prepara la sesión del navegador (reutilizada o nueva) y procesa una ficha"""
+        self.last_failure = None
+        try:
+            if self.engine == "http":
+                return self.process_ficha_http(ficha)
+
+            if not self.prepare_session(reuse_session):
+                return False
+
+            ok = self.process_single_ficha(ficha)
+            if ok:
+                self.capture_success(ficha)
+            else:
+                self.capture_failure(ficha)
+            return ok
+
+        except Exception as e:
+            self.logger.error(f"❌ Error procesando ficha {ficha}: {e}")
+            return self.record_failure(FailureKind.from_exception(e), str(e))
+
+        finally:
+            # Sin reutilización, cerrar navegador siempre al final
+            if not reuse_session:
+                self.close_driver()
+
+    def process_batch_in_session(self, fichas, reuse_session=True):
+        """Como process_ficha_in_session, pero para un lote; devuelve {ficha: None o (tipo, detalle)}"""
+        self.last_failure = None
+        try:
+            if self.engine == "http":
+                return self.process_batch_http(fichas)
+
+            if not self.prepare_session(reuse_session):
+                failure = self.classify_failure()
+                return {str(ficha): failure for ficha in fichas}
+
+            results = self.process_ficha_batch(fichas)
+            if any(failure is not None for failure in results.values()):
+                self.capture_failure(",".join(str(ficha) for ficha in fichas))
+            else:
+                self.capture_success(",".join(str(ficha) for ficha in fichas))
+            return results
+
+        except Exception as e:
+            self.logger.error(f"❌ Error procesando el lote: {e}")
+            failure = (FailureKind.from_exception(e), str(e))
+            return {str(ficha): failure for ficha in fichas}
+
+        finally:
+            if not reuse_session:
+                self.close_driver()
+
+    def process_ficha_queue(self, scheduler, aggregator, pause_between_fichas=3, reuse_session=True):
+        """Consume fichas (o lotes de batch_size fichas) del scheduler hasta vaciarlo o hasta que se pida detener"""
+        try:
+            while True:
+                items = scheduler.get_batch(self.stop_event, self.batch_size)
+                if not items:
+                    break
+
+                try:
+                    self.process_queue_items(scheduler, aggregator, items, reuse_session)
+                except Exception as e:
+                    self.logger.error(f"❌ Error inesperado procesando {', '.join(str(f) for _, f in items)}: {e}")
+                    self.telemetry.set_ficha(None)
+                    for item in items:
+                        if scheduler.in_progress(item):
+                            try:
+                                self.handle_failed_ficha(
+                                    scheduler, aggregator, item, 0, (FailureKind.from_exception(e), str(e))
+                                )
+                            except Exception as handle_error:
+                                self.logger.error(f"❌ No se pudo registrar la falla de la ficha {item[1]}: {handle_error}")
+                finally:
+                    # Una ficha que quede en curso haría esperar para siempre a los demás workers
+                    scheduler.release(items)
+                time.sleep(pause_between_fichas)  # Pausa configurable
+        finally:
+            self.close_driver()
+            self.session_ready = False
+            if self.http_engine:
+                self.http_engine.close()
+            if self.downloads:
+                self.downloads.close()
+                self.downloads = None
+            self.waits.log_summary()
+            try:
+                self.selectors.save()
+            except Exception as e:
+                self.logger.warning(f"⚠️ No se pudieron guardar las estadísticas de selectores: {e}")
+            self.logger.info(
+                f"🗂️ Cache de iframes: {self.frame_cache.hits} aciertos, "
+                f"{self.frame_cache.misses} búsquedas completas"
+            )
+
+    def remember_report(self, ficha, path):
+        """Registra el reporte recién generado en la caché de frescura"""
+        if self.report_cache is None or not path:
+            return
+        try:
+            self.report_cache.store(self.base_url, ficha, self.PRIMERA_OPCION, path)
+            self.report_cache.save()
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo registrar el reporte de la ficha {ficha} en la caché: {e}")
+
+    def serve_from_cache(self, pending):
+        """Separa las fichas con reporte vigente en caché; devuelve (pendientes, servidas)"""
+        remaining = []
+        served = []
+        for index, ficha in pending:
+            path = self.report_cache.lookup(self.base_url, ficha, self.PRIMERA_OPCION)
+            if path is None:
+                remaining.append((index, ficha))
+                continue
+            if os.path.dirname(path) != os.path.abspath(self.output_dir):
+                # El reporte vigente está en otra carpeta de salida: se copia a la actual
+                try:
+                    os.makedirs(self.output_dir, exist_ok=True)
+                    target = os.path.join(self.output_dir, os.path.basename(path))
+                    shutil.copy2(path, target)
+                    path = target
+                except OSError as e:
+                    self.logger.warning(f"⚠️ No se pudo copiar el reporte en caché de la ficha {ficha}: {e}")
+                    remaining.append((index, ficha))
+                    continue
+            # Idempotente: deja las filas también en el almacén de esta carpeta de salida
+            self.ingest_report(ficha, path)
+            served.append(ficha)
+            self.logger.info(f"♻️ Ficha {ficha}: reporte reciente en caché ({path})")
+            if self.journal:
+                self.journal.record(ficha, RunJournal.COMPLETADA, motivo=f"cache: {path}", duracion=0)
+        if served and self.gui_callback:
+            self.gui_callback(f"♻️ {len(served)} fichas servidas desde la caché de reportes")
+        return remaining, served
+
+    def ingest_report(self, ficha, path):
+        """Carga el reporte recién descargado en el almacén; una falla aquí no invalida la ficha"""
+        if self.warehouse is None or not path:
+            return
+        try:
+            rows = self.warehouse.ingest(ficha, path)
+            self.logger.info(f"🗄️ Ficha {ficha}: {rows} filas en el almacén de reportes")
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo cargar el reporte de la ficha {ficha} en el almacén: {e}")
+
+    def process_queue_items(self, scheduler, aggregator, items, reuse_session):
+        """Procesa las fichas tomadas del scheduler y registra el resultado de cada una"""
+        for index, ficha in items:
+            self.logger.info(f"\n--- Procesando ficha {index+1} de {aggregator.total} ---")
+            if self.gui_callback:
+                self.gui_callback(f"--- Procesando ficha {index+1} de {aggregator.total} ---")
+            if self.journal:
+                self.journal.record(ficha, RunJournal.EN_PROCESO)
+
+        started = time.monotonic()
+        # Los pasos de fichas anteriores no deben aparecer en la evidencia de esta
+        self.step_ring.clear()
+        self.telemetry.set_ficha(",".join(str(ficha) for _, ficha in items))
+        with self.telemetry.span("ficha" if len(items) == 1 else "lote") as span:
+            if len(items) == 1:
+                ficha = items[0][1]
+                ok = self.process_ficha_in_session(ficha, reuse_session)
+                results = {str(ficha): None if ok else self.classify_failure()}
+                paths = {str(ficha): self.last_report_path}
+            else:
+                results = self.process_batch_in_session([ficha for _, ficha in items], reuse_session)
+                paths = self.report_paths
+            span.ok = all(failure is None for failure in results.values())
+        self.telemetry.set_ficha(None)
+        duration = (time.monotonic() - started) / len(items)
+
+        for item in items:
+            failure = results.get(str(item[1]), (FailureKind.DESCONOCIDA, ""))
+            if failure is None:
+                self.remember_report(item[1], paths.get(str(item[1])))
+                self.ingest_report(item[1], paths.get(str(item[1])))
+                scheduler.complete(item)
+                aggregator.record(True)
+                if self.journal:
+                    self.journal.record(item[1], RunJournal.COMPLETADA, duracion=duration)
+            else:
+                self.handle_failed_ficha(scheduler, aggregator, item, duration, failure)
+
+    def handle_failed_ficha(self, scheduler, aggregator, item, duration, failure=None):
+        """Clasifica la falla: las transitorias se reprograman con backoff, las permanentes se reportan"""
+        index, ficha = item
+        kind, detail = failure or self.classify_failure()
+        if kind == FailureKind.LOGIN:
+            self.session_ready = False
+
+        if kind in FailureKind.RETRYABLE:
+            delay = scheduler.retry_later(item)
+        else:
+            delay = None
+            scheduler.complete(item)
+
+        if delay is None:
+            self.logger.error(f"❌ Ficha {ficha} fallida definitivamente ({kind}): {detail}")
+            if self.gui_callback:
+                self.gui_callback(f"❌ Ficha {ficha} fallida definitivamente ({kind})")
+            aggregator.record(False, kind)
+            if self.journal:
+                self.journal.record(ficha, RunJournal.FALLIDA, motivo=f"{kind}: {detail}", duracion=duration)
+            return
+
+        self.logger.warning(f"⚠️ Ficha {ficha} falló ({kind}), reintento en {delay:.0f} segundos")
+        if self.gui_callback:
+            self.gui_callback(f"⚠️ Ficha {ficha} falló ({kind}), reintento en {delay:.0f} segundos")
+        if self.journal:
+            self.journal.record(ficha, RunJournal.FALLIDA, motivo=f"{kind} (reintento programado)", duracion=duration)
+
+    def run_worker_pool(self, scheduler, aggregator, workers, pause_between_fichas=3, reuse_session=True):
+        """Lanza N workers, cada uno con su propio navegador, consumiendo la misma cola de fichas"""
+        self.logger.info(f"Iniciando pool de {workers} workers")
+        if self.gui_callback:
+            self.gui_callback(f"Iniciando pool de {workers} workers")
+
+        def worker_main(worker_id):
+            try:
+                worker = SenaAutomation(
+                    gui_callback=self.gui_callback,
+                    worker_id=worker_id,
+                    performance_mode=self.performance_mode,
+                    engine=self.engine,
+                    record_commands=self.record_commands
+                )
+                worker.base_url = self.base_url
+                worker.batch_size = self.batch_size
+                worker.warehouse = self.warehouse
+                worker.report_cache = self.report_cache
+                worker.element_timeout = self.element_timeout
+                worker.download_timeout = self.download_timeout
+                worker.output_dir = self.output_dir
+                worker.download_dir = os.path.join(self.output_dir, ".sena_descargas", f"worker_{worker_id}")
+                worker.stop_event = self.stop_event
+                worker.journal = self.journal
+                self.workers.append(worker)
+                worker.process_ficha_queue(scheduler, aggregator, pause_between_fichas, reuse_session)
+            except Exception as e:
+                self.logger.error(f"❌ Error en worker {worker_id}: {e}")
+
+        threads = [
+            threading.Thread(target=worker_main, args=(n,), name=f"sena-worker-{n}", daemon=True)
+            for n in range(1, workers + 1)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.workers = []
+
+    def request_stop(self):
+        """Pide a todos los workers que se detengan y cierra sus navegadores"""
+        self.stop_event.set()
+        for worker in list(self.workers):
+            worker.close_driver()
+        self.close_driver()
+
+    def run_automation(self, excel_path, progress_callback=None, pause_between_fichas=3, reuse_session=True, workers=1,
+                       resume=False, max_attempts=3, retry_base_delay=30, fichas=None, batch_size=1,
+                       cache_ttl=ReportCache.DEFAULT_TTL, force_refresh=False):
+        """Ejecuta la automatización con uno o varios workers; con resume salta las fichas ya completadas.
+
+        Las fallas transitorias se reintentan hasta max_attempts veces con backoff
+        exponencial desde retry_base_delay segundos. Si se pasan fichas ya leídas
+        (por ejemplo desde la GUI) no se vuelve a leer el archivo. Con batch_size > 1
+        se agregan varias fichas a un solo reporte que luego se divide por ficha.
+        Las fichas con un reporte de menos de cache_ttl segundos se sirven desde
+        ReportCache sin navegador, salvo con force_refresh.
+        """
+        # Solo se exporta lo que abrió esta llamada; la telemetría es compartida entre corridas
+        run_started = False
         try:
-            # Leer fichas del Excel
-            fichas = self.read_excel_fichas(excel_path)
+            # Leer fichas del archivo si no vienen ya validadas
+            if fichas is None:
+                fichas = self.read_excel_fichas(excel_path)
             if not fichas:
                 return
             
-            successful = 0
-            failed = 0
             total_fichas = len(fichas)
-
-            for i, ficha in enumerate(fichas):
-                self.logger.info(f"\n--- Procesando ficha {i+1} de {total_fichas} ---")
+            self.telemetry.open()
+            run_started = True
+            if self.record_commands:
+                CommandRecorder.shared().reset()
+            self.journal = RunJournal(excel_path)
+            self.warehouse = ReportWarehouse(os.path.join(self.output_dir, ReportWarehouse.DB_FILE), self.logger)
+            completed = self.journal.completed_fichas() if resume else set()
+            pending = [(index, ficha) for index, ficha in enumerate(fichas) if str(ficha) not in completed]
+            self.journal.open(resume=resume)
+            if not resume:
+                self.journal.record_pending(fichas)
+            if completed:
+                self.logger.info(f"Reanudando: {total_fichas - len(pending)} fichas ya completadas")
                 if self.gui_callback:
-                    self.gui_callback(f"--- Procesando ficha {i+1} de {total_fichas} ---")
-                
-                # Update progress
-                if progress_callback:
-                    progress_callback(i, total_fichas, successful, failed)
+                    self.gui_callback(f"Reanudando: {total_fichas - len(pending)} fichas ya completadas")
 
-                # 1️⃣ Abrir nuevo navegador
-                self.setup_driver()
-
-                try:
-                    # 2️⃣ Login y navegación inicial
-                    if not self.navigate_to_sena():
-                        self.logger.error("❌ Error en la navegación inicial")
-                        failed += 1
-                        continue
+            self.report_cache = ReportCache.shared()
+            self.report_cache.ttl = cache_ttl
+            if not force_refresh and cache_ttl > 0:
+                pending, served = self.serve_from_cache(pending)
 
-                    # 3️⃣ Procesar ficha
-                    if self.process_single_ficha(ficha):
-                        successful += 1
-                    else:
-                        failed += 1
+            aggregator = ProgressAggregator(total_fichas, progress_callback)
+            aggregator.processed = aggregator.successful = total_fichas - len(pending)
+            aggregator.start()
 
-                except Exception as e:
-                    self.logger.error(f"❌ Error procesando ficha {ficha}: {e}")
-                    failed += 1
+            scheduler = RetryScheduler(pending, max_attempts=max_attempts, base_delay=retry_base_delay)
 
-                finally:
-                    # 4️⃣ Cerrar navegador siempre al final
-                    self.driver.quit()
-                    time.sleep(pause_between_fichas)  # Pausa configurable
+            self.batch_size = max(1, int(batch_size))
+            batches = -(-len(pending) // self.batch_size)
+            workers = max(1, min(int(workers), max(batches, 1)))
+            if workers == 1:
+                self.process_ficha_queue(scheduler, aggregator, pause_between_fichas, reuse_session)
+            else:
+                self.run_worker_pool(scheduler, aggregator, workers, pause_between_fichas, reuse_session)
 
-            # Final progress update
-            if progress_callback:
-                progress_callback(total_fichas, total_fichas, successful, failed)
+            successful = aggregator.successful
+            failed = aggregator.failed
 
             self.logger.info(f"\n{'='*50}")
             self.logger.info(f"AUTOMATIZACIÓN COMPLETADA")
             self.logger.info(f"Exitosas: {successful}")
             self.logger.info(f"Fallidas: {failed}")
+            for kind, count in sorted(aggregator.failure_kinds.items()):
+                self.logger.info(f"  {kind}: {count}")
+            self.logger.info(f"Almacén de reportes: {self.warehouse.db_path}")
             self.logger.info(f"{'='*50}")
             
             if self.gui_callback:
@@ -1272,9 +4536,53 @@ class SenaAutomation:
             self.logger.error(f"Error en la automatización: {e}")
             if self.gui_callback:
                 self.gui_callback(f"Error en la automatización: {e}")
+            self.close_driver()
+
+        finally:
+            if run_started:
+                if self.journal:
+                    self.journal.close()
+                self.export_telemetry()
+                if self.record_commands:
+                    self.export_command_recording()
+
+    def export_command_recording(self):
+        """Exporta el registro de comandos WebDriver y muestra los métodos más conversadores"""
+        recorder = CommandRecorder.shared()
+        try:
+            summary_path, folded_path = recorder.export(self.telemetry.run_id)
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo exportar el registro de comandos: {e}")
+            return
+        total = recorder.total
+        fichas = [name for name in recorder.by_ficha if name != "<sin ficha>"]
+        self.logger.info(
+            f"🔎 Comandos WebDriver: {total['comandos']} en {total['latencia']:.1f}s"
+            + (f" ({total['comandos'] / len(fichas):.1f} por ficha)" if fichas else "")
+        )
+        for method, entry in sorted(recorder.by_method.items(), key=lambda item: -item[1]['comandos'])[:5]:
+            self.logger.info(f"  {method}: {entry['comandos']} comandos, {entry['latencia']:.2f}s")
+        self.logger.info(f"🔎 Registro de comandos: {summary_path}, {folded_path}")
+
+    def export_telemetry(self):
+        """Exporta los spans de la ejecución (JSON lines, resumen CSV y texto de Prometheus)"""
+        try:
+            csv_path, prometheus_path = self.telemetry.export()
+            self.logger.info(f"📊 Telemetría exportada: {csv_path}, {prometheus_path}")
+            for row in self.telemetry.summary()[:5]:
+                self.logger.info(
+                    f"  {row['fase']}: {row['cantidad']}x, p50 {row['p50_s']:.2f}s, "
+                    f"p95 {row['p95_s']:.2f}s, {row['comandos_media']} comandos"
+                )
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo exportar la telemetría: {e}")
 
 
 class SenaAutomationGUI:
+    LOG_MAX_LINES = 2000        # líneas visibles en el log; el historial completo va a disco
+    PUMP_INTERVAL_MS = 100
+    PUMP_MAX_EVENTS = 1000      # eventos procesados por ciclo para no bloquear la ventana
+
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("SENA Automation - Procesador de Fichas")
@@ -1285,10 +4593,23 @@ class SenaAutomationGUI:
         self.excel_path = tk.StringVar()
         self.timeout_var = tk.IntVar(value=10)
         self.pause_var = tk.IntVar(value=3)
+        self.reuse_session_var = tk.BooleanVar(value=True)
+        self.workers_var = tk.IntVar(value=1)
+        self.performance_var = tk.BooleanVar(value=False)
+        self.http_engine_var = tk.BooleanVar(value=False)
+        self.resume_var = tk.BooleanVar(value=False)
+        self.batch_var = tk.IntVar(value=1)
+        self.record_commands_var = tk.BooleanVar(value=False)
+        self.force_refresh_var = tk.BooleanVar(value=False)
         self.automation = None
+        self.parse_result = None
         self.is_running = False
+        # Los workers solo encolan eventos; el hilo de Tk los procesa en lotes
+        self.events = queue.SimpleQueue()
+        self.history_file = None
         
         self.setup_ui()
+        self.root.after(self.PUMP_INTERVAL_MS, self.pump_events)
         
     def setup_ui(self):
         # Main container
@@ -1332,9 +4653,41 @@ class SenaAutomationGUI:
         timeout_spin.grid(row=0, column=1, sticky=tk.W, padx=(0, 20))
         
         ttk.Label(config_frame, text="Pausa entre fichas (segundos):").grid(row=0, column=2, sticky=tk.W, padx=(0, 10))
-        pause_spin = ttk.Spinbox(config_frame, from_=1, to=10, textvariable=self.pause_var, width=10)
+        pause_spin = ttk.Spinbox(config_frame, from_=0, to=10, textvariable=self.pause_var, width=10)
         pause_spin.grid(row=0, column=3, sticky=tk.W)
         
+        reuse_check = ttk.Checkbutton(config_frame, text="Reutilizar sesión entre fichas", 
+                                      variable=self.reuse_session_var)
+        reuse_check.grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        ttk.Label(config_frame, text="Navegadores en paralelo:").grid(row=1, column=2, sticky=tk.W, padx=(0, 10), pady=(5, 0))
+        workers_spin = ttk.Spinbox(config_frame, from_=1, to=16, textvariable=self.workers_var, width=10)
+        workers_spin.grid(row=1, column=3, sticky=tk.W, pady=(5, 0))
+        
+        performance_check = ttk.Checkbutton(config_frame, text="Modo rendimiento (sin ventana, sin imágenes)", 
+                                            variable=self.performance_var)
+        performance_check.grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        http_check = ttk.Checkbutton(config_frame, text="Motor HTTP (sin navegador por ficha)", 
+                                     variable=self.http_engine_var)
+        http_check.grid(row=2, column=2, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        resume_check = ttk.Checkbutton(config_frame, text="Reanudar ejecución anterior de este archivo", 
+                                       variable=self.resume_var)
+        resume_check.grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        ttk.Label(config_frame, text="Fichas por reporte (lote):").grid(row=3, column=2, sticky=tk.W, padx=(0, 10), pady=(5, 0))
+        batch_spin = ttk.Spinbox(config_frame, from_=1, to=50, textvariable=self.batch_var, width=10)
+        batch_spin.grid(row=3, column=3, sticky=tk.W, pady=(5, 0))
+        
+        record_check = ttk.Checkbutton(config_frame, text="Registrar comandos WebDriver (diagnóstico)", 
+                                       variable=self.record_commands_var)
+        record_check.grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        refresh_check = ttk.Checkbutton(config_frame, text="Regenerar reportes recientes (ignorar caché)", 
+                                        variable=self.force_refresh_var)
+        refresh_check.grid(row=4, column=2, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
         # Control buttons
         control_frame = ttk.Frame(main_frame)
         control_frame.grid(row=3, column=0, columnspan=3, pady=(0, 10))
@@ -1383,48 +4736,130 @@ class SenaAutomationGUI:
     def browse_file(self):
         filename = filedialog.askopenfilename(
             title="Seleccionar archivo Excel",
-            filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
+            filetypes=[("Excel files", "*.xlsx *.xls"), ("CSV / texto", "*.csv *.txt"), ("All files", "*.*")]
         )
         if filename:
             self.excel_path.set(filename)
             self.validate_file()
     
     def validate_file(self):
-        try:
-            if self.excel_path.get():
-                df = pd.read_excel(self.excel_path.get())
-                fichas_count = len(df)
-                self.file_info_label.config(
-                    text=f"✓ Archivo válido - {fichas_count} fichas encontradas",
-                    foreground='green'
-                )
-                self.start_btn.config(state='normal')
-            else:
-                self.file_info_label.config(
-                    text="No se ha seleccionado archivo",
-                    foreground='gray'
-                )
-                self.start_btn.config(state='disabled')
-        except Exception as e:
+        path = self.excel_path.get()
+        self.parse_result = None
+        if not path:
             self.file_info_label.config(
-                text=f"✗ Error al leer archivo: {str(e)}",
-                foreground='red'
+                text="No se ha seleccionado archivo",
+                foreground='gray'
             )
             self.start_btn.config(state='disabled')
+            return
+
+        self.file_info_label.config(text="Analizando archivo...", foreground='gray')
+        self.start_btn.config(state='disabled')
+        outcome = {}
+
+        # Leer en segundo plano para no congelar la ventana con archivos grandes
+        def parse():
+            try:
+                outcome['result'] = FichaIngestion.parse(path)
+            except Exception as e:
+                outcome['error'] = e
+
+        thread = threading.Thread(target=parse, daemon=True)
+        thread.start()
+        self.root.after(50, self.finish_validation, thread, path, outcome)
+
+    def finish_validation(self, thread, path, outcome):
+        if thread.is_alive():
+            self.root.after(50, self.finish_validation, thread, path, outcome)
+            return
+        if path != self.excel_path.get():
+            return
+
+        if 'error' in outcome:
+            self.file_info_label.config(
+                text=f"✗ Error al leer archivo: {str(outcome['error'])}",
+                foreground='red'
+            )
+            return
+
+        result = outcome['result']
+        if not result.fichas:
+            self.file_info_label.config(
+                text=f"✗ No se encontraron fichas válidas - {result.summary()}",
+                foreground='red'
+            )
+            return
+
+        self.parse_result = result
+        self.file_info_label.config(
+            text=f"✓ Archivo válido - {result.summary()}",
+            foreground='green'
+        )
+        self.start_btn.config(state='normal')
     
     def log_message(self, message):
+        """Seguro desde cualquier hilo: solo encola la línea"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        self.events.put(('log', f"[{timestamp}] {message}\n"))
     
     def update_progress(self, current, total, successful, failed):
+        """Seguro desde cualquier hilo: solo encola el estado de avance"""
+        self.events.put(('progress', (current, total, successful, failed)))
+
+    def pump_events(self):
+        """Procesa en el hilo de Tk los eventos encolados por los workers"""
+        lines = []
+        progress = None
+        finished = False
+        try:
+            for _ in range(self.PUMP_MAX_EVENTS):
+                kind, payload = self.events.get_nowait()
+                if kind == 'log':
+                    lines.append(payload)
+                elif kind == 'progress':
+                    # Solo importa el último estado de avance del lote
+                    progress = payload
+                else:
+                    finished = True
+        except queue.Empty:
+            pass
+
+        if lines:
+            self.write_history(lines)
+            self.append_log(lines[-self.LOG_MAX_LINES:])
+        if progress is not None:
+            self.apply_progress(*progress)
+        if finished:
+            self.automation_finished()
+
+        self.root.after(self.PUMP_INTERVAL_MS, self.pump_events)
+
+    def append_log(self, lines):
+        """Inserta un lote de líneas y recorta la vista a las últimas LOG_MAX_LINES"""
+        self.log_text.insert(tk.END, "".join(lines))
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > self.LOG_MAX_LINES:
+            self.log_text.delete('1.0', f"{line_count - self.LOG_MAX_LINES}.0")
+        self.log_text.see(tk.END)
+
+    def write_history(self, lines):
+        """Conserva en disco todo lo mostrado en el log, aunque la vista esté recortada"""
+        try:
+            if self.history_file is None:
+                os.makedirs("logs", exist_ok=True)
+                path = os.path.join("logs", f"gui_historial_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+                self.history_file = open(path, 'a', encoding='utf-8')
+            self.history_file.writelines(lines)
+            self.history_file.flush()
+        except Exception:
+            pass
+
+    def apply_progress(self, current, total, successful, failed):
         if total > 0:
             progress = (current / total) * 100
             self.progress_var.set(progress)
             self.status_label.config(text=f"Procesando: {current}/{total}")
             self.stats_label.config(text=f"Exitosas: {successful} | Fallidas: {failed}")
-        self.root.update_idletasks()
     
     def start_automation(self):
         if not self.excel_path.get():
@@ -1435,31 +4870,44 @@ class SenaAutomationGUI:
         self.start_btn.config(state='disabled')
         self.stop_btn.config(state='normal')
         self.progress_var.set(0)
+
+        # Reutilizar las fichas ya validadas si el archivo no cambió
+        result = self.parse_result
+        fichas = result.fichas if result is not None and result.matches(self.excel_path.get()) else None
         
         # Start automation in separate thread
         def run_automation():
             try:
-                self.automation = SenaAutomation(gui_callback=self.log_message)
+                self.automation = SenaAutomation(
+                    gui_callback=self.log_message,
+                    performance_mode=self.performance_var.get(),
+                    engine="http" if self.http_engine_var.get() else "selenium",
+                    record_commands=self.record_commands_var.get()
+                )
                 self.automation.run_automation(
                     self.excel_path.get(),
                     progress_callback=self.update_progress,
-                    pause_between_fichas=self.pause_var.get()
+                    pause_between_fichas=self.pause_var.get(),
+                    reuse_session=self.reuse_session_var.get(),
+                    workers=self.workers_var.get(),
+                    resume=self.resume_var.get(),
+                    fichas=fichas,
+                    batch_size=self.batch_var.get(),
+                    force_refresh=self.force_refresh_var.get()
                 )
             except Exception as e:
                 self.log_message(f"Error en la automatización: {e}")
             finally:
-                self.root.after(0, self.automation_finished)
+                # Por la cola, para que el cierre llegue después del último avance
+                self.events.put(('finished', None))
         
         thread = threading.Thread(target=run_automation, daemon=True)
         thread.start()
     
     def stop_automation(self):
         self.is_running = False
-        if self.automation and hasattr(self.automation, 'driver'):
-            try:
-                self.automation.driver.quit()
-            except:
-                pass
+        if self.automation:
+            self.automation.request_stop()
         self.automation_finished()
     
     def automation_finished(self):
@@ -1472,12 +4920,108 @@ class SenaAutomationGUI:
         self.log_text.delete(1.0, tk.END)
     
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            if self.history_file is not None:
+                self.history_file.close()
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Descarga los reportes de inscripción de Sofia Plus por ficha. "
+                    "Sin archivo abre la interfaz gráfica; con archivo se ejecuta sin ventana."
+    )
+    parser.add_argument("archivo", nargs="?", help="Excel, CSV o TXT con las fichas en la primera columna")
+    parser.add_argument("--gui", action="store_true", help="Abrir la interfaz gráfica aunque se indique archivo")
+    parser.add_argument("--workers", type=int, default=1, help="Navegadores en paralelo (por defecto 1)")
+    parser.add_argument("--output-dir", help="Carpeta de los reportes (por defecto ~/Downloads)")
+    parser.add_argument("--timeout", type=int, default=20, help="Espera máxima por elemento en segundos")
+    parser.add_argument("--download-timeout", type=int, default=120, help="Espera máxima por descarga en segundos")
+    parser.add_argument("--pause", type=float, default=3, help="Pausa entre fichas en segundos")
+    parser.add_argument("--batch-size", type=int, default=1, help="Fichas por reporte (modo lote)")
+    parser.add_argument("--engine", choices=("selenium", "http"), default="selenium",
+                        help="Motor por ficha: navegador o peticiones HTTP con la sesión guardada")
+    parser.add_argument("--performance", action="store_true",
+                        help="Firefox sin ventana y sin imágenes (automático si no hay DISPLAY en Linux)")
+    parser.add_argument("--no-reuse-session", action="store_true", help="Login nuevo por ficha")
+    parser.add_argument("--resume", action="store_true", help="Reanudar la ejecución anterior de este archivo")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Intentos por ficha con fallas transitorias")
+    parser.add_argument("--retry-delay", type=float, default=30, help="Retraso base de los reintentos en segundos")
+    parser.add_argument("--record-commands", action="store_true", help="Registrar comandos WebDriver (diagnóstico)")
+    parser.add_argument("--cache-ttl", type=float, default=ReportCache.DEFAULT_TTL,
+                        help="Segundos en que un reporte ya generado se reutiliza sin navegador (0 = sin caché)")
+    parser.add_argument("--force-refresh", action="store_true", help="Regenerar todos los reportes aunque estén en caché")
+    parser.add_argument("--base-url", default=SenaAutomation.BASE_URL, help="URL del portal Sofia Plus")
+    return parser
+
+
+def run_cli(args):
+    """Ejecuta la automatización sin interfaz gráfica; devuelve el código de salida"""
+    if not os.path.isfile(args.archivo):
+        print(f"❌ No existe el archivo: {args.archivo}", file=sys.stderr)
+        return 2
+
+    performance_mode = args.performance
+    if not performance_mode and sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        print("ℹ️ Sin DISPLAY: se usa el modo rendimiento (Firefox sin ventana)")
+        performance_mode = True
+
+    automation = SenaAutomation(
+        performance_mode=performance_mode,
+        engine=args.engine,
+        record_commands=args.record_commands
+    )
+    automation.base_url = args.base_url
+    automation.element_timeout = args.timeout
+    automation.download_timeout = args.download_timeout
+    if args.output_dir:
+        automation.output_dir = os.path.abspath(args.output_dir)
+        automation.download_dir = os.path.join(automation.output_dir, ".sena_descargas", "worker_0")
+        os.makedirs(automation.output_dir, exist_ok=True)
+
+    state = {}
+
+    def progress(current, total, successful, failed):
+        state.update(current=current, total=total, successful=successful, failed=failed)
+        print(f"Progreso: {current}/{total} (exitosas {successful}, fallidas {failed})", flush=True)
+
+    try:
+        automation.run_automation(
+            args.archivo,
+            progress_callback=progress,
+            pause_between_fichas=args.pause,
+            reuse_session=not args.no_reuse_session,
+            workers=args.workers,
+            resume=args.resume,
+            max_attempts=args.max_attempts,
+            retry_base_delay=args.retry_delay,
+            batch_size=args.batch_size,
+            cache_ttl=args.cache_ttl,
+            force_refresh=args.force_refresh
+        )
+    except KeyboardInterrupt:
+        print("⏹️ Interrumpido, cerrando navegadores...", file=sys.stderr)
+        automation.request_stop()
+        return 130
+
+    if not state.get('total'):
+        return 2
+    if state['failed'] or state['current'] < state['total']:
+        return 1
+    return 0
 
 
-def main():
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.archivo and not args.gui:
+        return run_cli(args)
     app = SenaAutomationGUI()
+    if args.archivo:
+        app.excel_path.set(args.archivo)
+        app.validate_file()
     app.run()
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,487 @@
+"""Servidor local que imita las páginas de Sofia Plus usadas por la automatización.
+
+Reproduce el recorrido completo que hace el navegador: la portada con el
+iframe de login JOSSO (username, josso_password), el selector de rol
+(seleccionRol:roles), el menú 'Inscripción' -> 'Consultas' -> 'Generar Reporte
+de Inscripción' y el iframe 'contenido'. Dentro está el formulario JSF del
+reporte con su javax.faces.ViewState y un iframe anidado con opcionesInscritos,
+'Consultar ficha', la búsqueda (form:buscarCBT) y la selección
+(form:dtFichas:0:imgSelec). 'Consultar aspirantes' (frmPrincipal:cmdlnkSearch)
+y 'Generar reporte' (frmPrincipal:btnGenerar) devuelven un archivo para
+descargar. Las latencias se configuran por tipo de petición. Solo usa la
+librería estándar.
+
+Como con el agente JOSSO real, el login deja dos cookies: JOSSO_SESSIONID
+(la identidad del usuario) y JSESSIONID (la sesión de la aplicación, con su
+rol, ViewState y selección). Un cliente que llega solo con JOSSO_SESSIONID
+recibe una sesión de la aplicación nueva y debe elegir el rol otra vez.
+
+Uso:
+    python mock_sofia.py --port 8765 --latency 0.05 --report-latency 1.5
+    (luego apuntar la automatización a http://127.0.0.1:8765/sofia-public/)
+"""
+import argparse
+import hashlib
+import html
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+REPORT_PATH = "/sofia/inscripcion/generarreporteinscripcion/generarReporteInscripcion.faces"
+PORTAL_PATH = "/sofia-public/"
+LOGIN_PATH = "/josso/signon/login.do"
+LOGIN_POST_PATH = "/josso/signon/usernamePasswordLogin.do"
+SESSION_COOKIE = "JSESSIONID"
+SSO_COOKIE = "JOSSO_SESSIONID"
+ROL_ENCARGADO_INGRESO = "33"
+ROLES = {
+    "13": "Aprendiz",
+    ROL_ENCARGADO_INGRESO: "Encargado de ingreso centro formación",
+}
+
+
+def aspirantes_de_ficha(ficha):
+    """Genera de forma determinista los aspirantes inscritos en una ficha"""
+    digest = hashlib.sha256(str(ficha).encode()).digest()
+    cantidad = 2 + digest[0] % 4
+    filas = []
+    for i in range(cantidad):
+        documento = str(10000000 + int.from_bytes(digest[i * 3:i * 3 + 3], 'big'))
+        filas.append({
+            'ficha': str(ficha),
+            'documento': documento,
+            'nombre': f"Aspirante {documento[-4:]}",
+            'opcion': "Primera Opción",
+            'estado': "Inscrito",
+        })
+    return filas
+
+
+class MockSession:
+    """Estado de un usuario autenticado en el servidor simulado"""
+
+    def __init__(self, usuario=None, rol=None):
+        self.usuario = usuario
+        self.rol = rol
+        self.view_states = {}
+        self.ficha_buscada = None
+        self.seleccion = []
+        self.aspirantes_consultados = False
+        self.lock = threading.Lock()
+
+    def new_view_state(self, view):
+        token = secrets.token_hex(8)
+        self.view_states[view] = token
+        return token
+
+    def reset_report(self):
+        self.ficha_buscada = None
+        self.seleccion = []
+        self.aspirantes_consultados = False
+
+
+class MockSofiaServer:
+    """Servidor HTTP simulado; se arranca en un hilo con start() y se detiene con stop().
+
+    latency se suma a toda petición; latencies agrega retrasos por tipo de
+    petición: 'login', 'busqueda' (Consultar/Agregar), 'aspirantes' y 'reporte'.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, missing_fichas=(), latencies=None):
+        self.latency = latency
+        self.latencies = dict(latencies or {})
+        self.missing_fichas = {str(ficha) for ficha in missing_fichas}
+        self.sessions = {}
+        self.sso_sessions = {}
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self):
+        """URL de la portada, equivalente a SenaAutomation.BASE_URL"""
+        return self.url + PORTAL_PATH
+
+    @property
+    def report_url(self):
+        return self.url + REPORT_PATH
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-sofia", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def create_session(self, usuario, rol=None):
+        session_id = secrets.token_hex(16)
+        with self.lock:
+            self.sessions[session_id] = MockSession(usuario, rol)
+        return session_id
+
+    def create_sso_session(self, usuario):
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.sso_sessions[token] = usuario
+        return token
+
+    def new_session(self):
+        """Crea un login JOSSO y devuelve su cookie con el formato de Selenium (sin sesión de la aplicación)"""
+        token = self.create_sso_session("mock")
+        host = self.httpd.server_address[0]
+        return [{'name': SSO_COOKIE, 'value': token, 'path': '/', 'domain': host}]
+
+    def expire_sessions(self):
+        """Invalida todos los logins y sesiones, como al vencer la sesión en el servidor real"""
+        with self.lock:
+            self.sessions.clear()
+            self.sso_sessions.clear()
+
+    def ficha_existe(self, ficha):
+        return bool(ficha) and ficha.isdigit() and ficha not in self.missing_fichas
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(MockSofiaHandler):
+            mock = server
+
+        return Handler
+
+
+class MockSofiaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Encabezados y cuerpo van en escrituras separadas; sin esto Nagle + ACK
+    # retardado agregan ~40 ms por respuesta y distorsionan los benchmarks
+    disable_nagle_algorithm = True
+    mock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- utilidades -------------------------------------------------------
+
+    def cookie(self, cookie_name):
+        for part in self.headers.get('Cookie', '').split(';'):
+            name, _, value = part.strip().partition('=')
+            if name == cookie_name:
+                return value
+        return None
+
+    def session(self):
+        """Sesión de la aplicación del cliente; con solo el login JOSSO se le abre una nueva (sin rol)"""
+        with self.mock.lock:
+            session = self.mock.sessions.get(self.cookie(SESSION_COOKIE))
+            usuario = self.mock.sso_sessions.get(self.cookie(SSO_COOKIE))
+        if session is not None or usuario is None:
+            return session
+        session_id = self.mock.create_session(usuario)
+        self.set_cookie(SESSION_COOKIE, session_id)
+        with self.mock.lock:
+            return self.mock.sessions[session_id]
+
+    def set_cookie(self, name, value):
+        """La cookie se envía con la próxima respuesta"""
+        self.pending_cookies.append(f"{name}={value}; Path=/; HttpOnly")
+
+    def send_cookies(self):
+        for cookie in self.pending_cookies:
+            self.send_header('Set-Cookie', cookie)
+        self.pending_cookies = []
+
+    def send_body(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_cookies()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def redirect(self, location, headers=None):
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_cookies()
+        self.end_headers()
+
+    def read_form(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ""
+        return dict(parse_qsl(body, keep_blank_values=True))
+
+    def simulate_latency(self, kind=None):
+        with self.mock.lock:
+            self.mock.request_count += 1
+        delay = self.mock.latency + self.mock.latencies.get(kind, 0.0)
+        if delay:
+            time.sleep(delay)
+
+    # --- rutas ------------------------------------------------------------
+
+    def do_GET(self):
+        self.pending_cookies = []
+        parts = urlsplit(self.path)
+        self.simulate_latency('login' if parts.path == LOGIN_PATH else None)
+        if parts.path in ("/", "/sofia-public"):
+            return self.redirect(PORTAL_PATH)
+        if parts.path == PORTAL_PATH:
+            return self.send_body(200, self.render_portal(self.session()))
+        if parts.path == LOGIN_PATH:
+            return self.send_body(200, self.render_login())
+        if parts.path == REPORT_PATH:
+            session = self.session()
+            if session is None:
+                return self.redirect("/josso/signon/login.do")
+            if session.rol is None:
+                return self.redirect(PORTAL_PATH)
+            query = dict(parse_qsl(parts.query))
+            with session.lock:
+                if query.get('vista') == 'fichas':
+                    return self.send_body(200, self.render_fichas_view(session))
+                session.reset_report()
+                return self.send_body(200, self.render_report_view(session))
+        self.send_body(404, "<html><body><h1>404 - No encontrado</h1></body></html>")
+
+    def do_POST(self):
+        self.pending_cookies = []
+        parts = urlsplit(self.path)
+        form = self.read_form()
+        if parts.path == LOGIN_POST_PATH:
+            self.simulate_latency('login')
+            return self.handle_login_post(form)
+        if parts.path == PORTAL_PATH:
+            self.simulate_latency()
+            return self.handle_role_post(form)
+        if parts.path != REPORT_PATH:
+            self.simulate_latency()
+            return self.send_body(404, "<html><body><h1>404 - No encontrado</h1></body></html>")
+
+        if 'frmPrincipal:btnGenerar' in form:
+            self.simulate_latency('reporte')
+        elif 'frmPrincipal:cmdlnkSearch' in form:
+            self.simulate_latency('aspirantes')
+        else:
+            self.simulate_latency('busqueda')
+
+        session = self.session()
+        if session is None:
+            return self.redirect("/josso/signon/login.do")
+        if session.rol is None:
+            return self.redirect(PORTAL_PATH)
+
+        view = 'fichas' if form.get('form') == 'form' else 'reporte'
+        with session.lock:
+            if form.get('javax.faces.ViewState') != session.view_states.get(view):
+                return self.send_body(
+                    500, "<html><body><h1>Error 500</h1><p>javax.faces.application.ViewExpiredException</p></body></html>"
+                )
+            if view == 'fichas':
+                return self.handle_fichas_post(session, form)
+            return self.handle_report_post(session, form)
+
+    def handle_login_post(self, form):
+        usuario = form.get('josso_username', '').strip()
+        if not usuario or not form.get('josso_password'):
+            return self.send_body(200, self.render_login("Usuario o contraseña incorrectos"))
+        self.set_cookie(SSO_COOKIE, self.mock.create_sso_session(usuario))
+        self.set_cookie(SESSION_COOKIE, self.mock.create_session(usuario))
+        # La respuesta se carga en el iframe de login: saca a la ventana principal a la portada
+        body = f"""<html><head><title>JOSSO</title></head><body>
+<script>window.top.location.href = '{PORTAL_PATH}';</script>
+</body></html>"""
+        return self.send_body(200, body)
+
+    def handle_role_post(self, form):
+        session = self.session()
+        if session is None:
+            return self.send_body(200, self.render_portal(None))
+        rol = form.get('seleccionRol:roles', '')
+        with session.lock:
+            if rol in ROLES:
+                session.rol = rol
+        return self.send_body(200, self.render_portal(session))
+
+    def handle_fichas_post(self, session, form):
+        mensaje = ""
+        if 'form:buscarCBT' in form:
+            ficha = form.get('form:codigoFichaITX', '').strip()
+            session.ficha_buscada = ficha if self.mock.ficha_existe(ficha) else None
+            if session.ficha_buscada is None:
+                mensaje = "No se encontraron registros"
+        elif 'form:dtFichas:0:imgSelec' in form or 'form:dtFichas:0:imgSelec.x' in form:
+            if session.ficha_buscada and session.ficha_buscada not in session.seleccion:
+                session.seleccion.append(session.ficha_buscada)
+            mensaje = "Ficha agregada"
+        return self.send_body(200, self.render_fichas_view(session, mensaje))
+
+    def handle_report_post(self, session, form):
+        if 'frmPrincipal:cmdlnkSearch' in form:
+            session.aspirantes_consultados = True
+            return self.send_body(200, self.render_report_view(session))
+
+        if 'frmPrincipal:btnGenerar' in form:
+            if not (session.aspirantes_consultados and session.seleccion):
+                return self.send_body(200, self.render_report_view(session, "Debe consultar aspirantes"))
+            return self.send_report(session)
+
+        return self.send_body(200, self.render_report_view(session))
+
+    def send_report(self, session):
+        columnas = ['ficha', 'documento', 'nombre', 'opcion', 'estado']
+        lineas = [";".join(columnas)]
+        for ficha in session.seleccion:
+            for fila in aspirantes_de_ficha(ficha):
+                lineas.append(";".join(fila[columna] for columna in columnas))
+        body = ("\r\n".join(lineas) + "\r\n").encode('utf-8')
+        self.send_body(200, body, "text/csv; charset=utf-8", {
+            'Content-Disposition': 'attachment; filename="reporteInscripcion.csv"'
+        })
+
+    # --- vistas -----------------------------------------------------------
+
+    def render_portal(self, session):
+        """Portada: login (iframe JOSSO), selección de rol o menú con el iframe 'contenido'"""
+        if session is None:
+            cuerpo = f"""<div class='login'>
+<iframe id='iframeLogin' name='iframeLogin' src='{LOGIN_PATH}' width='400' height='300'></iframe>
+</div>"""
+        elif session.rol is None:
+            opciones = "".join(
+                f"<option value='{valor}'>{html.escape(nombre)}</option>" for valor, nombre in ROLES.items()
+            )
+            cuerpo = f"""<form id='seleccionRol' name='seleccionRol' method='post' action='{PORTAL_PATH}'>
+<label for='seleccionRol:roles'>Rol</label>
+<select id='seleccionRol:roles' name='seleccionRol:roles' onchange='this.form.submit();'>
+<option value=''>-- Seleccione --</option>{opciones}
+</select>
+</form>"""
+        else:
+            cuerpo = f"""<div id='menu'>
+<span class='menuPrimario' onclick="document.getElementById('subInscripcion').style.display='block';">Inscripción</span>
+<div id='subInscripcion' style='display:none'>
+<a href='#' onclick="document.getElementById('subConsultas').style.display='block'; return false;">Consultas</a>
+<div id='subConsultas' style='display:none'>
+<a href='#' onclick="document.getElementById('contenido').src='{REPORT_PATH}'; return false;">Generar Reporte de Inscripción</a>
+</div>
+</div>
+</div>
+<p>Usuario: {html.escape(session.usuario or '')} - {html.escape(ROLES.get(session.rol, ''))}</p>
+<iframe id='contenido' name='contenido' src='about:blank' width='100%' height='600'></iframe>"""
+        return f"""<html><head><title>Sofia Plus</title></head><body>
+{cuerpo}
+</body></html>"""
+
+    def render_login(self, mensaje=""):
+        return f"""<html><head><title>JOSSO - Inicio de sesión</title></head><body>
+<p class='mensaje'>{html.escape(mensaje)}</p>
+<form id='formLogin' name='formLogin' method='post' action='{LOGIN_POST_PATH}'>
+<input type='text' id='username' name='josso_username' value=''/>
+<input type='password' id='password' name='josso_password' value=''/>
+<input type='hidden' name='josso_cmd' value='login'/>
+<input type='submit' class='login100-form-btn' value='Ingresar'/>
+</form>
+</body></html>"""
+
+    def render_report_view(self, session, mensaje=""):
+        view_state = session.new_view_state('reporte')
+        aspirantes = ""
+        generar = ""
+        if session.aspirantes_consultados:
+            filas = "".join(
+                f"<tr><td>{html.escape(fila['ficha'])}</td><td>{fila['documento']}</td><td>{fila['nombre']}</td></tr>"
+                for ficha in session.seleccion for fila in aspirantes_de_ficha(ficha)
+            )
+            aspirantes = f"<table id='frmPrincipal:dtAspirantes'>{filas}</table>"
+            generar = ("<input type='submit' id='frmPrincipal:btnGenerar' name='frmPrincipal:btnGenerar' "
+                       "value='Generar reporte' class='boton_app'/>")
+        return f"""<html><head><title>Generar Reporte de Inscripción</title></head><body>
+<p class='mensaje'>{html.escape(mensaje)}</p>
+<iframe id='fichas' name='fichas' src='{REPORT_PATH}?vista=fichas' width='100%' height='300'></iframe>
+<form id='frmPrincipal' name='frmPrincipal' method='post' action='{REPORT_PATH}'>
+<input type='hidden' name='frmPrincipal' value='frmPrincipal'/>
+<input type='submit' id='frmPrincipal:cmdlnkSearch' name='frmPrincipal:cmdlnkSearch' value='Consultar aspirantes ' class='boton_app'/>
+{aspirantes}
+{generar}
+<input type='hidden' name='javax.faces.ViewState' id='javax.faces.ViewState' value='{view_state}'/>
+</form>
+</body></html>"""
+
+    def render_fichas_view(self, session, mensaje=""):
+        view_state = session.new_view_state('fichas')
+        resultados = ""
+        if session.ficha_buscada:
+            resultados = f"""<table id='form:dtFichas'><tr>
+<td>{html.escape(session.ficha_buscada)}</td>
+<td><input type='image' id='form:dtFichas:0:imgSelec' name='form:dtFichas:0:imgSelec' title='Agregar' src='agregar.png' alt='Agregar'/></td>
+</tr></table>"""
+        # El panel de búsqueda se abre con 'Consultar ficha' y queda abierto tras buscar
+        panel_visible = 'block' if mensaje or session.ficha_buscada else 'none'
+        return f"""<html><head><title>Fichas</title></head><body>
+<p class='mensaje'>{html.escape(mensaje)}</p>
+<form id='form' name='form' method='post' action='{REPORT_PATH}?vista=fichas'>
+<input type='hidden' name='form' value='form'/>
+<select id='opcionesInscritos' name='opcionesInscritos'>
+<option value='0'>Todas</option>
+<option value='1'>Primera Opción</option>
+</select>
+<img src='lupa.png' alt='Consultar ficha' title='Consultar ficha' width='16' height='16'
+     onclick="document.getElementById('panelFicha').style.display='block';"/>
+<div id='panelFicha' style='display:{panel_visible}'>
+<input type='text' id='form:codigoFichaITX' name='form:codigoFichaITX' value=''/>
+<input type='submit' id='form:buscarCBT' name='form:buscarCBT' value='Consultar'/>
+{resultados}
+</div>
+<input type='hidden' name='javax.faces.ViewState' id='javax.faces.ViewState' value='{view_state}'/>
+</form>
+</body></html>"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que simula Sofia Plus")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latencia por petición en segundos")
+    parser.add_argument("--login-latency", type=float, default=0.0, help="Latencia extra del login JOSSO")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Latencia extra de Consultar/Agregar ficha")
+    parser.add_argument("--aspirantes-latency", type=float, default=0.0, help="Latencia extra de 'Consultar aspirantes'")
+    parser.add_argument("--report-latency", type=float, default=0.0, help="Latencia extra de 'Generar reporte'")
+    parser.add_argument("--missing", default="", help="Fichas inexistentes separadas por coma")
+    args = parser.parse_args()
+
+    server = MockSofiaServer(
+        args.host, args.port, latency=args.latency,
+        missing_fichas=[ficha for ficha in args.missing.split(",") if ficha],
+        latencies={
+            'login': args.login_latency,
+            'busqueda': args.search_latency,
+            'aspirantes': args.aspirantes_latency,
+            'reporte': args.report_latency,
+        }
+    ).start()
+    print(f"Sofia Plus simulado en {server.base_url} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
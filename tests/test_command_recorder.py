@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from main import CommandRecorder, SenaAutomation, Telemetry
+
+
+class FakeDriver:
+    """Driver mínimo: execute_script pasa por execute, como en Selenium"""
+
+    def execute(self, driver_command, params=None):
+        return {'value': ["http://sofia", [0], "input#ficha", "abc", 10]}
+
+    def execute_script(self, script, *args):
+        return self.execute("executeScript", {'script': script, 'args': list(args)})['value']
+
+
+@pytest.fixture
+def recorder(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    recorder = CommandRecorder(output_dir=str(tmp_path / "comandos"))
+    yield recorder
+    Telemetry.shared().set_ficha(None)
+
+
+def test_commands_are_attributed_to_the_calling_method_and_ficha(recorder):
+    automation = SenaAutomation()
+    automation.driver = recorder.instrument(FakeDriver())
+    Telemetry.shared().set_ficha("2000001")
+
+    automation.remember_step("primera_opcion")
+    automation.remember_step("consultar_ficha")
+
+    assert recorder.total['comandos'] == 2
+    assert recorder.by_method['remember_step']['por_comando'] == {'executeScript': 2}
+    assert recorder.by_ficha['2000001']['comandos'] == 2
+    assert recorder.total['bytes'] > 0
+
+
+def test_commands_outside_the_automation_are_grouped_apart(recorder):
+    driver = recorder.instrument(FakeDriver())
+
+    driver.execute("getTitle")
+
+    assert list(recorder.by_method) == ["<fuera de SenaAutomation>"]
+    assert list(recorder.by_ficha) == ["<sin ficha>"]
+
+
+def test_export_writes_summary_and_folded_stacks(recorder):
+    automation = SenaAutomation()
+    automation.driver = recorder.instrument(FakeDriver())
+    automation.remember_step("primera_opcion")
+
+    summary_path, folded_path = recorder.export("prueba")
+
+    with open(summary_path, encoding='utf-8') as f:
+        summary = json.load(f)
+    assert summary['total']['comandos'] == 1
+    with open(folded_path, encoding='utf-8') as f:
+        stack, micros = f.read().split()
+    assert stack == "remember_step;executeScript"
+    assert int(micros) >= 0
+
+
+def test_reset_clears_the_previous_run(recorder):
+    recorder.instrument(FakeDriver()).execute("getTitle")
+
+    recorder.reset()
+
+    assert recorder.total['comandos'] == 0 and not recorder.by_method and not recorder.folded
@@ -0,0 +1,58 @@
+import os
+
+from main import DumpStore
+
+
+def random_page(size=4096):
+    return os.urandom(size).hex()
+
+
+def segments(dump_dir):
+    return sorted(name for name in os.listdir(dump_dir) if name.endswith(DumpStore.SEGMENT_EXTENSIONS))
+
+
+def age(dump_dir, seconds):
+    """Hace que todo lo que hay en dump_dir parezca escrito hace 'seconds' segundos"""
+    for name in os.listdir(dump_dir):
+        path = os.path.join(dump_dir, name)
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+def test_cap_applies_to_segments_left_by_earlier_runs(tmp_path):
+    dump_dir = str(tmp_path / "dumps")
+    earlier = DumpStore(dump_dir, "run1", max_segment_bytes=1, max_total_bytes=10 ** 9)
+    for _ in range(5):
+        earlier.add(random_page(), failure=True)
+    age(dump_dir, 60)
+    assert len(segments(dump_dir)) == 5
+
+    current = DumpStore(dump_dir, "run2", max_segment_bytes=1, max_total_bytes=15000)
+    assert len(segments(dump_dir)) <= 3
+
+    for _ in range(4):
+        current.add(random_page(), failure=True)
+
+    assert sum(os.path.getsize(os.path.join(dump_dir, name)) for name in segments(dump_dir)) <= 15000
+    assert all(name.startswith("dumps_run2.") for name in segments(dump_dir))
+    assert not os.path.exists(earlier.index_path)
+
+
+def test_identical_pages_are_stored_once(tmp_path):
+    store = DumpStore(str(tmp_path), "run")
+    page = random_page()
+
+    first = store.add(page, paso="a", failure=True)
+    second = store.add(page, paso="b", failure=True)
+
+    assert second['duplicado'] and second['offset'] == first['offset']
+    assert store.read(second) == page
+    assert [entry['paso'] for entry in store.find()] == ["a", "b"]
+
+
+def test_successes_are_sampled_and_failures_always_captured(tmp_path):
+    store = DumpStore(str(tmp_path), "run", sample_every=3)
+
+    assert [store.should_capture() for _ in range(6)] == [True, False, False, True, False, False]
+    assert store.should_capture(failure=True)
+    assert not DumpStore(str(tmp_path), "off", sample_every=0).should_capture()
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from main import FichaIngestion
+
+pytest.importorskip("pandas")
+
+
+def write_text(tmp_path, name, lines):
+    path = tmp_path / name
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+    return str(path)
+
+
+def test_header_is_detected_and_values_are_normalized(tmp_path):
+    path = write_text(tmp_path, "fichas.csv", [
+        "Ficha;Programa", "2345678.0;ADSO", "", "2345678;ADSO", "12ab;X", " 3456789 ;Y", "nan;Z"
+    ])
+
+    result = FichaIngestion.parse(path)
+
+    assert result.header == "Ficha"
+    assert result.fichas == ["2345678", "3456789"]
+    assert (result.total_rows, result.blank_rows, result.duplicates) == (6, 2, 1)
+    assert result.invalid_count == 1
+    assert result.invalid_samples == [(5, "12ab")]
+
+
+def test_first_value_that_is_a_ficha_is_not_taken_as_header(tmp_path):
+    path = write_text(tmp_path, "fichas.txt", ["", "2000001", "2000002"])
+
+    result = FichaIngestion.parse(path)
+
+    assert result.header is None
+    assert result.fichas == ["2000001", "2000002"]
+    assert result.summary() == "2 fichas válidas de 3 filas (1 vacías)"
+
+
+def test_duplicates_are_dropped_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(FichaIngestion, "CHUNK_SIZE", 2)
+    path = write_text(tmp_path, "fichas.txt", ["2000001", "2000002", "2000001", "2000003", "2000002"])
+
+    result = FichaIngestion.parse(path)
+
+    assert result.fichas == ["2000001", "2000002", "2000003"]
+    assert result.duplicates == 2
+
+
+def test_xlsx_first_column_is_streamed(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    for row in (["Código ficha", "Centro"], [2000001, "A"], [2000002.0, "B"], [None, "C"]):
+        workbook.active.append(row)
+    path = str(tmp_path / "fichas.xlsx")
+    workbook.save(path)
+
+    result = FichaIngestion.parse(path)
+
+    assert result.header == "Código ficha"
+    assert result.fichas == ["2000001", "2000002"]
+
+
+def test_result_is_stale_once_the_file_changes(tmp_path):
+    path = write_text(tmp_path, "fichas.txt", ["2000001"])
+    result = FichaIngestion.parse(path)
+    assert result.matches(path)
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("2000002\n")
+    os.utime(path, ns=(0, 0))
+
+    assert not result.matches(path)
@@ -0,0 +1,97 @@
+import http.client
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from main import HttpConnectionPool
+
+
+class RawHttpHandler(socketserver.StreamRequestHandler):
+    """Responde con keep-alive; server.on_request(n) decide qué hacer con la n-ésima petición de la conexión"""
+
+    def handle(self):
+        served = 0
+        while True:
+            request_line = self.rfile.readline()
+            if not request_line:
+                return
+            length = 0
+            for line in iter(self.rfile.readline, b"\r\n"):
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            self.rfile.read(length)
+            served += 1
+            with self.server.lock:
+                self.server.requests += 1
+            action = self.server.on_request(served)
+            if action == "close":
+                return
+            if action == "hang":
+                time.sleep(1)
+                return
+            self.wfile.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+            self.wfile.flush()
+            if action == "reply_and_close":
+                return
+
+
+@pytest.fixture
+def raw_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), RawHttpHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.on_request = lambda served: "reply"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/reporte"
+
+
+def test_post_is_not_resent_after_a_timeout(raw_server):
+    raw_server.on_request = lambda served: "hang"
+    pool = HttpConnectionPool(timeout=0.2)
+
+    with pytest.raises(socket.timeout):
+        pool.request("POST", url(raw_server), b"frmPrincipal:btnGenerar=1")
+
+    time.sleep(0.1)
+    assert raw_server.requests == 1
+
+
+def test_post_is_not_resent_when_a_reused_connection_drops_after_sending(raw_server):
+    raw_server.on_request = lambda served: "reply" if served == 1 else "close"
+    pool = HttpConnectionPool(timeout=2)
+    assert pool.request("GET", url(raw_server)).read() == b"ok"
+
+    with pytest.raises(http.client.RemoteDisconnected):
+        pool.request("POST", url(raw_server), b"form:dtFichas:0:imgSelec=1")
+
+    assert raw_server.requests == 2
+
+
+def test_get_is_retried_when_a_reused_connection_drops(raw_server):
+    raw_server.on_request = lambda served: "reply" if served == 1 else "close"
+    pool = HttpConnectionPool(timeout=2)
+    assert pool.request("GET", url(raw_server)).read() == b"ok"
+
+    assert pool.request("GET", url(raw_server)).read() == b"ok"
+    assert raw_server.requests == 3
+
+
+def test_idle_connection_closed_by_the_server_is_replaced_before_sending(raw_server):
+    raw_server.on_request = lambda served: "reply_and_close"
+    pool = HttpConnectionPool(timeout=2)
+    assert pool.request("GET", url(raw_server)).read() == b"ok"
+    time.sleep(0.1)
+
+    assert pool.request("POST", url(raw_server), b"form:buscarCBT=1").read() == b"ok"
+    assert raw_server.requests == 2
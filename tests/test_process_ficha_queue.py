@@ -0,0 +1,34 @@
+import main
+from main import ProgressAggregator, RetryScheduler, SenaAutomation
+
+
+class BrokenJournal:
+    """Diario cuyo disco falla al escribir"""
+
+    def record(self, ficha, estado, motivo=None, duracion=None):
+        raise OSError("disco lleno")
+
+
+def test_unexpected_error_does_not_leak_in_flight_items(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    automation = SenaAutomation()
+    automation.journal = BrokenJournal()
+    automation.process_ficha_in_session = lambda ficha, reuse_session: True
+    scheduler = RetryScheduler([(0, "1"), (1, "2")], max_attempts=1)
+    aggregator = ProgressAggregator(2)
+
+    automation.process_ficha_queue(scheduler, aggregator, pause_between_fichas=0)
+
+    assert scheduler.in_flight == 0
+    assert scheduler.get() is None
+    assert aggregator.processed == 2
+
+
+def test_release_is_idempotent():
+    scheduler = RetryScheduler([(0, "1")])
+    item = scheduler.get()
+    scheduler.complete(item)
+    scheduler.release([item])
+
+    assert scheduler.in_flight == 0
+    assert scheduler.get() is None
@@ -0,0 +1,45 @@
+from main import ReportCache
+
+REAL_SITE = "http://senasofiaplus.edu.co/sofia-public/"
+MOCK_SITE = "http://127.0.0.1:8765/sofia-public/"
+
+
+def make_cache(tmp_path, ttl=ReportCache.DEFAULT_TTL):
+    return ReportCache(cache_file=str(tmp_path / "report_cache.json"), ttl=ttl)
+
+
+def write_report(tmp_path, name="2000001.csv"):
+    path = tmp_path / name
+    path.write_text("ficha;documento\n2000001;10000001\n", encoding='utf-8')
+    return str(path)
+
+
+def test_report_is_served_only_for_the_site_that_generated_it(tmp_path):
+    cache = make_cache(tmp_path)
+    path = write_report(tmp_path)
+
+    cache.store(MOCK_SITE, "2000001", "1", path)
+
+    assert cache.lookup(MOCK_SITE, "2000001", "1") == path
+    assert cache.lookup(REAL_SITE, "2000001", "1") is None
+
+
+def test_entries_survive_a_reload(tmp_path):
+    cache = make_cache(tmp_path)
+    path = write_report(tmp_path)
+    cache.store(REAL_SITE, "2000001", "1", path)
+    cache.save()
+
+    assert make_cache(tmp_path).lookup(REAL_SITE, "2000001", "1") == path
+
+
+def test_expired_or_modified_reports_are_not_served(tmp_path):
+    cache = make_cache(tmp_path, ttl=-1)
+    path = write_report(tmp_path)
+    cache.store(REAL_SITE, "2000001", "1", path)
+    assert cache.lookup(REAL_SITE, "2000001", "1") is None
+
+    cache.ttl = ReportCache.DEFAULT_TTL
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("2000001;10000002\n")
+    assert cache.lookup(REAL_SITE, "2000001", "1") is None
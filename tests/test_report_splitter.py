@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from main import ReportSplitter
+
+pd = pytest.importorskip("pandas")
+
+
+def write_report(tmp_path, rows, columns):
+    path = tmp_path / "lote.csv"
+    pd.DataFrame(rows, columns=columns).to_csv(path, sep=";", index=False)
+    return str(path)
+
+
+def test_rows_are_split_by_the_exact_ficha_column(tmp_path):
+    columns = ["Estado ficha", "Código ficha", "Documento"]
+    rows = [["Activa", "2000001", "1"], ["Activa", "2000002", "2"], ["Activa", "2000001", "3"]]
+    path = write_report(tmp_path, rows, columns)
+
+    paths = ReportSplitter.split(path, ["2000001", "2000002"], str(tmp_path))
+
+    assert len(pd.read_csv(paths["2000001"], sep=";", dtype=str)) == 2
+    assert len(pd.read_csv(paths["2000002"], sep=";", dtype=str)) == 1
+    assert not os.path.exists(path)
+
+
+def test_value_matches_win_over_a_column_merely_named_after_the_ficha(tmp_path):
+    columns = ["Fecha inicio ficha", "Grupo", "Documento"]
+    rows = [["2026-01-01", "2000001", "1"], ["2026-01-01", "2000002", "2"]]
+    path = write_report(tmp_path, rows, columns)
+
+    assert ReportSplitter.find_ficha_column(ReportSplitter.read(path)[0], ["2000001", "2000002"]) == "Grupo"
+
+
+def test_fichas_without_rows_get_no_file(tmp_path):
+    path = write_report(tmp_path, [["2000001", "1"]], ["ficha", "documento"])
+
+    paths = ReportSplitter.split(path, ["2000001", "2000002"], str(tmp_path))
+
+    assert set(paths) == {"2000001"}
+    assert not any(name.startswith("2000002") for name in os.listdir(tmp_path))
+
+
+def test_report_without_any_ficha_of_the_batch_is_rejected(tmp_path):
+    path = write_report(tmp_path, [["2000009", "1"]], ["ficha", "documento"])
+
+    with pytest.raises(ValueError):
+        ReportSplitter.split(path, ["2000001"], str(tmp_path))
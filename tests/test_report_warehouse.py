@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from main import ReportWarehouse
+
+
+def write_report(path, rows):
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_document_type_is_not_used_as_key(tmp_path):
+    report = write_report(tmp_path / "123.csv", [
+        "Tipo de Documento,Número de Documento,Nombre",
+        "CC,111,a",
+        "CC,222,b",
+        "TI,333,c",
+    ])
+    warehouse = ReportWarehouse(str(tmp_path / "reportes.sqlite"))
+
+    assert warehouse.ingest("123", report) == 3
+    with sqlite3.connect(warehouse.db_path) as connection:
+        rows = connection.execute("SELECT documento, nombre FROM aspirantes ORDER BY documento").fetchall()
+    assert rows == [("111", "a"), ("222", "b"), ("333", "c")]
+
+
+def test_repeated_document_keeps_every_row(tmp_path):
+    report = write_report(tmp_path / "123.csv", [
+        "Número de Documento,Nombre",
+        "111,a",
+        "111,b",
+    ])
+    warehouse = ReportWarehouse(str(tmp_path / "reportes.sqlite"))
+
+    assert warehouse.ingest("123", report) == 2
+
+
+def test_find_document_column_prefers_number_over_type():
+    columns = ["tipo_de_documento", "numero_de_documento", "nombre"]
+    assert ReportWarehouse.find_document_column(columns) == "numero_de_documento"
+    assert ReportWarehouse.find_document_column(["tipo_documento", "nombre"]) is None
+    assert ReportWarehouse.find_document_column(["reporte_documento"]) == "reporte_documento"
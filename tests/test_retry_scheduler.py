@@ -0,0 +1,86 @@
+import pytest
+
+from main import FailureKind, ProgressAggregator, RetryScheduler, SenaAutomation
+
+
+class TimeoutException(Exception):
+    pass
+
+
+class StaleElementReferenceException(Exception):
+    pass
+
+
+class SessionExpiredError(Exception):
+    pass
+
+
+def test_backoff_doubles_with_jitter_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr("main.random.uniform", lambda low, high: high)
+    scheduler = RetryScheduler([(0, "1")], max_attempts=4, base_delay=10, max_delay=25)
+
+    delays = []
+    for _ in range(4):
+        delays.append(scheduler.retry_later(scheduler.get_batch()[0]))
+        scheduler.deferred = [(0, sequence, item) for _, sequence, item in scheduler.deferred]
+
+    assert delays == [10, 20, 25, None]
+    assert scheduler.get() is None
+
+
+def test_jitter_stays_between_half_and_the_full_delay():
+    scheduler = RetryScheduler([(0, "1")], max_attempts=2, base_delay=8)
+
+    delay = scheduler.retry_later(scheduler.get())
+
+    assert 4 <= delay <= 8
+
+
+def test_new_fichas_are_served_before_due_retries():
+    scheduler = RetryScheduler([(0, "1"), (1, "2")], base_delay=0)
+    first = scheduler.get()
+    scheduler.retry_later(first)
+
+    assert scheduler.get() == (1, "2")
+    assert scheduler.get() == first
+
+
+def test_get_batch_takes_only_what_is_ready():
+    scheduler = RetryScheduler([(0, "1"), (1, "2"), (2, "3")])
+
+    assert scheduler.get_batch(size=2) == [(0, "1"), (1, "2")]
+    assert scheduler.in_flight == 2
+
+
+@pytest.mark.parametrize("error, kind", [
+    (TimeoutException("no element"), FailureKind.TIMEOUT),
+    (StaleElementReferenceException("stale"), FailureKind.IFRAME_OBSOLETO),
+    (SessionExpiredError("josso"), FailureKind.LOGIN),
+    (RuntimeError("HTTP Status 500 - ViewExpiredException"), FailureKind.ERROR_SERVIDOR),
+    (RuntimeError("algo raro"), FailureKind.DESCONOCIDA),
+])
+def test_exceptions_are_classified_by_type_and_message(error, kind):
+    assert FailureKind.from_exception(error) == kind
+
+
+def test_only_transient_failures_are_retried(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    automation = SenaAutomation()
+    attempts = []
+
+    def process(ficha, reuse_session):
+        attempts.append(ficha)
+        automation.last_failure = None
+        if ficha == "1":
+            return automation.record_failure(FailureKind.FICHA_NO_ENCONTRADA, "sin resultados")
+        return automation.record_failure(FailureKind.TIMEOUT, "sin respuesta")
+
+    automation.process_ficha_in_session = process
+    scheduler = RetryScheduler([(0, "1"), (1, "2")], max_attempts=3, base_delay=0)
+    aggregator = ProgressAggregator(2)
+
+    automation.process_ficha_queue(scheduler, aggregator, pause_between_fichas=0)
+
+    assert attempts.count("1") == 1
+    assert attempts.count("2") == 3
+    assert aggregator.failure_kinds == {FailureKind.FICHA_NO_ENCONTRADA: 1, FailureKind.TIMEOUT: 1}
@@ -0,0 +1,13 @@
+from main import SenaAutomation
+
+
+def test_early_return_does_not_reexport_previous_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    automation = SenaAutomation()
+    automation.telemetry.open()
+    exports = []
+    automation.export_telemetry = lambda: exports.append(automation.telemetry.run_id)
+
+    automation.run_automation("fichas.txt", fichas=[])
+
+    assert exports == []
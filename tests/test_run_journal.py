@@ -0,0 +1,34 @@
+from main import RunJournal
+
+
+def test_resume_after_torn_line_keeps_new_events(tmp_path):
+    input_path = tmp_path / "fichas.txt"
+    journal = RunJournal(str(input_path), journal_dir=str(tmp_path / "journal"))
+    journal.open()
+    journal.record("1", RunJournal.COMPLETADA)
+    journal.close()
+    # Corte a mitad de escritura: la última línea queda truncada y sin salto de línea
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"ficha": "2", "est')
+
+    journal = RunJournal(str(input_path), journal_dir=str(tmp_path / "journal"))
+    journal.open(resume=True)
+    journal.record("3", RunJournal.COMPLETADA)
+    journal.close()
+
+    assert journal.completed_fichas() == {"1", "3"}
+
+
+def test_resume_of_clean_journal_adds_no_blank_line(tmp_path):
+    journal = RunJournal(str(tmp_path / "fichas.txt"), journal_dir=str(tmp_path / "journal"))
+    journal.open()
+    journal.record("1", RunJournal.COMPLETADA)
+    journal.close()
+
+    journal.open(resume=True)
+    journal.record("2", RunJournal.COMPLETADA)
+    journal.close()
+
+    with open(journal.path, encoding='utf-8') as f:
+        assert all(line.strip() for line in f)
+    assert journal.completed_fichas() == {"1", "2"}
@@ -0,0 +1,21 @@
+import json
+
+from main import SelectorRegistry
+
+PRIMARY = ("id", "form:buscarCBT")
+SECONDARY = ("name", "form:buscarCBT")
+
+
+def test_long_winning_strategy_drops_after_a_few_failures(tmp_path):
+    stats_file = tmp_path / "selector_stats.json"
+    stats_file.write_text(json.dumps({"buscar": {
+        SelectorRegistry.strategy_key(PRIMARY): {"tries": 500, "wins": 500, "win_time": 250.0},
+        SelectorRegistry.strategy_key(SECONDARY): {"tries": 2, "wins": 1, "win_time": 0.5},
+    }}), encoding="utf-8")
+    registry = SelectorRegistry(stats_file=str(stats_file))
+    assert registry.ordered("buscar", [PRIMARY, SECONDARY])[0] == PRIMARY
+
+    for _ in range(4):
+        registry.record("buscar", PRIMARY, False, 15.0)
+
+    assert registry.ordered("buscar", [PRIMARY, SECONDARY])[0] == SECONDARY
@@ -0,0 +1,34 @@
+import json
+import os
+
+from main import SessionCookieStore
+
+JAR = [
+    {'name': "JSESSIONID", 'value': "app", 'path': "/"},
+    {'name': "JOSSO_SESSIONID", 'value': "sso", 'path': "/"},
+]
+
+
+def test_only_the_josso_login_is_shared(tmp_path):
+    store = SessionCookieStore(cookie_file=str(tmp_path / "cookies.json"))
+
+    assert store.save(JAR)
+
+    assert store.load() == [JAR[1]]
+
+
+def test_jar_without_josso_cookie_is_not_saved(tmp_path):
+    store = SessionCookieStore(cookie_file=str(tmp_path / "cookies.json"))
+
+    assert not store.save(JAR[:1])
+
+    assert not os.path.exists(store.cookie_file)
+    assert store.load() is None
+
+
+def test_older_files_with_the_whole_jar_are_filtered(tmp_path):
+    store = SessionCookieStore(cookie_file=str(tmp_path / "cookies.json"), ttl=60)
+    with open(store.cookie_file, 'w', encoding='utf-8') as f:
+        json.dump({'saved_at': 0, 'expires_at': 4102444800, 'cookies': JAR}, f)
+
+    assert store.load() == [JAR[1]]
@@ -0,0 +1,87 @@
+import logging
+import threading
+
+import pytest
+
+from main import FailureKind, SofiaHttpEngine
+from mock_sofia import MockSofiaServer, SESSION_COOKIE, aspirantes_de_ficha
+
+LOGGER = logging.getLogger("test_sofia_http_engine")
+
+
+@pytest.fixture
+def server():
+    server = MockSofiaServer(missing_fichas=["2000099"]).start()
+    yield server
+    server.stop()
+
+
+def new_engine(server, download_dir):
+    engine = SofiaHttpEngine(server.base_url, LOGGER, str(download_dir))
+    engine.set_cookies(server.new_session())
+    return engine
+
+
+def report_fichas(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.split(";")[0] for line in f.read().splitlines()[1:]]
+
+
+def test_single_ficha_downloads_its_report(server, tmp_path):
+    engine = new_engine(server, tmp_path)
+
+    assert engine.process_single_ficha("2000001")
+
+    assert report_fichas(engine.last_report_path) == ["2000001"] * len(aspirantes_de_ficha("2000001"))
+
+
+def test_batch_splits_one_report_per_ficha(server, tmp_path):
+    pytest.importorskip("pandas")
+    engine = new_engine(server, tmp_path)
+
+    results = engine.process_batch(["2000001", "2000099", "2000002"])
+
+    assert results["2000001"] is None and results["2000002"] is None
+    assert results["2000099"][0] == FailureKind.FICHA_NO_ENCONTRADA
+    assert set(engine.last_report_paths) == {"2000001", "2000002"}
+
+
+def test_missing_ficha_is_not_found(server, tmp_path):
+    engine = new_engine(server, tmp_path)
+
+    assert not engine.process_single_ficha("2000099")
+    assert engine.last_failure[0] == FailureKind.FICHA_NO_ENCONTRADA
+
+
+def test_expired_session_is_reported_as_login_failure(server, tmp_path):
+    engine = new_engine(server, tmp_path)
+    assert engine.process_single_ficha("2000001")
+
+    server.expire_sessions()
+
+    assert not engine.process_single_ficha("2000002")
+    assert engine.last_failure[0] == FailureKind.LOGIN
+    assert engine.session_expired
+
+
+def test_workers_sharing_the_login_get_their_own_application_session(server, tmp_path):
+    cookies = server.new_session()
+    engines = []
+    for n in range(4):
+        engine = SofiaHttpEngine(server.base_url, LOGGER, str(tmp_path / f"worker_{n}"))
+        engine.set_cookies(cookies)
+        engines.append(engine)
+    results = []
+
+    def worker(engine, first):
+        for ficha in range(first, first + 3):
+            results.append(engine.process_single_ficha(str(2000000 + ficha)))
+
+    threads = [threading.Thread(target=worker, args=(engine, n * 3)) for n, engine in enumerate(engines)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [True] * 12
+    assert len({engine.cookies[SESSION_COOKIE] for engine in engines}) == 4
@@ -0,0 +1,78 @@
+import csv
+import json
+import os
+
+import pytest
+
+from main import Telemetry
+
+
+class FakeDriver:
+    def execute(self, driver_command, params=None):
+        return {'value': None}
+
+
+@pytest.fixture
+def telemetry(tmp_path):
+    telemetry = Telemetry(output_dir=str(tmp_path))
+    telemetry.open()
+    yield telemetry
+    if telemetry.file is not None:
+        telemetry.file.close()
+
+
+def test_nested_spans_attribute_commands_and_waits_to_every_level(telemetry):
+    driver = telemetry.instrument(FakeDriver())
+    telemetry.set_ficha("2000001")
+
+    with telemetry.span("ficha"):
+        driver.execute("findElement")
+        with telemetry.span("generar_reporte"):
+            driver.execute("clickElement")
+            telemetry.add_wait(0.5)
+
+    rows = {row['fase']: row for row in telemetry.summary()}
+    assert rows['ficha']['comandos_total'] == 2
+    assert rows['generar_reporte']['comandos_total'] == 1
+    assert rows['ficha']['espera_total_s'] == rows['generar_reporte']['espera_total_s'] == 0.5
+
+
+def test_failed_spans_are_counted_and_spans_are_written_as_json_lines(telemetry):
+    with pytest.raises(RuntimeError):
+        with telemetry.span("login"):
+            raise RuntimeError("sin rol")
+    with telemetry.span("login"):
+        pass
+
+    telemetry.export()
+
+    with open(os.path.join(telemetry.output_dir, f"spans_{telemetry.run_id}.jsonl"), encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record['ok'] for record in records] == [False, True]
+    assert telemetry.summary()[0]['errores'] == 1
+
+
+def test_export_writes_csv_summary_and_prometheus_text(telemetry):
+    for _ in range(3):
+        with telemetry.span("http.load_view"):
+            pass
+
+    csv_path, prometheus_path = telemetry.export()
+
+    with open(csv_path, encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]['fase'] == "http.load_view" and rows[0]['cantidad'] == "3"
+    with open(prometheus_path, encoding='utf-8') as f:
+        text = f.read()
+    assert 'sena_fase_duracion_segundos{fase="http.load_view",quantile="0.95"}' in text
+    assert 'sena_fase_duracion_segundos_count{fase="http.load_view"} 3' in text
+    assert "# TYPE sena_fase_errores_total counter" in text
+
+
+def test_percentile_uses_the_nearest_rank():
+    values = list(range(1, 101))
+
+    assert Telemetry.percentile(values, 0.5) == 50
+    assert Telemetry.percentile(values, 0.99) == 99
+    assert Telemetry.percentile([7], 0.95) == 7
+    assert Telemetry.percentile([], 0.5) == 0.0